@@ -25,6 +25,7 @@ from app.models.user import User
 from app.models.agent import Agent
 from app.models.allocation import Allocation
 from app.models.task import Task
+from app.models.task_history import TaskHistory
 from app.models.audit_log import AuditLog
 target_metadata = Base.metadata
 
@@ -0,0 +1,32 @@
+"""live_port_uniqueness
+
+Revision ID: 4f9b2d6e8a13
+Revises: e2a7c4f91b3d
+Create Date: 2026-10-18 13:05:37.662915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f9b2d6e8a13'
+down_revision = 'e2a7c4f91b3d'
+branch_labels = None
+depends_on = None
+
+LIVE_PORT = "CASE WHEN status IN ('REQUESTED', 'STARTING', 'ACTIVE', 'RELEASING') THEN remote_port END"
+
+
+def upgrade() -> None:
+    # remote_port was unique across released rows too, so a port could never be
+    # handed out twice in the table's lifetime. Only live allocations must differ.
+    op.add_column('allocations', sa.Column('active_port', sa.Integer(), sa.Computed(LIVE_PORT, persisted=True), nullable=True))
+    op.create_unique_constraint('uq_allocations_active_port', 'allocations', ['active_port'])
+    op.drop_constraint('remote_port', 'allocations', type_='unique')
+
+
+def downgrade() -> None:
+    op.create_unique_constraint('remote_port', 'allocations', ['remote_port'])
+    op.drop_constraint('uq_allocations_active_port', 'allocations', type_='unique')
+    op.drop_column('allocations', 'active_port')
@@ -0,0 +1,88 @@
+"""audit_log_indexes_partitions
+
+Revision ID: c61f0a8d2e57
+Revises: 9a4c1e7b3f20
+Create Date: 2026-10-18 16:40:12.553019
+
+"""
+from datetime import date
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c61f0a8d2e57'
+down_revision = '9a4c1e7b3f20'
+branch_labels = None
+depends_on = None
+
+# Months of partitions created up front; the retention job keeps adding them
+MONTHS_AHEAD = 3
+
+
+def _month_starts(first: date, count: int) -> list[date]:
+    months = []
+    year, month = first.year, first.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _prev_month(d: date) -> date:
+    return date(d.year - 1, 12, 1) if d.month == 1 else date(d.year, d.month - 1, 1)
+
+
+def upgrade() -> None:
+    # Partitions cover every month from the oldest row on, so maintenance only
+    # ever splits an empty pmax. Offline (--sql) there is no table to look at:
+    # pass the oldest month with -x audit_oldest=YYYY-MM (SELECT MIN(created_at)).
+    today = date.today()
+    if op.get_context().as_sql:
+        given = context.get_x_argument(as_dictionary=True).get("audit_oldest")
+        if not given:
+            raise RuntimeError("Offline upgrade needs -x audit_oldest=YYYY-MM (MIN(created_at) of audit_logs)")
+        year, month = given.split("-")[:2]
+        first = date(int(year), int(month), 1)
+    else:
+        oldest = op.get_bind().execute(sa.text("SELECT MIN(created_at) FROM audit_logs")).scalar()
+        first = (oldest.date() if oldest else today).replace(day=1)
+    first = min(first, today.replace(day=1))
+    months = (today.year - first.year) * 12 + today.month - first.month + 1 + MONTHS_AHEAD
+    # Partition pYYYYMM holds rows created before the first day of the following month
+    bounds = _month_starts(first, months + 1)[1:]
+
+    op.execute("UPDATE audit_logs SET created_at = NOW() WHERE created_at IS NULL")
+    op.drop_index('ix_audit_logs_id', table_name='audit_logs')
+    op.execute(
+        "ALTER TABLE audit_logs"
+        " MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+        " DROP PRIMARY KEY,"
+        " ADD PRIMARY KEY (id, created_at)"
+    )
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'], unique=False)
+    op.create_index('ix_audit_logs_actor', 'audit_logs', ['actor_type', 'actor_id'], unique=False)
+    op.create_index('ix_audit_logs_target', 'audit_logs', ['target_type', 'target_id'], unique=False)
+
+    partitions = ", ".join(
+        f"PARTITION p{(_prev_month(b)):%Y%m} VALUES LESS THAN (TO_DAYS('{b:%Y-%m-%d}'))" for b in bounds
+    )
+    op.execute(
+        "ALTER TABLE audit_logs PARTITION BY RANGE (TO_DAYS(created_at)) "
+        f"({partitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE audit_logs REMOVE PARTITIONING")
+    op.drop_index('ix_audit_logs_target', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_actor', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_created_at', table_name='audit_logs')
+    op.execute(
+        "ALTER TABLE audit_logs"
+        " DROP PRIMARY KEY,"
+        " ADD PRIMARY KEY (id),"
+        " MODIFY created_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP"
+    )
+    op.create_index('ix_audit_logs_id', 'audit_logs', ['id'], unique=False)
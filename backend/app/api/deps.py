@@ -11,26 +11,47 @@ from app.schemas.token import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    session: Annotated[AsyncSession, Depends(get_db)]
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+async def get_token_data(
+    token: Annotated[str, Depends(oauth2_scheme)]
+) -> TokenData:
+    """
+    Claims of a valid JWT, without the user lookup. For handlers that may
+    answer from a cache (snapshot_cache): they load the user only when they
+    build a response, so a deleted user can still revalidate or be served a
+    cached body until the token expires.
+    """
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
+        return TokenData(username=username)
     except JWTError:
         raise credentials_exception
-        
+
+async def load_user(session: AsyncSession, token_data: TokenData) -> User:
     user_repo = UserRepository(session)
     user = await user_repo.get_by_username(token_data.username)
     if user is None:
         raise credentials_exception
     return user
+
+async def get_current_user(
+    token_data: Annotated[TokenData, Depends(get_token_data)],
+    session: Annotated[AsyncSession, Depends(get_db)]
+) -> User:
+    return await load_user(session, token_data)
+
+
+async def get_current_admin(
+    current_user: Annotated[User, Depends(get_current_user)]
+) -> User:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return current_user
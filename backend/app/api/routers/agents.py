@@ -1,33 +1,57 @@
+from datetime import datetime, timedelta, timezone
 from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
+from app.core.config import settings
+from app.core.fast_json import as_rows, dump_json, dump_page, json_response
+from app.core.snapshot_cache import snapshot_cache
 from app.services.agent_service import AgentService
+from app.services.heartbeat_buffer import heartbeat_buffer
 from app.schemas.agent import (
     Agent, AgentCreateInvite, AgentInviteResponse, 
-    AgentRegister, AgentRegisterResponse, AgentHeartbeat, AgentPoll, AgentHeartbeatPayload
+    AgentRegister, AgentRegisterResponse, AgentHeartbeat, AgentPoll, AgentHeartbeatPayload,
+    AgentIdentity, AgentMetricsResponse, AgentRow
 )
-from app.schemas.task import TaskResponse
-from app.schemas.common import OkResponse
-from app.api.deps import get_current_user
+from app.schemas.task import TaskResponse, TaskRow
+from app.schemas.common import OkResponse, Page
+from app.schemas.token import TokenData
+from app.api.deps import get_current_user, get_token_data, load_user
 from app.api.deps_agent import get_current_agent
+from app.models.enums import AgentStatus
 from app.models.user import User
-from app.models.agent import Agent as AgentModel
+from app.repositories.agent import AgentRepository
+from app.repositories.base import InvalidCursor
 
 router = APIRouter()
 
 # Admin Endpoints
 
-@router.get("/", response_model=List[Agent])
+@router.get("/", response_model=Page[Agent])
 async def get_agents(
-    current_user: Annotated[User, Depends(get_current_user)],
-    session: Annotated[AsyncSession, Depends(get_db)]
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_token_data)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    status: Annotated[List[AgentStatus] | None, Query()] = None,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=settings.PAGE_MAX_LIMIT)] = settings.PAGE_DEFAULT_LIMIT,
 ):
-    # Need to implement get_all in AgentService or use Repo directly
-    # For now using repo directly via service wrapper if it existed, or just repo
-    from app.repositories.agent import AgentRepository
-    repo = AgentRepository(session)
-    return await repo.get_all()
+    # The user is looked up only to build a body; a 304 needs just the token
+    async def build():
+        await load_user(session, token_data)
+        repo = AgentRepository(session)
+        try:
+            rows, next_cursor = await repo.list_page(status, from_, to, cursor, limit, as_rows=True)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Overlay heartbeats that have not been flushed to the DB yet
+        items = [heartbeat_buffer.merge_row(row._asdict()) for row in rows]
+        return dump_page(AgentRow, items, next_cursor)
+
+    # Every user sees the same agents
+    return await snapshot_cache.respond(request, "agents", "all", build)
 
 @router.post("/create_invite", response_model=AgentInviteResponse)
 async def create_invite(
@@ -51,6 +75,26 @@ async def delete_agent(
         raise HTTPException(status_code=404, detail="Agent not found")
     return OkResponse()
 
+@router.get("/{agent_id}/metrics", response_model=AgentMetricsResponse)
+async def get_agent_metrics(
+    agent_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+    step: Annotated[int, Query(ge=1)] = 60,
+):
+    to = to or datetime.now(timezone.utc)
+    from_ = from_ or to - timedelta(hours=1)
+    if from_ >= to:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    service = AgentService(session)
+    try:
+        return await service.get_metrics(agent_id, from_, to, step)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Agent Side Endpoints
 
 @router.post("/register", response_model=AgentRegisterResponse)
@@ -63,25 +107,39 @@ async def register_agent(
     if not result:
         raise HTTPException(status_code=400, detail="Invalid registration")
     
-    agent_id, agent_token = result
-    return AgentRegisterResponse(agent_id=agent_id, agent_token=agent_token)
+    agent_id, agent_token, expires_in = result
+    return AgentRegisterResponse(agent_id=agent_id, agent_token=agent_token, expires_in=expires_in)
+
+@router.post("/token/refresh", response_model=AgentRegisterResponse)
+async def refresh_agent_token(
+    agent: Annotated[AgentIdentity, Depends(get_current_agent)],
+    session: Annotated[AsyncSession, Depends(get_db)]
+):
+    service = AgentService(session)
+    agent_token, expires_in = await service.refresh_token(agent)
+    return AgentRegisterResponse(agent_id=agent.id, agent_token=agent_token, expires_in=expires_in)
 
 @router.post("/heartbeat", response_model=OkResponse)
 async def heartbeat(
     heartbeat_in: AgentHeartbeatPayload,
     request: Request,
-    agent: Annotated[AgentModel, Depends(get_current_agent)],
+    agent: Annotated[AgentIdentity, Depends(get_current_agent)],
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     service = AgentService(session)
-    await service.heartbeat(agent, ip=request.client.host, cpu=heartbeat_in.cpu, mem=heartbeat_in.mem)
+    await service.heartbeat(
+        agent.id, ip=request.client.host, cpu=heartbeat_in.cpu, mem=heartbeat_in.mem, warm_slots=heartbeat_in.warm_slots
+    )
     return OkResponse()
 
 @router.get("/tasks", response_model=List[TaskResponse])
 async def poll_tasks(
-    agent: Annotated[AgentModel, Depends(get_current_agent)],
-    session: Annotated[AsyncSession, Depends(get_db)]
+    request: Request,
+    agent: Annotated[AgentIdentity, Depends(get_current_agent)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    wait: Annotated[int, Query(ge=0, le=settings.TASK_POLL_MAX_WAIT_SEC)] = 0
 ):
     service = AgentService(session)
-    tasks = await service.get_tasks(agent.id)
-    return [TaskResponse.model_validate(t) for t in tasks]
+    tasks = await service.get_tasks(agent.id, wait=wait)
+    # Serialized once here; response_model only documents the shape
+    return json_response(request, dump_json(List[TaskRow], as_rows(tasks, TaskRow)))
@@ -1,11 +1,22 @@
+from datetime import datetime
 from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.services.allocation_service import AllocationService
-from app.schemas.allocation import AllocationCreate, AllocationResponse, AllocationRelease
-from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.fast_json import dump_page
+from app.core.snapshot_cache import snapshot_cache
+from app.schemas.allocation import (
+    AllocationCreate, AllocationResponse, AllocationRelease, AllocationBulkRequest, AllocationBulkResponse, AllocationRow
+)
+from app.schemas.common import Page
+from app.schemas.token import TokenData
+from app.api.deps import get_current_user, get_token_data, load_user
+from app.models.enums import AllocationStatus
 from app.models.user import User
+from app.repositories.allocation import AllocationRepository
+from app.repositories.base import InvalidCursor
 
 router = APIRouter()
 
@@ -22,6 +33,19 @@ async def create_allocation(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", response_model=AllocationBulkResponse)
+async def create_allocations_bulk(
+    bulk_in: AllocationBulkRequest,
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)]
+):
+    if len(bulk_in.items) > settings.ALLOCATION_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {settings.ALLOCATION_BULK_MAX} items per request")
+    service = AllocationService(session)
+    results = await service.allocate_bulk(bulk_in.items, current_user.id)
+    created = sum(r.ok for r in results)
+    return AllocationBulkResponse(created=created, failed=len(results) - created, results=results)
+
 @router.post("/{id}/release", response_model=dict)
 async def release_allocation(
     id: int,
@@ -32,13 +56,30 @@ async def release_allocation(
     await service.release_allocation(id)
     return {"ok": True}
 
-@router.get("/", response_model=List[AllocationResponse])
+@router.get("/", response_model=Page[AllocationResponse])
 async def get_allocations(
-    current_user: Annotated[User, Depends(get_current_user)],
+    request: Request,
+    token_data: Annotated[TokenData, Depends(get_token_data)],
     session: Annotated[AsyncSession, Depends(get_db)],
-    agent_id: int | None = None
+    agent_id: int | None = None,
+    status: Annotated[List[AllocationStatus] | None, Query()] = None,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=settings.PAGE_MAX_LIMIT)] = settings.PAGE_DEFAULT_LIMIT,
 ):
-    from app.repositories.allocation import AllocationRepository
-    repo = AllocationRepository(session)
-    # Filter by current user!
-    return await repo.get_by_user(current_user.id, agent_id)
+    # The user is looked up only to build a body; a 304 needs just the token
+    async def build():
+        current_user = await load_user(session, token_data)
+        repo = AllocationRepository(session)
+        try:
+            # Filter by current user!
+            rows, next_cursor = await repo.list_page_for_user(
+                current_user.id, agent_id, status, from_, to, cursor, limit, as_rows=True
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return dump_page(AllocationRow, [row._asdict() for row in rows], next_cursor)
+
+    # Usernames are unique, so the token's subject scopes the snapshot
+    return await snapshot_cache.respond(request, "allocations", f"user:{token_data.username}", build)
@@ -0,0 +1,118 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Annotated, AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db
+from app.schemas.audit import AuditLogResponse
+from app.schemas.common import Page
+from app.api.deps import get_current_admin
+from app.models.enums import ActorType
+from app.models.user import User
+from app.repositories.audit_log import AuditLogRepository
+from app.repositories.base import InvalidCursor
+
+router = APIRouter()
+
+# Response body is sent in chunks of about this size rather than per row
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+@router.get("/", response_model=Page[AuditLogResponse])
+async def get_audit_logs(
+    current_user: Annotated[User, Depends(get_current_admin)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    actor_type: ActorType | None = None,
+    actor_id: int | None = None,
+    action: str | None = None,
+    target_type: str | None = None,
+    target_id: int | None = None,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=settings.PAGE_MAX_LIMIT)] = settings.PAGE_DEFAULT_LIMIT,
+):
+    repo = AuditLogRepository(session)
+    try:
+        logs, next_cursor = await repo.list_page(
+            actor_type, actor_id, action, target_type, target_id, from_, to, cursor, limit
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Page(items=logs, next_cursor=next_cursor)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def _export_lines(filters: dict) -> AsyncIterator[bytes]:
+    # Own session: the request's (get_db) is closed before the body streams
+    async with AsyncSessionLocal() as session:
+        repo = AuditLogRepository(session)
+        buffer = []
+        size = 0
+        async for row in repo.stream(**filters, chunk_size=settings.AUDIT_EXPORT_CHUNK_ROWS):
+            line = json.dumps(dict(row), default=_json_default, separators=(",", ":")) + "\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                yield "".join(buffer).encode()
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer).encode()
+
+
+async def _gzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_audit_logs(
+    current_user: Annotated[User, Depends(get_current_admin)],
+    actor_type: ActorType | None = None,
+    actor_id: int | None = None,
+    action: str | None = None,
+    target_type: str | None = None,
+    target_id: int | None = None,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+    gzip: bool = False,
+):
+    """
+    Every matching record as NDJSON (one JSON object per line), oldest first,
+    streamed from a server-side cursor: neither side holds the full result
+    in memory. `gzip=true` compresses the stream on the fly into a
+    .ndjson.gz download.
+    """
+    filters = {
+        "actor_type": actor_type,
+        "actor_id": actor_id,
+        "action": action,
+        "target_type": target_type,
+        "target_id": target_id,
+        "created_from": from_,
+        "created_to": to,
+    }
+    filename = f"audit-{datetime.utcnow():%Y%m%dT%H%M%SZ}.ndjson"
+    body = _export_lines(filters)
+    media_type = "application/x-ndjson"
+    if gzip:
+        body = _gzipped(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
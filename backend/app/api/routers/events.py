@@ -0,0 +1,78 @@
+import asyncio
+import json
+from typing import Annotated
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import get_db
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.services.dashboard_events import dashboard_events
+
+router = APIRouter()
+
+
+def _frame(event: str, data, event_id: str | None = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _stream(user_id: int, last_event_id: str | None):
+    # Registered once the response starts, so a client gone before then leaves
+    # nothing behind; still before replaying, so nothing published in between
+    # is missed
+    subscriber = dashboard_events.subscribe(user_id)
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+        if last_event_id:
+            if await dashboard_events.replay(subscriber, last_event_id):
+                # Heartbeat deltas are not replayed: the client refetches the agents
+                yield _frame("resumed", {})
+        else:
+            # Fresh connection: the client loads its lists, deltas follow from here
+            yield _frame("ready", {})
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), settings.SSE_KEEPALIVE_SEC)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            batches, last_id, resync = subscriber.take()
+            if resync:
+                yield _frame("resync", {}, last_id)
+            for kind, deltas in batches:
+                yield _frame(kind, deltas, last_id)
+            # At most SSE_MAX_FLUSHES_PER_SEC writes; deltas arriving meanwhile coalesce
+            await asyncio.sleep(1 / settings.SSE_MAX_FLUSHES_PER_SEC)
+    finally:
+        dashboard_events.unsubscribe(subscriber)
+
+
+@router.get("/")
+async def stream_events(
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    last_event_id: Annotated[str | None, Header()] = None,
+):
+    """
+    Server-sent events for the dashboard: "agent" (status, cpu, mem,
+    last_seen_at changes; every user sees the whole fleet) and "allocation"
+    (the user's own sessions) carry lists of deltas keyed by id. "ready"
+    starts a fresh stream; "resync" means deltas were lost (slow consumer, or
+    Last-Event-ID past the replay buffer) and the lists must be reloaded.
+    "resumed" follows a successful replay, which leaves out heartbeat deltas
+    (cpu, mem, ip, last_seen_at): the agent list should be refetched.
+    """
+    user_id = current_user.id
+    # Authentication was the only query: hand the connection back for the stream's lifetime
+    await session.rollback()
+    return StreamingResponse(
+        _stream(user_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
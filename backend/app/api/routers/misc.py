@@ -1,10 +1,16 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends
+from typing import Annotated, List
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.schemas.common import HealthResponse, PortsAvailableResponse
+from app.schemas.dashboard import DashboardResponse
 from app.repositories.allocation import AllocationRepository
+from app.services.dashboard_service import DashboardService
+from app.api.deps import get_current_admin, get_current_user
+from app.models.enums import AgentStatus
+from app.models.user import User
 
 router = APIRouter()
 
@@ -12,16 +18,33 @@ router = APIRouter()
 async def health_check():
     return HealthResponse(status="ok")
 
+# Query shapes and timings: admins only
+@router.get("/metrics", response_model=dict)
+async def get_metrics(
+    current_user: Annotated[User, Depends(get_current_admin)],
+):
+    return metrics.snapshot()
+
 @router.get("/ports/available", response_model=PortsAvailableResponse)
 async def get_available_ports(
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
     repo = AllocationRepository(session)
-    active_ports = await repo.get_active_ports()
-    allocated_count = len(active_ports)
-    
+    # Counted in MySQL; no need to ship every live port over
+    allocated_count = await repo.count_live()
+
     return PortsAvailableResponse(
         min=settings.PORT_MIN,
         max=settings.PORT_MAX,
         allocated_count=allocated_count
     )
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    current_user: Annotated[User, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    status: Annotated[List[AgentStatus] | None, Query()] = None,
+    limit: Annotated[int, Query(ge=1, le=settings.PAGE_MAX_LIMIT)] = settings.PAGE_DEFAULT_LIMIT,
+):
+    service = DashboardService(session)
+    return await service.get_dashboard(current_user.id, status, limit)
@@ -1,53 +1,53 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Annotated, List
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import get_db
-from app.schemas.task import TaskReport
+from app.schemas.common import Page
+from app.schemas.task import TaskDetail, TaskReport
+from app.services.task_service import TaskService
+from app.api.deps import get_current_admin
+from app.api.deps_agent import get_current_agent
+from app.schemas.agent import AgentIdentity
 from app.models.enums import TaskStatus
+from app.models.user import User
+from app.repositories.base import InvalidCursor
 from app.repositories.task import TaskRepository
 
 router = APIRouter()
 
+# Every agent's tasks, with their owners and ports: admins only
+@router.get("/", response_model=Page[TaskDetail])
+async def get_tasks(
+    current_user: Annotated[User, Depends(get_current_admin)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    agent_id: int | None = None,
+    status: Annotated[List[TaskStatus] | None, Query()] = None,
+    type: str | None = None,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=settings.PAGE_MAX_LIMIT)] = settings.PAGE_DEFAULT_LIMIT,
+):
+    repo = TaskRepository(session)
+    try:
+        tasks, next_cursor = await repo.list_page(agent_id, status, type, from_, to, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Page(items=tasks, next_cursor=next_cursor)
+
 @router.post("/{id}/report", response_model=dict)
 async def report_task(
     id: int,
     report_in: TaskReport,
+    agent: Annotated[AgentIdentity, Depends(get_current_agent)],
     session: Annotated[AsyncSession, Depends(get_db)]
 ):
-    # Note: In a real app, we should verify the agent calling this owns the task
-    repo = TaskRepository(session)
-    task = await repo.get(id)
+    # Only the agent the task was assigned to may report it
+    service = TaskService(session)
+    task = await service.report_task(id, agent.id, report_in)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    status = TaskStatus.DONE if report_in.status == "done" else TaskStatus.FAILED
-    await repo.update(task, {
-        "status": status,
-        "last_error": report_in.message
-    })
-    
-    # If task was start_code_server and done, update allocation status to ACTIVE
-    # If task was stop_code_server and done, update allocation status to RELEASED
-    # This logic should ideally be in a service or event handler
-    if task.type == "start_code_server" and status == TaskStatus.DONE:
-        from app.repositories.allocation import AllocationRepository
-        from app.models.enums import AllocationStatus
-        alloc_repo = AllocationRepository(session)
-        # Extract allocation_id from payload
-        alloc_id = task.payload.get("allocation_id")
-        if alloc_id:
-            alloc = await alloc_repo.get(alloc_id)
-            if alloc:
-                await alloc_repo.update(alloc, {"status": AllocationStatus.ACTIVE})
-
-    elif task.type == "stop_code_server" and status == TaskStatus.DONE:
-        from app.repositories.allocation import AllocationRepository
-        from app.models.enums import AllocationStatus
-        alloc_repo = AllocationRepository(session)
-        alloc_id = task.payload.get("allocation_id")
-        if alloc_id:
-            alloc = await alloc_repo.get(alloc_id)
-            if alloc:
-                await alloc_repo.update(alloc, {"status": AllocationStatus.RELEASED, "released_at": task.updated_at})
 
     return {"ok": True}
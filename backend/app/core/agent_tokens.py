@@ -0,0 +1,73 @@
+import logging
+import time
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+from app.core.security import create_agent_token, decode_agent_token
+
+logger = logging.getLogger(__name__)
+
+# Revocation list lives in Redis so every backend worker sees it.
+#   agent_token:revoked:{jti}            -> a single rotated-out token
+#   agent_token:revoked_before:{agent}   -> every token issued at or before this time (ms)
+# Keys expire together with the longest-lived token they could match.
+#
+# The check fails open: while Redis is unreachable, validly signed tokens are
+# accepted on signature and expiry alone (counted in
+# agent_token_revocation_skipped_total). Tokens live AGENT_TOKEN_EXPIRE_MINUTES,
+# which bounds how long a revoked one can still be used during an outage;
+# failing closed would instead take every agent offline with Redis.
+REVOKED_JTI_KEY = "agent_token:revoked:{jti}"
+REVOKED_BEFORE_KEY = "agent_token:revoked_before:{agent_id}"
+
+
+def issue_agent_token(agent_id: int) -> tuple[str, int]:
+    """Returns (token, expires_in seconds)."""
+    token, claims = create_agent_token(agent_id)
+    return token, claims["exp"] - claims["iat"]
+
+
+async def verify_agent_token(token: str) -> dict | None:
+    claims = decode_agent_token(token)
+    if claims is None:
+        return None
+
+    try:
+        revoked_jti, revoked_before = await redis_client.mget(
+            REVOKED_JTI_KEY.format(jti=claims["jti"]),
+            REVOKED_BEFORE_KEY.format(agent_id=claims["sub"]),
+        )
+    except Exception as e:
+        # Fail open (see above): expiry-only checks until Redis is back
+        metrics.counter("agent_token_revocation_skipped_total").inc()
+        logger.warning("Agent token revocation check skipped: %s", e)
+        return claims
+
+    if revoked_jti:
+        return None
+    # Tokens from before iat_ms count as issued at the end of their second
+    issued_ms = claims.get("iat_ms", claims["iat"] * 1000 + 999)
+    if revoked_before and issued_ms <= int(revoked_before):
+        return None
+    return claims
+
+
+async def revoke_token(claims: dict):
+    ttl = claims["exp"] - int(time.time())
+    if ttl <= 0:
+        return
+    try:
+        await redis_client.set(REVOKED_JTI_KEY.format(jti=claims["jti"]), 1, ex=ttl)
+    except Exception as e:
+        logger.error("Failed to revoke agent token %s: %s", claims["jti"], e)
+
+
+async def revoke_agent_tokens(agent_id: int):
+    try:
+        await redis_client.set(
+            REVOKED_BEFORE_KEY.format(agent_id=agent_id),
+            int(time.time() * 1000),
+            ex=settings.AGENT_TOKEN_EXPIRE_MINUTES * 60,
+        )
+    except Exception as e:
+        logger.error("Failed to revoke tokens of agent %s: %s", agent_id, e)
@@ -1,10 +1,12 @@
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.db_instrumentation import TimedQueuePool, instrument
 
-print(f"DEBUG: DATABASE_URL={settings.DATABASE_URL}")
-
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+engine = create_async_engine(settings.DATABASE_URL, poolclass=TimedQueuePool)
+instrument(engine)
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
@@ -13,3 +15,36 @@ AsyncSessionLocal = sessionmaker(
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+@asynccontextmanager
+async def transaction(session: AsyncSession):
+    """
+    Unit of work. Repositories only flush; the outermost `transaction` block
+    commits once on success or rolls back on error, then runs the callbacks
+    registered with `on_commit`. Nested blocks (a service calling another
+    service) join the enclosing one.
+    """
+    depth = session.info.get("uow_depth", 0)
+    session.info["uow_depth"] = depth + 1
+    try:
+        yield session
+        if depth == 0:
+            await session.commit()
+    except BaseException:
+        if depth == 0:
+            session.info.pop("uow_on_commit", None)
+            await session.rollback()
+        raise
+    finally:
+        session.info["uow_depth"] = depth
+
+    if depth == 0:
+        for callback in session.info.pop("uow_on_commit", []):
+            await callback()
+
+def on_commit(session: AsyncSession, callback: Callable[[], Awaitable[object]]):
+    """
+    Run `callback` once the enclosing `transaction` has committed, e.g. to
+    touch Redis only for rows other workers can already see.
+    """
+    session.info.setdefault("uow_on_commit", []).append(callback)
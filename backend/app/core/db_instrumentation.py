@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Normalized statements longer than this share a fingerprint with their prefix
+MAX_SQL_LABEL = 300
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \((?:\?|%s|%\(\w+\)s)(?:, ?(?:\?|%s|%\(\w+\)s))*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"(\bVALUES \([^()]*\))(?:, ?\([^()]*\))+", re.IGNORECASE)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    db_time: float = 0.0  # seconds spent executing statements
+    pool_wait: float = 0.0  # seconds spent waiting for a pooled connection
+
+
+# Set by QueryStatsMiddleware for the duration of an HTTP request; None elsewhere
+_request_stats: ContextVar[QueryStats | None] = ContextVar("db_request_stats", default=None)
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """
+    Fingerprint of a statement: literals become `?`, IN lists and multi-row
+    VALUES collapse, so `IN (%s, %s)` and `IN (%s, %s, %s)` share a histogram.
+    """
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES_ROWS.sub(r"\1, ...", sql)
+    return sql[:MAX_SQL_LABEL]
+
+
+@lru_cache(maxsize=2048)
+def sql_fingerprint(statement: str) -> str:
+    """
+    Short hash of normalize_sql(statement), the `query` label of
+    db_query_seconds: /metrics is unauthenticated, so it shows no SQL. The
+    statement behind each fingerprint is logged the first time it is seen.
+    """
+    sql = normalize_sql(statement)
+    fingerprint = hashlib.sha1(sql.encode()).hexdigest()[:12]
+    logger.info("SQL fingerprint %s: %s", fingerprint, sql)
+    return fingerprint
+
+
+def _redact(parameters, executemany: bool) -> str:
+    # Types only: values may be password hashes, tokens or user data
+    def shape(params):
+        if isinstance(params, dict):
+            return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+        if isinstance(params, (list, tuple)):
+            return "(" + ", ".join(type(v).__name__ for v in params) + ")"
+        return type(params).__name__
+
+    if executemany and parameters:
+        return f"{len(parameters)} rows of {shape(parameters[0])}"
+    return shape(parameters)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    fingerprint = sql_fingerprint(statement)
+    metrics.histogram("db_query_seconds", {"query": fingerprint}, QUERY_BUCKETS).observe(elapsed)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+    if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        metrics.counter("db_slow_queries_total").inc()
+        logger.warning(
+            "Slow query (%.0f ms) [%s]: %s params=%s",
+            elapsed * 1000, fingerprint, _WHITESPACE.sub(" ", statement).strip(), _redact(parameters, executemany),
+        )
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async pool, plus the time each checkout waited for a
+    connection (queueing behind a full pool, or opening a new one).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            metrics.histogram("db_pool_checkout_wait_seconds", buckets=QUERY_BUCKETS).observe(waited)
+            stats = _request_stats.get()
+            if stats is not None:
+                stats.pool_wait += waited
+
+
+def instrument(engine: AsyncEngine):
+    """Attach statement timing and pool gauges to the engine."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+    def pool_usage(*_):
+        metrics.gauge("db_pool_checked_out").set(sync_engine.pool.checkedout())
+
+    event.listen(sync_engine, "checkout", pool_usage)
+    event.listen(sync_engine, "checkin", pool_usage)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware counting the SQL each HTTP request runs. Feeds the
+    per-route db_queries_per_request / db_time_per_request_seconds metrics
+    and, with DEBUG on, adds X-DB-Queries and X-DB-Time-Ms response headers.
+    Statements run while the body streams are counted in the metrics only.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (b"x-db-queries", str(stats.queries).encode()),
+                    (b"x-db-time-ms", f"{stats.db_time * 1000:.1f}".encode()),
+                    (b"x-db-pool-wait-ms", f"{stats.pool_wait * 1000:.1f}".encode()),
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _request_stats.reset(token)
+            # Route template, not the raw path, to keep the label set small
+            route = scope.get("route")
+            labels = {"route": f"{scope['method']} {getattr(route, 'path', 'unmatched')}"}
+            metrics.histogram("db_queries_per_request", labels, QUERIES_PER_REQUEST_BUCKETS).observe(stats.queries)
+            metrics.histogram("db_time_per_request_seconds", labels, QUERY_BUCKETS).observe(stats.db_time)
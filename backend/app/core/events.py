@@ -0,0 +1,85 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[Any]]
+
+CHANNEL_PREFIX = "events:"
+
+
+class EventBus:
+    """
+    Topic-based events shared by all backend workers.
+
+    publish() goes through Redis pub/sub so subscribers in every worker see
+    the event; each worker runs one listener that dispatches to its local
+    handlers. Without Redis, events are delivered to this worker only.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+        self._listener: asyncio.Task | None = None
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers[topic].append(handler)
+
+    def unsubscribe(self, topic: str, handler: Handler):
+        if handler in self._handlers.get(topic, []):
+            self._handlers[topic].remove(handler)
+
+    async def publish(self, topic: str, data: dict):
+        try:
+            await redis_client.publish(CHANNEL_PREFIX + topic, json.dumps(data, default=str))
+        except Exception as e:
+            logger.warning("Event %s not fanned out, delivering locally: %s", topic, e)
+            await self._dispatch(topic, data)
+
+    async def _dispatch(self, topic: str, data: dict):
+        for handler in list(self._handlers.get(topic, [])):
+            try:
+                await handler(data)
+            except Exception:
+                logger.exception("Event handler for %s failed", topic)
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(), name="event_bus")
+
+    async def stop(self):
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    async def _listen(self):
+        while True:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    topic = message["channel"][len(CHANNEL_PREFIX):]
+                    await self._dispatch(topic, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event listener disconnected, retrying: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+
+
+event_bus = EventBus()
@@ -0,0 +1,125 @@
+import gzip
+from functools import lru_cache
+from typing import Any, Iterable, Mapping
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.schemas.common import Page
+
+try:
+    import orjson
+except ImportError:  # optional; pydantic-core's encoder is close behind
+    orjson = None
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that skips FastAPI's response_model round trip (dump,
+    validate again, jsonable_encoder, json.dumps). Bytes are sent as they
+    are, so endpoints serialize once with a TypeAdapter; anything else goes
+    through orjson when installed, else pydantic-core.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if orjson is not None:
+            return orjson.dumps(content)
+        return to_json(content)
+
+
+@lru_cache(maxsize=None)
+def adapter(tp: Any) -> TypeAdapter:
+    """TypeAdapter for `tp`, built once (building one compiles its schema)."""
+    return TypeAdapter(tp)
+
+
+@lru_cache(maxsize=None)
+def _row_keys(row_type: type) -> tuple[str, ...]:
+    return tuple(row_type.__annotations__)
+
+
+def as_rows(objects: Iterable[Any], row_type: type) -> list[dict]:
+    """
+    ORM objects as plain dicts with the keys of the TypedDict `row_type`,
+    for paths that must load entities anyway (e.g. tasks claimed FOR UPDATE).
+    """
+    keys = _row_keys(row_type)
+    return [{key: getattr(obj, key) for key in keys} for obj in objects]
+
+
+def dump_json(tp: Any, value: Any) -> bytes:
+    """
+    Serialize trusted `value` as `tp` straight to bytes, without validating
+    it: build rows as TypedDicts (see the *Row schemas) and models with
+    model_construct.
+    """
+    return adapter(tp).dump_json(value)
+
+
+def dump_page(row_type: type, items: list[dict], next_cursor: str | None) -> bytes:
+    """A Page of row dicts (see as_rows, Row._asdict) as JSON bytes."""
+    page_type = Page[row_type]
+    return dump_json(page_type, page_type.model_construct(items=items, next_cursor=next_cursor))
+
+
+def _gzip_quality(accept_encoding: str) -> float:
+    quality = 0.0
+    for part in accept_encoding.split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        if coding.lower() not in ("gzip", "*"):
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        # An explicit gzip entry overrides *
+        if coding.lower() == "gzip":
+            return q
+        quality = q
+    return quality
+
+
+def wants_gzip(request: Request, size: int) -> bool:
+    """Whether a body of `size` bytes should go out gzipped to this client."""
+    minimum = settings.JSON_GZIP_MIN_BYTES
+    if not minimum or size < minimum:
+        return False
+    return _gzip_quality(request.headers.get("accept-encoding", "")) > 0
+
+
+def compress(body: bytes) -> bytes:
+    # mtime=0: the same body always compresses to the same bytes
+    return gzip.compress(body, compresslevel=settings.JSON_GZIP_LEVEL, mtime=0)
+
+
+def json_response(
+    request: Request,
+    body: bytes,
+    headers: Mapping[str, str] | None = None,
+    gzipped: bytes | None = None,
+) -> FastJSONResponse:
+    """
+    Send serialized JSON, gzipped when the client accepts it and the body
+    is at least JSON_GZIP_MIN_BYTES. `gzipped` reuses an earlier compression
+    of the same body (see SnapshotCache).
+    """
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    encoding = "identity"
+    if wants_gzip(request, len(body)):
+        body = gzipped if gzipped is not None else compress(body)
+        encoding = headers["Content-Encoding"] = "gzip"
+        # The gzipped representation is only weakly equal to the plain one
+        if "ETag" in headers:
+            headers["ETag"] = "W/" + headers["ETag"]
+    metrics.counter("json_response_bytes_total", {"encoding": encoding}).inc(len(body))
+    return FastJSONResponse(body, headers=headers)
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.security import get_password_hash, verify_password
+
+
+class HashingSaturated(Exception):
+    """Raised when the hashing pool queue is full; mapped to 503 + Retry-After."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def _timed(fn, *args):
+    # Runs inside the worker so the measured time excludes queueing
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop on a bounded thread or process pool.
+
+    At most `workers + max_queue` calls are admitted at once; anything beyond
+    that fails fast with HashingSaturated instead of piling up behind bcrypt.
+    """
+
+    def __init__(self, mode: str, workers: int, max_queue: int, retry_after: int):
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor: Executor | None = None
+        self._inflight = 0
+
+        self._queue_wait = metrics.histogram("password_hash_queue_wait_seconds")
+        self._inflight_gauge = metrics.gauge("password_hash_inflight")
+        self._rejected = metrics.counter("password_hash_rejected_total")
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    async def _run(self, op: str, fn, *args):
+        if self._inflight >= self.workers + self.max_queue:
+            self._rejected.inc()
+            raise HashingSaturated(self.retry_after)
+
+        self._inflight += 1
+        self._inflight_gauge.set(self._inflight)
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_time = await loop.run_in_executor(self._get_executor(), _timed, fn, *args)
+        finally:
+            self._inflight -= 1
+            self._inflight_gauge.set(self._inflight)
+
+        self._queue_wait.observe(max(0.0, time.perf_counter() - submitted - hash_time))
+        metrics.histogram("password_hash_seconds", {"op": op}).observe(hash_time)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    mode=settings.HASH_EXECUTOR,
+    workers=settings.HASH_WORKERS,
+    max_queue=settings.HASH_MAX_QUEUE,
+    retry_after=settings.HASH_RETRY_AFTER_SEC,
+)
@@ -0,0 +1,74 @@
+import logging
+import uuid
+from typing import Awaitable, Callable
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Take the lease if it is free, or extend it if we already hold it
+_ACQUIRE_LUA = """
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# Drop the lease only if we still hold it
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    """
+    Leader election for cluster-wide singleton jobs: a Redis key holding the
+    leader's random id with a TTL. The holder renews it on every run; if it
+    dies, the key expires and another worker takes over within `ttl` seconds.
+    A Redis error means "not leader", so the job pauses rather than running
+    in every worker at once.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.key = f"leader:{name}"
+        self.ttl_ms = int(ttl * 1000)
+        self.holder_id = uuid.uuid4().hex
+        self.is_leader = False
+        self._acquire_script = redis_client.register_script(_ACQUIRE_LUA)
+        self._release_script = redis_client.register_script(_RELEASE_LUA)
+
+    async def acquire(self) -> bool:
+        try:
+            leader = bool(await self._acquire_script(keys=[self.key], args=[self.holder_id, self.ttl_ms]))
+        except Exception as e:
+            logger.warning("Leader lease %s unavailable: %s", self.key, e)
+            leader = False
+        if leader != self.is_leader:
+            logger.info("%s leadership for %s", "Acquired" if leader else "Lost", self.key)
+        self.is_leader = leader
+        return leader
+
+    async def release(self):
+        if not self.is_leader:
+            return
+        try:
+            await self._release_script(keys=[self.key], args=[self.holder_id])
+        except Exception as e:
+            logger.warning("Leader lease %s not released: %s", self.key, e)
+        self.is_leader = False
+
+
+def leader_only(lease: LeaderLease, fn: Callable[[], Awaitable[object]]) -> Callable[[], Awaitable[object]]:
+    """Wrap a PeriodicTask body so it only runs in the worker holding the lease."""
+    async def run():
+        if await lease.acquire():
+            return await fn()
+    return run
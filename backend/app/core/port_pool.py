@@ -0,0 +1,127 @@
+import logging
+from app.core.config import settings
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class PortPoolUnavailable(Exception):
+    """Redis could not be reached; the caller has to pick a port some other way."""
+
+
+class PortPool:
+    """
+    Free remote ports of one frps server, kept as a Redis SET.
+
+    SPOP hands out a random free port and SADD gives it back, both O(1) and
+    atomic across workers, so allocation cost no longer depends on how many
+    sessions are live. The set is rebuilt from the DB at startup and then
+    reconciled with it periodically (both by the leader only); the unique
+    index on live allocation ports stays the final guard against a stale pool.
+    """
+
+    def __init__(self, server: str, port_min: int, port_max: int):
+        self.server = server
+        self.port_min = port_min
+        self.port_max = port_max
+        self.key = f"ports:free:{server}"
+        # Discrepancies seen by the previous reconcile(), acted on if they persist
+        self._missing: set[int] = set()
+        self._stale: set[int] = set()
+
+    def __contains__(self, port: int) -> bool:
+        return self.port_min <= port <= self.port_max
+
+    async def acquire(self) -> int | None:
+        """A free port, or None when the pool is exhausted."""
+        try:
+            port = await redis_client.spop(self.key)
+        except Exception as e:
+            raise PortPoolUnavailable(str(e)) from e
+        return int(port) if port is not None else None
+
+    async def acquire_many(self, count: int) -> list[int]:
+        """Up to count free ports in one round trip; fewer if the pool runs low."""
+        try:
+            ports = await redis_client.spop(self.key, count)
+        except Exception as e:
+            raise PortPoolUnavailable(str(e)) from e
+        return [int(p) for p in ports or ()]
+
+    async def release(self, *ports: int):
+        ports = [p for p in ports if p in self]
+        if not ports:
+            return
+        try:
+            await redis_client.sadd(self.key, *ports)
+        except Exception as e:
+            # The port stays out of the pool until reconcile() puts it back
+            logger.warning("Ports %s not returned to pool %s: %s", ports, self.server, e)
+
+    async def free_count(self) -> int | None:
+        try:
+            return await redis_client.scard(self.key)
+        except Exception as e:
+            logger.warning("Port pool %s unavailable: %s", self.server, e)
+            return None
+
+    async def rebuild(self, used_ports: list[int]):
+        """Reset the pool to every port in range not in used_ports (startup)."""
+        free = sorted(set(range(self.port_min, self.port_max + 1)) - set(used_ports))
+        tmp_key = self.key + ":rebuild"
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(tmp_key)
+                for i in range(0, len(free), 1000):
+                    pipe.sadd(tmp_key, *free[i:i + 1000])
+                # RENAME swaps the new set in atomically; an empty pool has no key
+                if free:
+                    pipe.rename(tmp_key, self.key)
+                else:
+                    pipe.delete(self.key)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Port pool %s not rebuilt: %s", self.server, e)
+            return
+        logger.info("Port pool %s rebuilt: %d free, %d in use", self.server, len(free), len(used_ports))
+
+
+    async def reconcile(self, used_ports: list[int]) -> tuple[int, int]:
+        """
+        Put back free ports missing from the set (a release whose SADD failed)
+        and take out ports the DB says are live or that the range no longer
+        covers. A port is only touched once two runs in a row disagree with
+        the DB, which leaves alone ports caught between SPOP and their
+        allocation's commit, or between a release's commit and its SADD.
+        Returns (returned, removed).
+        """
+        try:
+            members = {int(p) for p in await redis_client.smembers(self.key)}
+        except Exception as e:
+            logger.warning("Port pool %s not reconciled: %s", self.server, e)
+            return 0, 0
+        used, ports = set(used_ports), set(range(self.port_min, self.port_max + 1))
+        missing = ports - used - members
+        stale = (members & used) | (members - ports)
+        returned, removed = sorted(missing & self._missing), sorted(stale & self._stale)
+        self._missing, self._stale = missing, stale
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for i in range(0, len(returned), 1000):
+                    pipe.sadd(self.key, *returned[i:i + 1000])
+                for i in range(0, len(removed), 1000):
+                    pipe.srem(self.key, *removed[i:i + 1000])
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Port pool %s not reconciled: %s", self.server, e)
+            return 0, 0
+        if returned or removed:
+            logger.warning(
+                "Port pool %s reconciled: %d free ports returned, %d live ports removed",
+                self.server, len(returned), len(removed),
+            )
+        return len(returned), len(removed)
+
+
+# Allocations are published through the one configured frps server
+port_pool = PortPool(settings.FRP_SERVER_ADDR, settings.PORT_MIN, settings.PORT_MAX)
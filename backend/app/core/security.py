@@ -1,11 +1,15 @@
+import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Any, Union
-from jose import jwt
+from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+AGENT_TOKEN_TYPE = "agent"
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -21,3 +25,32 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+def create_agent_token(agent_id: int, expires_delta: timedelta = None) -> tuple[str, dict]:
+    """Issue an HMAC-signed agent token. Returns the token and its claims."""
+    now_ms = int(time.time() * 1000)
+    now = now_ms // 1000
+    if expires_delta is None:
+        expires_delta = timedelta(minutes=settings.AGENT_TOKEN_EXPIRE_MINUTES)
+
+    claims = {
+        "sub": str(agent_id),
+        "typ": AGENT_TOKEN_TYPE,
+        "jti": secrets.token_urlsafe(12),
+        "iat": now,
+        # iat in milliseconds, for revoke_agent_tokens: a whole second is too coarse
+        "iat_ms": now_ms,
+        "exp": now + int(expires_delta.total_seconds()),
+    }
+    token = jwt.encode(claims, settings.AGENT_TOKEN_SECRET, algorithm=settings.ALGORITHM)
+    return token, claims
+
+def decode_agent_token(token: str) -> dict | None:
+    """Check signature, expiry and token type. Returns the claims or None."""
+    try:
+        claims = jwt.decode(token, settings.AGENT_TOKEN_SECRET, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if claims.get("typ") != AGENT_TOKEN_TYPE or not str(claims.get("sub", "")).isdigit():
+        return None
+    return claims
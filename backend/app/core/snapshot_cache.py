@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from fastapi import Request, Response
+from app.core.config import settings
+from app.core.fast_json import compress, json_response, wants_gzip
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = "snapshot:version:"
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as for GET: a proxy may have added W/
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+class SnapshotCache:
+    """
+    Versioned cache of serialized list responses, one version counter per
+    resource ("agents", "allocations") in Redis. Every committed write to the
+    resource's table bumps it (BaseRepository.changed), so all workers see a
+    change at once.
+
+    List responses carry an ETag built from the version and the request's
+    query. A poll whose If-None-Match still matches is answered 304 after a
+    single Redis GET: no list query, no serialization. Otherwise the body
+    serialized for the current version is reused from this worker's memory
+    until the version moves on, and so is its gzipped form once a client has
+asked for it.
+
+    Resources listed in `max_age` also get a new version every that many
+    seconds: columns written without a bump (heartbeat-driven last_seen_at,
+    cpu, mem) are at most that stale. Without Redis there is no version, and
+    responses are built and sent uncached.
+    """
+
+    def __init__(self, max_entries: int, max_age: dict[str, float]):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        # key -> (etag, body, gzipped body or None), least recently used first
+        self._entries: OrderedDict[str, tuple[str, bytes, bytes | None]] = OrderedDict()
+
+    async def version(self, resource: str) -> str | None:
+        key = VERSION_KEY_PREFIX + resource
+        try:
+            counter = await redis_client.get(key)
+            if counter is None:
+                # A fresh (or flushed) Redis must not restart at a version clients still hold
+                await redis_client.set(key, secrets.randbelow(2 ** 31), nx=True)
+                counter = await redis_client.get(key)
+        except Exception as e:
+            logger.warning("Snapshot version of %s unavailable, not caching: %s", resource, e)
+            return None
+        max_age = self.max_age.get(resource)
+        if max_age:
+            return f"{counter}.{int(time.time() // max_age)}"
+        return str(counter)
+
+    async def bump(self, *resources: str):
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for resource in resources:
+                    pipe.incr(VERSION_KEY_PREFIX + resource)
+                await pipe.execute()
+        except Exception as e:
+            # Other workers keep serving their snapshot until the next successful bump
+            logger.warning("Snapshot version of %s not bumped: %s", ", ".join(resources), e)
+            self._entries.clear()
+
+    async def respond(
+        self, request: Request, resource: str, scope: str, build: Callable[[], Awaitable[bytes]]
+    ) -> Response:
+        """
+        JSON response for a list endpoint. `scope` separates callers who see
+        different rows for the same query (e.g. the user id); `build` runs
+        the queries and returns the serialized body, and is only awaited
+        when there is no usable snapshot.
+        """
+        version = await self.version(resource)
+        if version is None:
+            metrics.counter("snapshot_requests_total", {"resource": resource, "result": "uncached"}).inc()
+            return json_response(request, await build())
+
+        key = f"{resource}:{scope}:{request.url.query}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        etag = f'"{resource}-{version}-{digest}"'
+        # no-cache: the browser may store the body but must revalidate every time
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            metrics.counter("snapshot_requests_total", {"resource": resource, "result": "not_modified"}).inc()
+            return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == etag:
+            self._entries.move_to_end(key)
+            _, body, gzipped = cached
+            result = "hit"
+        else:
+            body, gzipped = await build(), None
+            result = "miss"
+        # Compress once per version, not once per response
+        if gzipped is None and wants_gzip(request, len(body)):
+            gzipped = compress(body)
+        self._entries[key] = (etag, body, gzipped)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        metrics.counter("snapshot_requests_total", {"resource": resource, "result": result}).inc()
+        return json_response(request, body, headers, gzipped)
+
+
+snapshot_cache = SnapshotCache(
+    max_entries=settings.SNAPSHOT_CACHE_MAX_ENTRIES,
+    max_age={"agents": settings.SNAPSHOT_AGENTS_MAX_AGE_SEC},
+)
@@ -0,0 +1,75 @@
+import logging
+import time
+from datetime import datetime, timezone
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Bit N set = agent N may have PENDING tasks
+PENDING_BITMAP_KEY = "tasks:pending"
+# Sorted set: member = agent_id, score = unix time its next backed-off task is due
+PENDING_DELAYED_KEY = "tasks:pending:delayed"
+
+
+class PendingTaskIndex:
+    """
+    Per-agent "has pending work" bitmap in Redis. A clear bit lets a poll answer
+    [] without querying MySQL. A set bit may be stale; the poll then falls
+    through to the DB and clears it. Agents whose tasks are all backing off
+    are kept in a sorted set instead, by due time, so their polls stay off
+    the DB until then. Any Redis error is treated as "maybe pending", so
+    correctness never depends on Redis.
+    """
+
+    async def mark(self, agent_id: int):
+        try:
+            await redis_client.setbit(PENDING_BITMAP_KEY, agent_id, 1)
+        except Exception as e:
+            logger.warning("Pending index not updated for agent %s: %s", agent_id, e)
+
+    async def mark_at(self, agent_id: int, due: datetime):
+        """Pending from `due` (naive UTC) on: the agent's tasks are backing off until then."""
+        try:
+            await redis_client.zadd(PENDING_DELAYED_KEY, {agent_id: due.replace(tzinfo=timezone.utc).timestamp()})
+        except Exception as e:
+            logger.warning("Pending index not updated for agent %s: %s", agent_id, e)
+
+    async def clear(self, agent_id: int):
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.setbit(PENDING_BITMAP_KEY, agent_id, 0)
+                pipe.zrem(PENDING_DELAYED_KEY, agent_id)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Pending index not cleared for agent %s: %s", agent_id, e)
+
+    async def has_pending(self, agent_id: int) -> bool:
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.getbit(PENDING_BITMAP_KEY, agent_id)
+                pipe.zscore(PENDING_DELAYED_KEY, agent_id)
+                bit, due = await pipe.execute()
+        except Exception as e:
+            logger.warning("Pending index unavailable, querying the DB: %s", e)
+            return True
+        return bool(bit) or (due is not None and due <= time.time())
+
+    async def rebuild(self, agent_ids: list[int]):
+        """Set bits for agents known to have PENDING tasks (startup)."""
+        if not agent_ids:
+            return
+        tmp_key = PENDING_BITMAP_KEY + ":rebuild"
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(tmp_key)
+                for agent_id in agent_ids:
+                    pipe.setbit(tmp_key, agent_id, 1)
+                # OR into the live key: bits set concurrently by other workers survive
+                pipe.bitop("OR", PENDING_BITMAP_KEY, PENDING_BITMAP_KEY, tmp_key)
+                pipe.delete(tmp_key)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Pending index not rebuilt: %s", e)
+
+
+pending_index = PendingTaskIndex()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Enum, Float
+from sqlalchemy import Column, Integer, String, DateTime, func, Enum, Float, Index
 from app.models.base import Base
 from app.models.enums import AgentStatus
 
@@ -15,3 +15,8 @@ class Agent(Base):
     last_seen_at = Column(DateTime(timezone=True), nullable=True)
     status = Column(Enum(AgentStatus), default=AgentStatus.OFFLINE)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Agent list filtered by status, paged by id (InnoDB appends the primary key)
+        Index("ix_agents_status", "status"),
+    )
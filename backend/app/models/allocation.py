@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, func, Enum, ForeignKey, Index, Computed
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 from app.models.enums import AllocationStatus
@@ -10,12 +10,37 @@ class Allocation(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True) # TODO: Make nullable=False after migration
     agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
     service = Column(String(100), nullable=False)
-    remote_port = Column(Integer, unique=True, nullable=False)
+    remote_port = Column(Integer, nullable=False)
     status = Column(Enum(AllocationStatus), default=AllocationStatus.REQUESTED)
     password_hash = Column(String(255), nullable=True)
+    # code-server login for the session, shown to its owner. Generated with the
+    # allocation; an agent that hands over a warm slot reports that slot's own.
+    password = Column(String(64), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     released_at = Column(DateTime(timezone=True), nullable=True)
     error_msg = Column(String(255), nullable=True)
+    # remote_port while the allocation holds it, NULL once released or failed.
+    # Its unique index lets released ports be reused while two live
+    # allocations can never share one, whatever the port pool hands out.
+    active_port = Column(
+        Integer,
+        Computed(
+            "CASE WHEN status IN ('REQUESTED', 'STARTING', 'ACTIVE', 'RELEASING') THEN remote_port END",
+            persisted=True,
+        ),
+        unique=True,
+    )
 
     agent = relationship("Agent")
+
+    __table_args__ = (
+        # Covering index for get_active_ports: status IN (...) -> remote_port
+        Index("ix_allocations_status_remote_port", "status", "remote_port"),
+        # Covering index for the dashboard's live count GROUP BY agent_id, status
+        Index("ix_allocations_status_agent_id", "status", "agent_id"),
+        # User's list: user_id = ? [AND agent_id = ?] ORDER BY id (InnoDB appends the primary key)
+        Index("ix_allocations_user_id_agent_id", "user_id", "agent_id"),
+        Index("ix_allocations_user_id_id", "user_id", "id"),
+        Index("ix_allocations_user_id_status", "user_id", "status"),
+    )
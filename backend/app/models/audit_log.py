@@ -1,15 +1,30 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Enum, JSON
+from sqlalchemy import Column, Integer, String, DateTime, func, Enum, JSON, Index
 from app.models.base import Base
 from app.models.enums import ActorType
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     actor_type = Column(Enum(ActorType), nullable=False)
     actor_id = Column(Integer, nullable=False)
     action = Column(String(100), nullable=False)
     target_type = Column(String(100), nullable=True)
     target_id = Column(Integer, nullable=True)
     meta = Column(JSON, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Part of the primary key because MySQL requires the partitioning column in
+    # every unique key; ids stay unique on their own (AUTO_INCREMENT)
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+    __table_args__ = (
+        # Secondary indexes carry the primary key, so each also serves ORDER BY id
+        Index("ix_audit_logs_created_at", "created_at"),
+        Index("ix_audit_logs_actor", "actor_type", "actor_id"),
+        Index("ix_audit_logs_target", "target_type", "target_id"),
+        {
+            # Monthly partitions are added ahead of time and dropped after the
+            # retention window by app.services.audit_retention; a fresh table
+            # starts with the catch-all partition only
+            "mysql_partition_by": "RANGE (TO_DAYS(created_at)) (PARTITION pmax VALUES LESS THAN MAXVALUE)",
+        },
+    )
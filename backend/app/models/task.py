@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, func, Enum, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 from app.models.enums import TaskStatus
@@ -14,5 +14,21 @@ class Task(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_error = Column(String(255), nullable=True)
+    # Claim protocol: a DISPATCHED task is leased to its agent until lease_expires_at;
+    # expired leases go back to PENDING, not claimable again before available_at
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    available_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
 
     agent = relationship("Agent")
+
+    __table_args__ = (
+        # Poll/claim: agent_id = ? AND status = 'pending' AND available_at <= ?
+        Index("ix_tasks_agent_id_status", "agent_id", "status", "available_at"),
+        # Lease reaper: status = 'dispatched' AND lease_expires_at < ?
+        Index("ix_tasks_status_lease_expires_at", "status", "lease_expires_at"),
+        # Compaction: status IN ('done', 'failed') AND updated_at < ?
+        Index("ix_tasks_status_updated_at", "status", "updated_at"),
+        # Task list for one agent, paged by id
+        Index("ix_tasks_agent_id_id", "agent_id", "id"),
+    )
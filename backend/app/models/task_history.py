@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, func, Enum, JSON, Index
+from app.models.base import Base
+from app.models.enums import TaskStatus
+
+class TaskHistory(Base):
+    """Finished tasks moved out of `tasks` by compaction; ids are kept."""
+    __tablename__ = "task_history"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    # No FK: history outlives deleted agents
+    agent_id = Column(Integer, nullable=False)
+    type = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=True)
+    status = Column(Enum(TaskStatus), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(255), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_task_history_agent_id_created_at", "agent_id", "created_at"),
+    )
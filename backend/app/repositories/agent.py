@@ -1,12 +1,109 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Row, select, update, case, func, and_
 from app.models.agent import Agent
+from app.models.allocation import Allocation
+from app.models.enums import AgentStatus
 from app.repositories.base import BaseRepository
+from app.repositories.allocation import LIVE_STATUSES
+
+# Rows per bulk UPDATE statement
+BULK_UPDATE_CHUNK = 1000
+
+# What list_page(as_rows=True) selects: the fields of schemas.agent.AgentRow
+LIST_COLUMNS = (Agent.name, Agent.id, Agent.status, Agent.last_seen_at, Agent.ip, Agent.cpu, Agent.mem)
 
 class AgentRepository(BaseRepository[Agent]):
+    # Heartbeat columns are not bumped for; SNAPSHOT_AGENTS_MAX_AGE_SEC bounds them
+    snapshot = "agents"
+
     def __init__(self, session: AsyncSession):
         super().__init__(Agent, session)
 
     async def get_by_name(self, name: str) -> Agent | None:
         result = await self.session.execute(select(Agent).where(Agent.name == name))
         return result.scalars().first()
+
+    async def list_page(
+        self,
+        statuses: List[AgentStatus] | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+        as_rows: bool = False,
+    ) -> Tuple[List[Agent] | List[Row], str | None]:
+        """Agents in registration order (oldest first); LIST_COLUMNS rows with `as_rows`."""
+        filters = self.created_between(created_from, created_to)
+        if statuses:
+            filters.append(Agent.status.in_(statuses))
+        return await self.get_page(
+            *filters, cursor=cursor, limit=limit, descending=False, columns=LIST_COLUMNS if as_rows else None
+        )
+
+    async def get_existing_ids(self, ids: List[int]) -> set[int]:
+        result = await self.session.execute(select(Agent.id).where(Agent.id.in_(ids)))
+        return set(result.scalars().all())
+
+    async def get_online_capacity(self) -> List[Tuple[int, float | None, float | None, datetime | None, int]]:
+        """(agent_id, cpu, mem, last_seen_at, live allocation count) for every ONLINE agent."""
+        result = await self.session.execute(
+            select(Agent.id, Agent.cpu, Agent.mem, Agent.last_seen_at, func.count(Allocation.id))
+            .outerjoin(Allocation, and_(Allocation.agent_id == Agent.id, Allocation.status.in_(LIVE_STATUSES)))
+            .where(Agent.status == AgentStatus.ONLINE)
+            .group_by(Agent.id)
+        )
+        return result.all()
+
+    async def get_online_last_seen(self) -> List[Tuple[int, datetime | None]]:
+        result = await self.session.execute(
+            select(Agent.id, Agent.last_seen_at).where(Agent.status == AgentStatus.ONLINE)
+        )
+        return result.all()
+
+    async def get_stale_online_ids(self, cutoff: datetime, limit: int = 1000) -> List[int]:
+        result = await self.session.execute(
+            select(Agent.id)
+            .where(Agent.status == AgentStatus.ONLINE, Agent.last_seen_at < cutoff)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def mark_offline(self, ids: List[int]):
+        await self.session.execute(
+            update(Agent)
+            .where(Agent.id.in_(ids), Agent.status == AgentStatus.ONLINE)
+            .values(status=AgentStatus.OFFLINE)
+            .execution_options(synchronize_session=False)
+        )
+        self.changed()
+
+    async def bulk_update_heartbeats(self, beats: Dict[int, Dict[str, Any]]):
+        """
+        Apply buffered heartbeats ({agent_id: {last_seen_at, ip, cpu, mem}}) with one
+        UPDATE ... SET col = CASE id ... END statement per chunk. A None cpu/mem keeps
+        the stored value.
+        """
+        ids = list(beats)
+        for i in range(0, len(ids), BULK_UPDATE_CHUNK):
+            chunk = ids[i:i + BULK_UPDATE_CHUNK]
+
+            def column_case(field: str, column):
+                whens = {aid: beats[aid][field] for aid in chunk if beats[aid][field] is not None}
+                if not whens:
+                    return column
+                return case(whens, value=Agent.id, else_=column)
+
+            await self.session.execute(
+                update(Agent)
+                .where(Agent.id.in_(chunk))
+                .values(
+                    last_seen_at=column_case("last_seen_at", Agent.last_seen_at),
+                    ip=column_case("ip", Agent.ip),
+                    cpu=column_case("cpu", Agent.cpu),
+                    mem=column_case("mem", Agent.mem),
+                    status=AgentStatus.ONLINE,
+                )
+                .execution_options(synchronize_session=False)
+            )
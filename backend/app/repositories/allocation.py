@@ -1,33 +1,140 @@
-from typing import List
+from datetime import datetime
+from typing import List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, insert, or_, and_, func, text, null, Row
+from app.models.agent import Agent
 from app.models.allocation import Allocation
 from app.models.enums import AllocationStatus
 from app.repositories.base import BaseRepository
 
+# A port stays bound on its agent until the stop task completes, so RELEASING is still in use
+LIVE_STATUSES = [AllocationStatus.REQUESTED, AllocationStatus.STARTING, AllocationStatus.ACTIVE, AllocationStatus.RELEASING]
+
+# What list_page_for_user(as_rows=True) selects: the fields of schemas.allocation.AllocationRow.
+# access_url is not stored (the response field is always null).
+LIST_COLUMNS = (
+    Allocation.service, Allocation.id, Allocation.agent_id, Allocation.remote_port, Allocation.status,
+    null().label("access_url"), Allocation.password, Allocation.created_at,
+)
+
 class AllocationRepository(BaseRepository[Allocation]):
+    snapshot = "allocations"
+
     def __init__(self, session: AsyncSession):
         super().__init__(Allocation, session)
 
-    async def delete_by_agent(self, agent_id: int):
+    async def delete_by_agent(self, agent_id: int) -> List[int]:
+        """Delete the agent's allocations; returns the ports that were still live."""
+        result = await self.session.execute(
+            select(Allocation.remote_port).where(Allocation.agent_id == agent_id, Allocation.status.in_(LIVE_STATUSES))
+        )
+        ports = result.scalars().all()
         await self.session.execute(delete(Allocation).where(Allocation.agent_id == agent_id))
-        await self.session.commit()
+        self.changed()
+        return ports
+
+    async def update_status(self, ids: List[int], status: AllocationStatus, only_from: AllocationStatus | None = None):
+        query = update(Allocation).where(Allocation.id.in_(ids))
+        if only_from is not None:
+            query = query.where(Allocation.status == only_from)
+        await self.session.execute(query.values(status=status).execution_options(synchronize_session=False))
+        self.changed()
+
+    async def insert_many(self, rows: List[dict]) -> List[Allocation]:
+        """
+        One multi-row INSERT inside the caller's transaction (no commit). MySQL
+        has no RETURNING, so the new rows are read back by their live ports.
+        """
+        await self.session.execute(insert(Allocation), rows)
+        self.changed()
+        result = await self.session.execute(
+            select(Allocation).where(Allocation.active_port.in_([r["remote_port"] for r in rows]))
+        )
+        return result.scalars().all()
+
+    async def get_live_ports(self, ports: List[int]) -> List[int]:
+        result = await self.session.execute(select(Allocation.active_port).where(Allocation.active_port.in_(ports)))
+        return result.scalars().all()
+
+    async def get_stuck(self, timeouts: dict[AllocationStatus, int], limit: int) -> List[Allocation]:
+        """
+        Allocations that have sat in a transient status longer than its timeout
+        (seconds since the last status change), locked for the caller's transaction.
+        """
+        changed_at = func.coalesce(Allocation.updated_at, Allocation.created_at)
+        # Cutoffs computed by MySQL, since the timestamps come from its NOW()
+        stuck = [
+            and_(Allocation.status == status, changed_at < func.timestampadd(text("SECOND"), -seconds, func.now()))
+            for status, seconds in timeouts.items()
+        ]
+        result = await self.session.execute(
+            select(Allocation)
+            .where(or_(*stuck))
+            .order_by(Allocation.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return result.scalars().all()
 
     async def get_active_ports(self) -> List[int]:
         result = await self.session.execute(
-            select(Allocation.remote_port).where(
-                Allocation.status.in_([AllocationStatus.ACTIVE, AllocationStatus.STARTING, AllocationStatus.REQUESTED])
-            )
+            select(Allocation.remote_port).where(Allocation.status.in_(LIVE_STATUSES))
         )
         return result.scalars().all()
 
+    async def count_live(self, agent_id: int | None = None) -> int:
+        query = select(func.count()).select_from(Allocation).where(Allocation.status.in_(LIVE_STATUSES))
+        if agent_id is not None:
+            query = query.where(Allocation.agent_id == agent_id)
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def count_live_by_agent_status(self) -> List[Tuple[int, AllocationStatus, int]]:
+        """(agent_id, status, count) of live allocations, counted in MySQL (index-only on status, agent_id)."""
+        result = await self.session.execute(
+            select(Allocation.agent_id, Allocation.status, func.count())
+            .where(Allocation.status.in_(LIVE_STATUSES))
+            .group_by(Allocation.agent_id, Allocation.status)
+        )
+        return result.all()
+
+    async def list_for_user_with_agent_names(
+        self, user_id: int, statuses: List[AllocationStatus], limit: int
+    ) -> List[Row]:
+        """The user's allocations in `statuses`, newest first, as column rows with agent_name."""
+        result = await self.session.execute(
+            select(
+                Allocation.id, Allocation.agent_id, Agent.name.label("agent_name"), Allocation.service,
+                Allocation.remote_port, Allocation.status, Allocation.password, Allocation.created_at,
+            )
+            .join(Agent, Agent.id == Allocation.agent_id)
+            .where(Allocation.user_id == user_id, Allocation.status.in_(statuses))
+            .order_by(Allocation.id.desc())
+            .limit(limit)
+        )
+        return result.all()
+
     async def get_by_agent(self, agent_id: int) -> List[Allocation]:
         result = await self.session.execute(select(Allocation).where(Allocation.agent_id == agent_id))
         return result.scalars().all()
 
-    async def get_by_user(self, user_id: int, agent_id: int | None = None) -> List[Allocation]:
-        query = select(Allocation).where(Allocation.user_id == user_id)
+    async def list_page_for_user(
+        self,
+        user_id: int,
+        agent_id: int | None = None,
+        statuses: List[AllocationStatus] | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+        as_rows: bool = False,
+    ) -> tuple[List[Allocation] | List[Row], str | None]:
+        """The user's allocations, newest first; LIST_COLUMNS rows with `as_rows`."""
+        filters = [Allocation.user_id == user_id, *self.created_between(created_from, created_to)]
         if agent_id:
-            query = query.where(Allocation.agent_id == agent_id)
-        result = await self.session.execute(query)
-        return result.scalars().all()
+            filters.append(Allocation.agent_id == agent_id)
+        if statuses:
+            filters.append(Allocation.status.in_(statuses))
+        return await self.get_page(
+            *filters, cursor=cursor, limit=limit, columns=LIST_COLUMNS if as_rows else None
+        )
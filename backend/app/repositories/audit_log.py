@@ -0,0 +1,136 @@
+from datetime import date, datetime
+from typing import AsyncIterator, List, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, text
+from app.models.audit_log import AuditLog
+from app.models.enums import ActorType
+from app.repositories.base import BaseRepository
+
+# Catch-all partition that new monthly partitions are split off from
+MAXVALUE_PARTITION = "pmax"
+
+
+class AuditLogRepository(BaseRepository[AuditLog]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(AuditLog, session)
+
+    def _filters(
+        self,
+        actor_type: ActorType | None,
+        actor_id: int | None,
+        action: str | None,
+        target_type: str | None,
+        target_id: int | None,
+        created_from: datetime | None,
+        created_to: datetime | None,
+    ) -> list:
+        # Each combination is served by ix_audit_logs_actor / _target / _created_at
+        filters = self.created_between(created_from, created_to)
+        if actor_type is not None:
+            filters.append(AuditLog.actor_type == actor_type)
+        if actor_id is not None:
+            filters.append(AuditLog.actor_id == actor_id)
+        if action:
+            filters.append(AuditLog.action == action)
+        if target_type:
+            filters.append(AuditLog.target_type == target_type)
+        if target_id is not None:
+            filters.append(AuditLog.target_id == target_id)
+        return filters
+
+    async def list_page(
+        self,
+        actor_type: ActorType | None = None,
+        actor_id: int | None = None,
+        action: str | None = None,
+        target_type: str | None = None,
+        target_id: int | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ) -> Tuple[List[AuditLog], str | None]:
+        """Audit records, newest first."""
+        filters = self._filters(actor_type, actor_id, action, target_type, target_id, created_from, created_to)
+        return await self.get_page(*filters, cursor=cursor, limit=limit)
+
+    async def stream(
+        self,
+        actor_type: ActorType | None = None,
+        actor_id: int | None = None,
+        action: str | None = None,
+        target_type: str | None = None,
+        target_id: int | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[dict]:
+        """
+        Every matching record, oldest first, as column dicts. Read through a
+        server-side cursor `chunk_size` rows at a time, so memory stays flat
+        however many rows match; the connection is held until the iterator
+        is exhausted or closed.
+        """
+        filters = self._filters(actor_type, actor_id, action, target_type, target_id, created_from, created_to)
+        result = await self.session.stream(
+            select(AuditLog.__table__).where(*filters).order_by(AuditLog.id.asc())
+            .execution_options(yield_per=chunk_size)
+        )
+        async for row in result.mappings():
+            yield row
+
+    # Partition maintenance (RANGE on TO_DAYS(created_at), one partition per month)
+
+    async def get_partitions(self) -> List[Tuple[str, str]]:
+        """(name, upper bound expression) of each partition in order; empty if the table is not partitioned."""
+        result = await self.session.execute(
+            text(
+                "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS"
+                " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+                " ORDER BY PARTITION_ORDINAL_POSITION"
+            ),
+            {"table": AuditLog.__tablename__},
+        )
+        return [(name, description) for name, description in result.all()]
+
+    async def oldest_in_partition(self, name: str) -> datetime | None:
+        result = await self.session.execute(text(
+            f"SELECT MIN(created_at) FROM {AuditLog.__tablename__} PARTITION ({name})"
+        ))
+        return result.scalar()
+
+    async def add_partitions(self, bounds: List[Tuple[str, date]]):
+        """
+        Split (name, exclusive upper bound) partitions off the catch-all
+        partition. Cheap as long as nothing has been written past the last
+        bound yet, which is why they are created ahead of time; otherwise
+        REORGANIZE copies the catch-all partition's rows.
+        """
+        definitions = ", ".join(
+            f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{bound:%Y-%m-%d}'))" for name, bound in bounds
+        )
+        await self.session.execute(text(
+            f"ALTER TABLE {AuditLog.__tablename__} REORGANIZE PARTITION {MAXVALUE_PARTITION} INTO"
+            f" ({definitions}, PARTITION {MAXVALUE_PARTITION} VALUES LESS THAN MAXVALUE)"
+        ))
+
+    async def drop_partitions(self, names: List[str]):
+        """Drop whole partitions: metadata-only, no per-row delete or undo log."""
+        await self.session.execute(text(
+            f"ALTER TABLE {AuditLog.__tablename__} DROP PARTITION {', '.join(names)}"
+        ))
+
+    async def delete_before(self, cutoff: datetime, batch: int) -> int:
+        """Row-by-row fallback for an unpartitioned table: delete up to `batch` rows older than `cutoff`."""
+        result = await self.session.execute(
+            select(AuditLog.id)
+            .where(AuditLog.created_at < cutoff)
+            .order_by(AuditLog.created_at)
+            .limit(batch)
+        )
+        ids = result.scalars().all()
+        if ids:
+            await self.session.execute(
+                delete(AuditLog).where(AuditLog.created_at < cutoff, AuditLog.id.in_(ids))
+            )
+        return len(ids)
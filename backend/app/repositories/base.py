@@ -1,11 +1,48 @@
-from typing import Generic, TypeVar, Type, Optional, List, Any
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import Generic, TypeVar, Type, Optional, List, Any, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import Row, select, update, delete
+from app.core.database import on_commit
+from app.core.snapshot_cache import snapshot_cache
 from app.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+
+class InvalidCursor(ValueError):
+    """A page cursor that was not issued by get_page (or was tampered with)."""
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(raw)["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(last_id, int):
+        raise InvalidCursor("Invalid cursor")
+    return last_id
+
+
+def naive_utc(dt: datetime) -> datetime:
+    # Stored timestamps are naive UTC
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
 class BaseRepository(Generic[ModelType]):
+    # Snapshot cache resource listing this model, if any (app.core.snapshot_cache)
+    snapshot: str | None = None
+
     def __init__(self, model: Type[ModelType], session: AsyncSession):
         self.model = model
         self.session = session
@@ -14,28 +51,85 @@ class BaseRepository(Generic[ModelType]):
         result = await self.session.execute(select(self.model).where(self.model.id == id))
         return result.scalars().first()
 
-    async def get_all(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        result = await self.session.execute(select(self.model).offset(skip).limit(limit))
-        return result.scalars().all()
+    async def get_page(
+        self,
+        *filters,
+        cursor: str | None = None,
+        limit: int = 50,
+        descending: bool = True,
+        columns: Sequence[Any] | None = None,
+    ) -> tuple[List[ModelType] | List[Row], str | None]:
+        """
+        Keyset pagination on the primary key: one page of rows matching
+        `filters` plus an opaque cursor for the next page (None on the last).
+        Unlike OFFSET, every page costs the same however deep it is, and rows
+        inserted meanwhile neither shift nor repeat entries.
+
+        With `columns` (which must include the id) the page holds plain Rows
+        of just those columns instead of ORM objects: no identity map, no
+        per-object state, for lists that are only serialized.
+        """
+        query = select(*columns) if columns else select(self.model)
+        query = query.where(*filters)
+        key = self.model.id
+        if cursor is not None:
+            last_id = decode_cursor(cursor)
+            query = query.where(key < last_id if descending else key > last_id)
+        # One extra row tells whether another page exists
+        query = query.order_by(key.desc() if descending else key.asc()).limit(limit + 1)
+        result = await self.session.execute(query)
+        rows = result.all() if columns else result.scalars().all()
+        if len(rows) > limit:
+            return rows[:limit], encode_cursor(rows[limit - 1].id)
+        return rows, None
+
+    def created_between(self, t_from: datetime | None, t_to: datetime | None) -> list:
+        """Filters for created_at in [t_from, t_to)."""
+        filters = []
+        if t_from is not None:
+            filters.append(self.model.created_at >= naive_utc(t_from))
+        if t_to is not None:
+            filters.append(self.model.created_at < naive_utc(t_to))
+        return filters
 
-    async def create(self, obj_in: dict) -> ModelType:
+    # Write methods only flush: committing is up to the caller's unit of work
+    # (app.core.database.transaction).
+
+    def changed(self):
+        """Invalidate this model's list snapshots once the caller's transaction commits."""
+        if self.snapshot is not None:
+            resource = self.snapshot
+            on_commit(self.session, lambda: snapshot_cache.bump(resource))
+
+    async def create(self, obj_in: dict, fetch_defaults: bool = False) -> ModelType:
         db_obj = self.model(**obj_in)
         self.session.add(db_obj)
-        await self.session.commit()
-        await self.session.refresh(db_obj)
+        # INSERT now so the primary key is known
+        await self.session.flush()
+        self.changed()
+        if fetch_defaults:
+            # Server-generated columns (created_at, ...), one SELECT by primary key;
+            # only for objects that are returned to the client
+            await self.session.refresh(db_obj)
         return db_obj
 
     async def update(self, db_obj: ModelType, obj_in: dict) -> ModelType:
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
-        self.session.add(db_obj)
-        await self.session.commit()
-        await self.session.refresh(db_obj)
+        await self.session.flush()
+        self.changed()
         return db_obj
 
+    async def update_by_id(self, id: Any, obj_in: dict):
+        await self.session.execute(
+            update(self.model).where(self.model.id == id).values(**obj_in)
+        )
+        self.changed()
+
     async def delete(self, id: Any) -> Optional[ModelType]:
         obj = await self.get(id)
         if obj:
             await self.session.delete(obj)
-            await self.session.commit()
+            await self.session.flush()
+            self.changed()
         return obj
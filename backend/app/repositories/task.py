@@ -1,17 +1,71 @@
+from datetime import datetime, timedelta
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, insert, update, or_, func, case
 from app.models.task import Task
+from app.models.task_history import TaskHistory
 from app.models.enums import TaskStatus
 from app.repositories.base import BaseRepository
+from app.core.database import on_commit
+from app.core.task_index import pending_index
 
 class TaskRepository(BaseRepository[Task]):
     def __init__(self, session: AsyncSession):
         super().__init__(Task, session)
 
+    async def create(self, obj_in: dict, fetch_defaults: bool = False) -> Task:
+        task = await super().create(obj_in, fetch_defaults)
+        # After commit, so a poll that sees the bit can also see the row
+        if task.status == TaskStatus.PENDING:
+            agent_id = task.agent_id
+            on_commit(self.session, lambda: pending_index.mark(agent_id))
+        return task
+
+    async def insert_many(self, rows: List[dict]):
+        """Multi-row INSERT inside the caller's transaction (no commit, no pending-index update)."""
+        await self.session.execute(insert(Task), rows)
+
+    async def cancel_for_allocations(self, allocation_ids: List[int], reason: str):
+        """Fail the not-yet-finished tasks of these allocations (no commit)."""
+        await self.session.execute(
+            update(Task)
+            .where(
+                Task.status.in_([TaskStatus.PENDING, TaskStatus.DISPATCHED]),
+                Task.payload["allocation_id"].as_integer().in_(allocation_ids),
+            )
+            .values(status=TaskStatus.FAILED, last_error=reason, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_including_history(self, task_id: int) -> Task | TaskHistory | None:
+        """Live task, or its archived copy once compaction moved it."""
+        task = await self.get(task_id)
+        if task is None:
+            task = await self.session.get(TaskHistory, task_id)
+        return task
+
     async def delete_by_agent(self, agent_id: int):
         await self.session.execute(delete(Task).where(Task.agent_id == agent_id))
-        await self.session.commit()
+
+    async def list_page(
+        self,
+        agent_id: int | None = None,
+        statuses: List[TaskStatus] | None = None,
+        task_type: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        cursor: str | None = None,
+        limit: int = 50,
+    ) -> tuple[List[Task], str | None]:
+        """Live tasks (not yet compacted), newest first."""
+        filters = self.created_between(created_from, created_to)
+        if agent_id:
+            filters.append(Task.agent_id == agent_id)
+        if statuses:
+            filters.append(Task.status.in_(statuses))
+        if task_type:
+            filters.append(Task.type == task_type)
+        return await self.get_page(*filters, cursor=cursor, limit=limit)
 
     async def get_pending_tasks(self, agent_id: int) -> List[Task]:
         result = await self.session.execute(
@@ -21,3 +75,115 @@ class TaskRepository(BaseRepository[Task]):
             )
         )
         return result.scalars().all()
+
+    async def next_pending_at(self, agent_id: int, now: datetime) -> datetime | None:
+        """
+        When the agent can next claim a PENDING task: `now` if one is claimable
+        already, the earliest available_at if all are backing off, None if it has none.
+        """
+        ready = or_(Task.available_at.is_(None), Task.available_at <= now)
+        result = await self.session.execute(
+            select(func.count(), func.max(case((ready, 1), else_=0)), func.min(Task.available_at))
+            .where(Task.agent_id == agent_id, Task.status == TaskStatus.PENDING)
+        )
+        count, any_ready, earliest = result.one()
+        if not count:
+            return None
+        return now if any_ready else earliest
+
+    async def get_agents_with_pending_tasks(self) -> List[int]:
+        result = await self.session.execute(
+            select(Task.agent_id).where(Task.status == TaskStatus.PENDING).distinct()
+        )
+        return result.scalars().all()
+
+    async def claim_pending_tasks(self, agent_id: int, lease_seconds: int) -> List[Task]:
+        """
+        Atomically move the agent's claimable PENDING tasks to DISPATCHED with a lease.
+        SKIP LOCKED lets concurrent polls (any worker) each take disjoint rows
+        instead of blocking on, or re-dispatching, the same task.
+        """
+        now = datetime.utcnow()
+        result = await self.session.execute(
+            select(Task)
+            .where(
+                Task.agent_id == agent_id,
+                Task.status == TaskStatus.PENDING,
+                or_(Task.available_at.is_(None), Task.available_at <= now),
+            )
+            .order_by(Task.id)
+            .with_for_update(skip_locked=True)
+        )
+        tasks = result.scalars().all()
+        for task in tasks:
+            task.status = TaskStatus.DISPATCHED
+            task.lease_expires_at = now + timedelta(seconds=lease_seconds)
+            task.attempts = (task.attempts or 0) + 1
+        await self.session.flush()
+        return tasks
+
+    async def requeue_expired_leases(
+        self, max_attempts: int, backoff_seconds: int, limit: int = 500
+    ) -> tuple[List[Task], List[Task]]:
+        """
+        Return DISPATCHED tasks whose lease ran out to PENDING with exponential backoff,
+        or fail them once they used up max_attempts. Returns (requeued, failed).
+        """
+        now = datetime.utcnow()
+        result = await self.session.execute(
+            select(Task)
+            .where(Task.status == TaskStatus.DISPATCHED, Task.lease_expires_at < now)
+            .order_by(Task.lease_expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        requeued, failed = [], []
+        for task in result.scalars().all():
+            task.lease_expires_at = None
+            if task.attempts >= max_attempts:
+                task.status = TaskStatus.FAILED
+                task.last_error = f"Lease expired after {task.attempts} attempts"
+                failed.append(task)
+            else:
+                task.status = TaskStatus.PENDING
+                task.available_at = now + timedelta(seconds=backoff_seconds * 2 ** (task.attempts - 1))
+                requeued.append(task)
+        await self.session.flush()
+        return requeued, failed
+
+    async def compact_finished(self, cutoff: datetime, batch: int, archive: bool = True) -> int:
+        """
+        Move one batch of DONE/FAILED tasks last updated before cutoff into
+        task_history (or just delete them when archive is False).
+
+        Run one call per transaction: copy and delete then commit together, so a
+        crash leaves every row in exactly one table and the next run picks up
+        where this one stopped. Only the batch's rows are locked, and SKIP LOCKED
+        steps around rows a report is updating. Returns the number of rows
+        moved; 0 means nothing is left.
+        """
+        result = await self.session.execute(
+            select(Task.id)
+            .where(
+                Task.status.in_([TaskStatus.DONE, TaskStatus.FAILED]),
+                Task.updated_at < cutoff,
+            )
+            .order_by(Task.id)
+            .limit(batch)
+            .with_for_update(skip_locked=True)
+        )
+        ids = result.scalars().all()
+        if not ids:
+            return 0
+
+        if archive:
+            columns = ["id", "agent_id", "type", "payload", "status", "created_at",
+                       "updated_at", "last_error", "attempts"]
+            await self.session.execute(
+                insert(TaskHistory).from_select(
+                    columns + ["archived_at"],
+                    select(*(getattr(Task, c) for c in columns), func.now()).where(Task.id.in_(ids)),
+                )
+            )
+        await self.session.execute(delete(Task).where(Task.id.in_(ids)))
+        return len(ids)
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.models.user import User
 from app.repositories.base import BaseRepository
 
@@ -10,3 +10,10 @@ class UserRepository(BaseRepository[User]):
     async def get_by_username(self, username: str) -> User | None:
         result = await self.session.execute(select(User).where(User.username == username))
         return result.scalars().first()
+
+    async def set_role(self, usernames: set[str], role: str) -> int:
+        """Give `role` to the named users that do not have it yet; returns how many changed."""
+        result = await self.session.execute(
+            update(User).where(User.username.in_(usernames), User.role != role).values(role=role)
+        )
+        return result.rowcount
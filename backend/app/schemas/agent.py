@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional, List
 from app.models.enums import AgentStatus, TaskStatus
+from app.schemas.common import row_type
 
 # Shared properties
 class AgentBase(BaseModel):
@@ -20,10 +21,19 @@ class AgentRegister(AgentBase):
 class AgentRegisterResponse(BaseModel):
     agent_id: int
     agent_token: str
+    expires_in: Optional[int] = None
+
+class AgentIdentity(BaseModel):
+    """Authenticated agent as seen by request handlers; no DB row behind it."""
+    id: int
+    # Claims of a signed token; None for legacy "id:token" credentials
+    token_claims: Optional[dict] = None
 
 class AgentHeartbeatPayload(BaseModel):
     cpu: Optional[float] = None
     mem: Optional[float] = None
+    # Idle pre-started code-server instances on the agent
+    warm_slots: Optional[int] = None
 
 class AgentHeartbeat(BaseModel):
     agent_id: int
@@ -36,6 +46,21 @@ class AgentPoll(BaseModel):
     agent_id: int
     agent_token: str
 
+class AgentMetricsPoint(BaseModel):
+    ts: datetime
+    cpu_min: Optional[float] = None
+    cpu_avg: Optional[float] = None
+    cpu_max: Optional[float] = None
+    mem_min: Optional[float] = None
+    mem_avg: Optional[float] = None
+    mem_max: Optional[float] = None
+
+class AgentMetricsResponse(BaseModel):
+    agent_id: int
+    step: int
+    tier: str  # "raw" | "1m" | "1h"
+    points: List[AgentMetricsPoint]
+
 class Agent(AgentBase):
     id: int
     status: AgentStatus
@@ -47,3 +72,6 @@ class Agent(AgentBase):
 
     class Config:
         from_attributes = True
+
+# Agent as selected column by column for GET /agents/ (app.core.fast_json)
+AgentRow = row_type("AgentRow", Agent)
@@ -1,13 +1,16 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Literal, Union
+from pydantic import Field
 from app.models.enums import AllocationStatus
+from app.schemas.common import row_type
 
 class AllocationBase(BaseModel):
     service: str = "code_server"
 
 class AllocationCreate(AllocationBase):
-    agent_id: int
+    # "auto" lets the placement engine choose
+    agent_id: Union[int, Literal["auto"]]
 
 class AllocationResponse(AllocationBase):
     id: int
@@ -15,10 +18,33 @@ class AllocationResponse(AllocationBase):
     remote_port: int
     status: AllocationStatus
     access_url: Optional[str] = None
+    # code-server login; only ever sent to the allocation's owner
+    password: Optional[str] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+# AllocationResponse as selected column by column for GET /allocations/
+# (app.core.fast_json)
+AllocationRow = row_type("AllocationRow", AllocationResponse)
+
 class AllocationRelease(BaseModel):
     pass
+
+class AllocationBulkItem(AllocationBase):
+    agent_id: Union[int, Literal["auto"]]
+
+class AllocationBulkRequest(BaseModel):
+    items: List[AllocationBulkItem] = Field(min_length=1)
+
+class AllocationBulkResult(BaseModel):
+    index: int
+    ok: bool
+    allocation: Optional[AllocationResponse] = None
+    error: Optional[str] = None
+
+class AllocationBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[AllocationBulkResult]
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, Any, Dict
+from app.models.enums import ActorType
+
+class AuditLogResponse(BaseModel):
+    id: int
+    actor_type: ActorType
+    actor_id: int
+    action: str
+    target_type: Optional[str] = None
+    target_id: Optional[int] = None
+    meta: Optional[Dict[str, Any]] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
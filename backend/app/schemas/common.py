@@ -1,4 +1,8 @@
+from typing import Generic, List, Optional, TypeVar
 from pydantic import BaseModel
+from typing_extensions import TypedDict
+
+T = TypeVar("T")
 
 class OkResponse(BaseModel):
     ok: bool = True
@@ -6,6 +10,19 @@ class OkResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str = "ok"
 
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+def row_type(name: str, model: type[BaseModel]) -> type:
+    """
+    TypedDict with the fields of `model`, in its order. Plain dicts dumped
+    through it (app.core.fast_json) serialize as the model would, without
+    building a model per row.
+    """
+    return TypedDict(name, {field: info.annotation for field, info in model.model_fields.items()})
+
 class PortsAvailableResponse(BaseModel):
     min: int
     max: int
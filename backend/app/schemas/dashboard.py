@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from app.models.enums import AllocationStatus
+from app.schemas.agent import Agent
+from app.schemas.allocation import AllocationResponse
+from app.schemas.common import Page
+
+class DashboardAllocation(AllocationResponse):
+    agent_name: str
+
+class AgentPortUsage(BaseModel):
+    agent_id: int
+    # Live statuses only: the ones holding a port
+    by_status: Dict[AllocationStatus, int]
+
+class PortUsage(BaseModel):
+    min: int
+    max: int
+    allocated_count: int
+    by_status: Dict[AllocationStatus, int]
+    by_agent: List[AgentPortUsage]
+
+class DashboardResponse(BaseModel):
+    # First page; GET /agents/?cursor=next_cursor continues it
+    agents: Page[Agent]
+    # The caller's allocations that are not released, newest first
+    allocations: List[DashboardAllocation]
+    ports: PortUsage
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_serializer
 from datetime import datetime
 from typing import Optional, Any, Dict
 from app.models.enums import TaskStatus
+from app.schemas.common import row_type
 
 class TaskBase(BaseModel):
     type: str
@@ -15,6 +16,24 @@ class TaskResponse(TaskBase):
     class Config:
         from_attributes = True
 
+# TaskResponse as plain data for GET /agents/tasks (app.core.fast_json)
+TaskRow = row_type("TaskRow", TaskResponse)
+
+class TaskDetail(TaskResponse):
+    agent_id: int
+    updated_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    attempts: int = 0
+
+    # The session password is for the agent and the allocation's owner only
+    @field_serializer("payload")
+    def _without_password(self, payload: Optional[Dict[str, Any]]):
+        if payload is None or "password" not in payload:
+            return payload
+        return {k: v for k, v in payload.items() if k != "password"}
+
 class TaskReport(BaseModel):
     status: str # "done" | "failed"
     message: Optional[str] = None
+    # start_code_server: {"warm": bool, "start_ms": float, "password": str (warm slots only)}
+    result: Optional[Dict[str, Any]] = None
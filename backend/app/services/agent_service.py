@@ -1,91 +1,156 @@
+import asyncio
 import secrets
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.agent import AgentRepository
 from app.repositories.task import TaskRepository
 from app.repositories.allocation import AllocationRepository
 from app.schemas.agent import AgentCreateInvite, AgentRegister
-from app.core.security import get_password_hash, verify_password
+from app.core.hashing import password_hasher
+from app.core.agent_tokens import issue_agent_token, revoke_token, revoke_agent_tokens
+from app.core.port_pool import port_pool
+from app.services.heartbeat_buffer import heartbeat_buffer
+from app.services.liveness import liveness_tracker
+from app.services.timeseries import timeseries_store
+from app.services.task_notifier import task_notifier
+from app.services.placement import placement_engine
+from app.services.dashboard_events import dashboard_events
+from app.services.task_service import TaskService
+from app.schemas.agent import AgentIdentity, AgentMetricsResponse, AgentMetricsPoint
+from app.core.config import settings
+from app.core.database import transaction
 from app.models.agent import Agent
 from app.models.enums import AgentStatus
-from datetime import datetime
+from datetime import datetime, timezone
+from dataclasses import asdict
 
 class AgentService:
     def __init__(self, session: AsyncSession):
+        self.session = session
         self.agent_repo = AgentRepository(session)
         self.task_repo = TaskRepository(session)
         self.allocation_repo = AllocationRepository(session)
+        self.task_service = TaskService(session)
 
     async def create_invite(self, invite_in: AgentCreateInvite) -> str:
         # Generate a random secret
         secret = secrets.token_urlsafe(32)
-        secret_hash = get_password_hash(secret)
+        secret_hash = await password_hasher.hash(secret)
         
-        await self.agent_repo.create({
-            "name": invite_in.name,
-            "secret_hash": secret_hash,
-            "status": AgentStatus.OFFLINE
-        })
+        async with transaction(self.session):
+            agent = await self.agent_repo.create({
+                "name": invite_in.name,
+                "secret_hash": secret_hash,
+                "status": AgentStatus.OFFLINE
+            })
+        await dashboard_events.agents_changed(
+            {"id": agent.id, "name": agent.name, "status": AgentStatus.OFFLINE.value, "ip": None, "last_seen_at": None}
+        )
         return secret
 
-    async def register_agent(self, register_in: AgentRegister) -> tuple[int, str] | None:
+    async def register_agent(self, register_in: AgentRegister) -> tuple[int, str, int] | None:
         agent = await self.agent_repo.get_by_name(register_in.name)
         if not agent:
             return None
         
-        if not verify_password(register_in.secret, agent.secret_hash):
+        if not await password_hasher.verify(register_in.secret, agent.secret_hash):
             return None
             
-        # Generate agent token
-        agent_token = secrets.token_urlsafe(32)
-        agent_token_hash = get_password_hash(agent_token)
-        
-        await self.agent_repo.update(agent, {
-            "agent_token_hash": agent_token_hash,
-            "status": AgentStatus.ONLINE,
-            "last_seen_at": datetime.utcnow()
-        })
-        
-        # Return composite token: "id:token"
-        # This allows the client to send "Bearer id:token" and the backend to parse the ID
-        composite_token = f"{agent.id}:{agent_token}"
-        
-        return agent.id, composite_token
+        async with transaction(self.session):
+            await self.agent_repo.update(agent, {
+                "status": AgentStatus.ONLINE,
+                "last_seen_at": datetime.utcnow()
+            })
+
+        # Signed token carrying the agent id; verified later without touching the DB.
+        # agent_token_hash is left alone so existing "id:token" credentials keep working.
+        agent_token, expires_in = issue_agent_token(agent.id)
+        await liveness_tracker.beat(agent.id)
+
+        return agent.id, agent_token, expires_in
+
+    async def refresh_token(self, agent: AgentIdentity) -> tuple[str, int]:
+        agent_token, expires_in = issue_agent_token(agent.id)
+        # Rotation: the token used for this call stops working
+        if agent.token_claims:
+            await revoke_token(agent.token_claims)
+        return agent_token, expires_in
 
     async def authenticate_agent(self, agent_id: int, agent_token: str) -> Agent | None:
+        # Legacy "id:token" credentials only; signed tokens never reach here
         agent = await self.agent_repo.get(agent_id)
         if not agent:
             return None
         
-        # In a real scenario, we might want to cache this or optimize
-        if not agent.agent_token_hash or not verify_password(agent_token, agent.agent_token_hash):
+        if not agent.agent_token_hash or not await password_hasher.verify(agent_token, agent.agent_token_hash):
             return None
             
         return agent
 
-    async def heartbeat(self, agent: Agent, ip: str = None, cpu: float = None, mem: float = None):
-        update_data = {
-            "last_seen_at": datetime.utcnow(),
-            "status": AgentStatus.ONLINE,
-            "ip": ip
-        }
-        if cpu is not None:
-            update_data["cpu"] = cpu
-        if mem is not None:
-            update_data["mem"] = mem
-            
-        await self.agent_repo.update(agent, update_data)
+    async def heartbeat(self, agent_id: int, ip: str = None, cpu: float = None, mem: float = None, warm_slots: int = None):
+        # Buffered; written to the agents table by the periodic heartbeat flush
+        heartbeat_buffer.record(agent_id, ip=ip, cpu=cpu, mem=mem)
+        await timeseries_store.record(agent_id, time.time(), cpu, mem)
+        placement_engine.observe(agent_id, cpu=cpu, mem=mem, warm=warm_slots)
+        await liveness_tracker.beat(agent_id)
+
+    async def get_metrics(self, agent_id: int, t_from: datetime, t_to: datetime, step: int) -> AgentMetricsResponse:
+        start, end = _epoch(t_from), _epoch(t_to)
+        if (end - start) / step > settings.METRICS_MAX_POINTS:
+            raise ValueError(f"Too many points requested; increase 'step' (max {settings.METRICS_MAX_POINTS})")
+
+        tier, points = await timeseries_store.query(agent_id, start, end, step)
+        return AgentMetricsResponse(
+            agent_id=agent_id,
+            step=step,
+            tier=tier,
+            points=[
+                AgentMetricsPoint(**{**asdict(p), "ts": datetime.fromtimestamp(p.ts, timezone.utc)})
+                for p in points
+            ],
+        )
+
+    async def get_tasks(self, agent_id: int, wait: float = 0):
+        if wait <= 0:
+            return await self.task_service.claim_tasks(agent_id)
 
-    async def get_tasks(self, agent_id: int):
-        return await self.task_repo.get_pending_tasks(agent_id)
+        # Long poll: park until a task is queued for this agent or `wait` runs out
+        with task_notifier.listen(agent_id) as woken:
+            tasks = await self.task_service.claim_tasks(agent_id)
+            if tasks:
+                return tasks
+            # End the transaction so the pooled connection is not held while parked
+            await self.session.rollback()
+            try:
+                await asyncio.wait_for(woken.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                return []
+        return await self.task_service.claim_tasks(agent_id)
 
     async def delete_agent(self, agent_id: int) -> bool:
-        agent = await self.agent_repo.get(agent_id)
-        if not agent:
-            return False
-        
-        # Delete related records first
-        await self.task_repo.delete_by_agent(agent_id)
-        await self.allocation_repo.delete_by_agent(agent_id)
-        
-        await self.agent_repo.delete(agent_id)
+        async with transaction(self.session):
+            agent = await self.agent_repo.get(agent_id)
+            if not agent:
+                return False
+
+            # Delete related records first
+            await self.task_repo.delete_by_agent(agent_id)
+            freed_ports = await self.allocation_repo.delete_by_agent(agent_id)
+
+            await self.agent_repo.delete(agent_id)
+
+        await port_pool.release(*freed_ports)
+        await revoke_agent_tokens(agent_id)
+        await liveness_tracker.forget(agent_id)
+        heartbeat_buffer.forget(agent_id)
+        await timeseries_store.drop(agent_id)
+        placement_engine.remove(agent_id)
+        await dashboard_events.agents_changed({"id": agent_id, "deleted": True})
         return True
+
+
+def _epoch(dt: datetime) -> float:
+    # Naive datetimes are UTC throughout the backend
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
@@ -1,126 +1,281 @@
 import random
-import asyncio
+import logging
+import secrets
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.allocation import AllocationRepository
 from app.repositories.task import TaskRepository
+from app.repositories.agent import AgentRepository
 from app.core.config import settings
-from app.core.redis import redis_client
+from app.core.metrics import metrics
+from app.core.database import AsyncSessionLocal, on_commit, transaction
+from app.core.leader import LeaderLease
+from app.core.port_pool import port_pool, PortPoolUnavailable
+from app.core.task_index import pending_index
 from app.models.enums import AllocationStatus, TaskStatus, ActorType
 from app.models.allocation import Allocation
+from app.schemas.allocation import AllocationBulkItem, AllocationBulkResult, AllocationResponse
 from app.services.audit_service import AuditService
+from app.services.dashboard_events import dashboard_events
+from app.services.task_notifier import task_notifier
+from app.services.placement import placement_engine
+
+logger = logging.getLogger(__name__)
+
+# Held by the worker that rebuilds and reconciles the port pool
+port_pool_lease = LeaderLease("port_pool", ttl=settings.PORT_POOL_RECONCILE_INTERVAL_SEC * 3)
 
 class AllocationService:
     def __init__(self, session: AsyncSession):
+        self.session = session
         self.alloc_repo = AllocationRepository(session)
+        self.agent_repo = AgentRepository(session)
         self.task_repo = TaskRepository(session)
         self.audit_service = AuditService(session)
 
-    async def allocate_port(self, agent_id: int, user_id: int, service: str = "code_server") -> Allocation:
-        # 1. Acquire Redis Lock
-        try:
-            lock = redis_client.lock("port_alloc_lock", timeout=5)
-            acquired = await lock.acquire(blocking=True)
-            if not acquired:
-                 raise Exception("Could not acquire lock")
-        except Exception as e:
-             # Fallback if redis is not available or lock fails, though in prod we should handle this better
-             print(f"Warning: Redis lock failed: {e}")
-             # Proceeding without lock for now to debug logic, or re-raise
-             # raise e 
-             pass
+    async def allocate_port(self, agent_id: int | str, user_id: int, service: str = "code_server") -> Allocation:
+        if agent_id == "auto":
+            agent_id = placement_engine.pick()
+            if agent_id is None:
+                raise Exception("No online agent available")
 
+        # No global lock. Each caller takes its own port from the pool, and the
+        # unique index on live ports rejects anything the pool (if stale) or the
+        # degraded DB scan (if Redis is down) hands out twice; the loser retries.
+        # Allocation and start task commit together; the audit row follows
+        # through the audit writer once they have.
+        available_port = None
         try:
-            # 2. Get used ports
-            used_ports = await self.alloc_repo.get_active_ports()
-            used_ports_set = set(used_ports)
-            
-            # 3. Find free port
-            # Simple random strategy with retry or linear scan
-            # For range 50000-60000 (10000 ports), random is fine usually, but linear scan is safer for fullness
-            
-            available_port = None
-            # Try random first for speed
-            for _ in range(10):
-                p = random.randint(settings.PORT_MIN, settings.PORT_MAX)
-                if p not in used_ports_set:
-                    available_port = p
-                    break
-            
-            # If random failed, linear scan
-            if available_port is None:
-                for p in range(settings.PORT_MIN, settings.PORT_MAX + 1):
-                    if p not in used_ports_set:
-                        available_port = p
+            async with transaction(self.session):
+                allocation = None
+                for _ in range(settings.PORT_ALLOC_MAX_ATTEMPTS):
+                    available_port = await self._acquire_port()
+                    if available_port is None:
+                        raise Exception("No available ports")
+                    try:
+                        # Savepoint: a conflict undoes this INSERT only
+                        async with self.session.begin_nested():
+                            allocation = await self.alloc_repo.create({
+                                "agent_id": agent_id,
+                                "user_id": user_id,
+                                "service": service,
+                                "remote_port": available_port,
+                                "status": AllocationStatus.REQUESTED,
+                                "password": _session_password(),
+                            }, fetch_defaults=True)
                         break
-            
-            if available_port is None:
-                raise Exception("No available ports")
+                    except IntegrityError as e:
+                        if not _is_port_conflict(e):
+                            raise
+                        # A live allocation holds it, so it must not go back to the pool
+                        available_port = None
+                        metrics.counter("port_allocation_conflicts_total").inc()
+                if allocation is None:
+                    raise Exception("Could not reserve a free port, please retry")
+
+                # Create Task for Agent
+                await self.task_repo.create(_start_task(allocation))
+                on_commit(self.session, lambda: task_notifier.notify(agent_id))
+                dashboard_events.allocations_changed(self.session, [allocation])
+
+                # Audit Log
+                await self.audit_service.record_log(
+                    actor_type=ActorType.USER,
+                    actor_id=user_id,
+                    action="create_allocation",
+                    target_type="allocation",
+                    target_id=allocation.id,
+                    meta={"agent_id": agent_id, "port": available_port}
+                )
+        except Exception:
+            if available_port is not None:
+                await port_pool.release(available_port)
+            raise
+
+        return allocation
+
+    async def allocate_bulk(self, items: list[AllocationBulkItem], user_id: int) -> list[AllocationBulkResult]:
+        """
+        Create many allocations at once. Ports for the whole batch are reserved
+        in one pool call, and allocations, start tasks and audit rows go in as
+        multi-row INSERTs in a single transaction. Items that cannot be placed
+        (unknown agent, no online agent, pool exhausted) fail individually.
+        """
+        results: list[AllocationBulkResult | None] = [None] * len(items)
+
+        def fail(n: int, error: str):
+            results[n] = AllocationBulkResult(index=n, ok=False, error=error)
 
-            # 4. Create Allocation
-            allocation = await self.alloc_repo.create({
+        # 1. Resolve target agents
+        targets: dict[int, int] = {}
+        explicit = {item.agent_id for item in items if item.agent_id != "auto"}
+        known = await self.agent_repo.get_existing_ids(list(explicit)) if explicit else set()
+        auto = [n for n, item in enumerate(items) if item.agent_id == "auto"]
+        for n, item in enumerate(items):
+            if item.agent_id == "auto":
+                continue
+            if item.agent_id in known:
+                targets[n] = item.agent_id
+            else:
+                fail(n, "Agent not found")
+        placed = placement_engine.pick_many(len(auto))
+        targets.update(zip(auto, placed))
+        for n in auto[len(placed):]:
+            fail(n, "No online agent available")
+
+        # 2. Reserve ports and insert; a stale-pool conflict rolls the batch back
+        # and retries it with the taken ports dropped
+        pending = sorted(targets)
+        created: list[Allocation] = []
+        for _ in range(settings.PORT_ALLOC_MAX_ATTEMPTS):
+            if not pending:
+                break
+            ports = await self._acquire_ports(len(pending))
+            for n in pending[len(ports):]:
+                fail(n, "No available ports")
+            pending = pending[:len(ports)]
+            if not pending:
+                break
+            batch = [(n, targets[n], items[n].service, port) for n, port in zip(pending, ports)]
+            try:
+                async with transaction(self.session):
+                    created = await self._insert_bulk(batch, user_id)
+            except IntegrityError as e:
+                if not _is_port_conflict(e):
+                    await port_pool.release(*ports)
+                    raise
+                taken = set(await self.alloc_repo.get_live_ports(ports))
+                await port_pool.release(*(p for p in ports if p not in taken))
+                metrics.counter("port_allocation_conflicts_total").inc(len(taken))
+                continue
+            except Exception:
+                await port_pool.release(*ports)
+                raise
+            by_port = {a.remote_port: a for a in created}
+            for n, _, _, port in batch:
+                results[n] = AllocationBulkResult(index=n, ok=True, allocation=AllocationResponse.model_validate(by_port[port]))
+            pending = []
+        for n in pending:
+            fail(n, "Could not reserve a free port, please retry")
+
+        # 3. Wake the agents once the tasks are committed
+        for agent_id in {a.agent_id for a in created}:
+            await pending_index.mark(agent_id)
+            await task_notifier.notify(agent_id)
+        return results
+
+    async def _insert_bulk(self, batch: list[tuple[int, int, str, int]], user_id: int) -> list[Allocation]:
+        allocations = await self.alloc_repo.insert_many([
+            {
                 "agent_id": agent_id,
                 "user_id": user_id,
                 "service": service,
-                "remote_port": available_port,
-                "status": AllocationStatus.REQUESTED
-            })
-        finally:
-            try:
-                if 'lock' in locals() and await lock.locked():
-                    await lock.release()
-            except Exception:
-                pass
-
-        # 5. Create Task for Agent (outside lock)
-        # Payload: remote_port, cs_password (generated)
-        cs_password = "password123" # Should be random
-        
-        await self.task_repo.create({
-            "agent_id": agent_id,
-            "type": "start_code_server",
-            "payload": {
-                "allocation_id": allocation.id,
-                "remote_port": available_port,
-                "password": cs_password
-            },
-            "status": TaskStatus.PENDING
-        })
-        
-        # Audit Log
-        await self.audit_service.record_log(
-            actor_type=ActorType.SYSTEM, # Or USER if we passed current_user
-            actor_id=0, # System
-            action="create_allocation",
-            target_type="allocation",
-            target_id=allocation.id,
-            meta={"agent_id": agent_id, "port": available_port}
-        )
+                "remote_port": port,
+                "status": AllocationStatus.REQUESTED,
+                "password": _session_password(),
+            }
+            for _, agent_id, service, port in batch
+        ])
+        await self.task_repo.insert_many([_start_task(a) for a in allocations])
+        dashboard_events.allocations_changed(self.session, allocations)
+        await self.audit_service.record_logs([
+            {
+                "actor_type": ActorType.USER,
+                "actor_id": user_id,
+                "action": "create_allocation",
+                "target_type": "allocation",
+                "target_id": a.id,
+                "meta": {"agent_id": a.agent_id, "port": a.remote_port, "bulk": True},
+            }
+            for a in allocations
+        ], in_transaction=True)
+        return allocations
 
-        return allocation
+    async def _acquire_port(self) -> int | None:
+        ports = await self._acquire_ports(1)
+        return ports[0] if ports else None
+
+    async def _acquire_ports(self, count: int) -> list[int]:
+        try:
+            return await port_pool.acquire_many(count)
+        except PortPoolUnavailable as e:
+            logger.warning("Port pool unavailable, scanning the DB: %s", e)
+
+        # Degraded mode: random free ports, so concurrent callers rarely pick the
+        # same one; the unique index catches those that do
+        used_ports = set(await self.alloc_repo.get_active_ports())
+        free = [p for p in range(settings.PORT_MIN, settings.PORT_MAX + 1) if p not in used_ports]
+        return random.sample(free, min(count, len(free)))
 
     async def release_allocation(self, allocation_id: int):
-        allocation = await self.alloc_repo.get(allocation_id)
-        if not allocation:
-            return
-            
-        await self.alloc_repo.update(allocation, {"status": AllocationStatus.RELEASING})
-        
-        # Create Task
-        await self.task_repo.create({
-            "agent_id": allocation.agent_id,
-            "type": "stop_code_server",
-            "payload": {
-                "allocation_id": allocation.id,
-                "remote_port": allocation.remote_port
-            },
-            "status": TaskStatus.PENDING
-        })
-
-        # Audit Log
-        await self.audit_service.record_log(
-            actor_type=ActorType.SYSTEM,
-            actor_id=0,
-            action="release_allocation",
-            target_type="allocation",
-            target_id=allocation.id
-        )
+        async with transaction(self.session):
+            allocation = await self.alloc_repo.get(allocation_id)
+            if not allocation:
+                return
+
+            await self.alloc_repo.update(allocation, {"status": AllocationStatus.RELEASING})
+            dashboard_events.allocations_changed(self.session, [allocation])
+
+            # Create Task
+            await self.task_repo.create({
+                "agent_id": allocation.agent_id,
+                "type": "stop_code_server",
+                "payload": {
+                    "allocation_id": allocation.id,
+                    "remote_port": allocation.remote_port
+                },
+                "status": TaskStatus.PENDING
+            })
+            agent_id = allocation.agent_id
+            on_commit(self.session, lambda: task_notifier.notify(agent_id))
+
+            # Audit Log
+            await self.audit_service.record_log(
+                actor_type=ActorType.SYSTEM,
+                actor_id=0,
+                action="release_allocation",
+                target_type="allocation",
+                target_id=allocation.id
+            )
+
+
+def _session_password() -> str:
+    return secrets.token_urlsafe(12)
+
+
+def _start_task(allocation: Allocation) -> dict:
+    # Payload: remote_port, password (the allocation's; a warm slot keeps its own)
+    return {
+        "agent_id": allocation.agent_id,
+        "type": "start_code_server",
+        "payload": {
+            "allocation_id": allocation.id,
+            # Owner, for the dashboard event sent when the task is dispatched
+            "user_id": allocation.user_id,
+            "remote_port": allocation.remote_port,
+            "password": allocation.password
+        },
+        "status": TaskStatus.PENDING
+    }
+
+
+def _is_port_conflict(e: IntegrityError) -> bool:
+    # MySQL 1062 on the live-port unique index, as opposed to e.g. an unknown agent_id
+    return "Duplicate entry" in str(e.orig)
+
+
+async def rebuild_port_pool():
+    """Startup, leader only: the pool is shared, so one worker rebuilds it."""
+    async with AsyncSessionLocal() as session:
+        used_ports = await AllocationRepository(session).get_active_ports()
+    await port_pool.rebuild(used_ports)
+
+
+async def reconcile_port_pool() -> int:
+    """Background job (leader only): repair the pool against the DB's live ports."""
+    async with AsyncSessionLocal() as session:
+        used_ports = await AllocationRepository(session).get_active_ports()
+    returned, removed = await port_pool.reconcile(used_ports)
+    metrics.counter("port_pool_reconciled_total", {"action": "returned"}).inc(returned)
+    metrics.counter("port_pool_reconciled_total", {"action": "removed"}).inc(removed)
+    return returned + removed
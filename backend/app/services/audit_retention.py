@@ -0,0 +1,100 @@
+import logging
+import re
+import time
+from datetime import date, datetime, timedelta
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, transaction
+from app.core.leader import LeaderLease
+from app.core.metrics import metrics
+from app.repositories.audit_log import MAXVALUE_PARTITION, AuditLogRepository
+
+logger = logging.getLogger(__name__)
+
+# Held by the worker that maintains the audit partitions; lost after three missed runs
+audit_retention_lease = LeaderLease("audit_retention", ttl=settings.AUDIT_RETENTION_INTERVAL_SEC * 3)
+
+# pYYYYMM holds the rows created in that month
+_MONTH_PARTITION = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + 1, 1, 1) if month.month == 12 else date(month.year, month.month + 1, 1)
+
+
+def _partition_month(name: str) -> date | None:
+    match = _MONTH_PARTITION.match(name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+
+async def maintain_audit_log() -> int:
+    """
+    Background job (leader only): keep AUDIT_PARTITIONS_AHEAD monthly
+    partitions of audit_logs ready past the current month, and drop the
+    months that lie entirely before the AUDIT_RETENTION_DAYS window. Dropping
+    a partition is a metadata change however many rows it holds, so the
+    purge neither scans nor locks the live rows. Returns the number of
+    partitions (or, on an unpartitioned table, rows) removed.
+    """
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as session:
+        repo = AuditLogRepository(session)
+        async with transaction(session):
+            partitions = await repo.get_partitions()
+        if not partitions:
+            # Table created without partitioning (migration not applied yet)
+            return await _delete_expired(repo, now)
+
+        months = sorted(m for m in (_partition_month(name) for name, _ in partitions) if m)
+        current = now.date().replace(day=1)
+        last = current
+        for _ in range(settings.AUDIT_PARTITIONS_AHEAD):
+            last = _next_month(last)
+        # Only past the newest partition: RANGE partitions can only be appended.
+        # Every month gets its own, even across a gap in maintenance, so pmax
+        # is split into the months its rows belong to rather than into one.
+        if months:
+            month = _next_month(months[-1])
+        else:
+            # Only pmax: start at its oldest row, not at the current month
+            async with transaction(session):
+                oldest = await repo.oldest_in_partition(MAXVALUE_PARTITION)
+            month = min(oldest.date().replace(day=1), current) if oldest else current
+        new = []
+        while month <= last:
+            new.append((f"p{month:%Y%m}", _next_month(month)))
+            month = _next_month(month)
+        if new:
+            async with transaction(session):
+                await repo.add_partitions(new)
+            logger.info("Added audit_logs partitions %s", ", ".join(name for name, _ in new))
+
+        if settings.AUDIT_RETENTION_DAYS <= 0:
+            return 0
+        cutoff = (now - timedelta(days=settings.AUDIT_RETENTION_DAYS)).date()
+        expired = [f"p{m:%Y%m}" for m in months if _next_month(m) <= cutoff]
+        if expired:
+            async with transaction(session):
+                await repo.drop_partitions(expired)
+            metrics.counter("audit_partitions_dropped_total").inc(len(expired))
+            logger.info("Dropped audit_logs partitions %s (older than %s)", ", ".join(expired), cutoff)
+        return len(expired)
+
+
+async def _delete_expired(repo: AuditLogRepository, now: datetime) -> int:
+    """Fallback purge: batched deletes, one short transaction each."""
+    if settings.AUDIT_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = now - timedelta(days=settings.AUDIT_RETENTION_DAYS)
+    started = time.perf_counter()
+    deleted = batches = 0
+    while batches < settings.AUDIT_PURGE_MAX_BATCHES:
+        async with transaction(repo.session):
+            count = await repo.delete_before(cutoff, settings.AUDIT_PURGE_BATCH)
+        if not count:
+            break
+        deleted += count
+        batches += 1
+    metrics.counter("audit_rows_purged_total").inc(deleted)
+    if deleted:
+        logger.info("Audit purge deleted %d rows in %d batches (%.1fs)", deleted, batches, time.perf_counter() - started)
+    return deleted
@@ -1,8 +1,20 @@
+from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import on_commit
 from app.models.audit_log import AuditLog
 from app.models.enums import ActorType
+from app.services.audit_writer import audit_writer
 
 class AuditService:
+    """
+    Records audit entries for the caller's unit of work. They are handed to
+    the batched audit writer once the transaction commits, so rolled-back
+    actions leave no trace and the request never waits on an audit INSERT
+    (unless AUDIT_DURABILITY is "flush"). `record_logs(..., in_transaction=True)`
+    instead INSERTs them in the caller's transaction.
+    """
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -15,18 +27,27 @@ class AuditService:
         target_id: int = None,
         meta: dict = None
     ):
-        log = AuditLog(
-            actor_type=actor_type,
-            actor_id=actor_id,
-            action=action,
-            target_type=target_type,
-            target_id=target_id,
-            meta=meta
-        )
-        self.session.add(log)
-        # We don't commit here, let the caller commit or use a context manager
-        # But for simplicity in this architecture, we might want to commit if it's a fire-and-forget log
-        # However, usually it's part of the transaction.
-        # Since our repositories commit, we should probably commit here too or rely on the main transaction.
-        # Given the repo pattern used (commit in create), let's commit here.
-        await self.session.commit()
+        await self.record_logs([{
+            "actor_type": actor_type,
+            "actor_id": actor_id,
+            "action": action,
+            "target_type": target_type,
+            "target_id": target_id,
+            "meta": meta,
+        }])
+
+    async def record_logs(self, entries: list[dict], in_transaction: bool = False):
+        if not entries:
+            return
+        # Time of the action, not of the (later) batch write. Every row gets the
+        # same keys so rows from different callers share one multi-row INSERT.
+        now = datetime.utcnow()
+        entries = [
+            {"target_type": None, "target_id": None, "meta": None, "created_at": now, **entry}
+            for entry in entries
+        ]
+        if in_transaction:
+            # One more multi-row INSERT, committed (or rolled back) with the action
+            await self.session.execute(insert(AuditLog), entries)
+            return
+        on_commit(self.session, lambda: audit_writer.submit(*entries))
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, transaction
+from app.core.metrics import metrics
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Writes audit records off the request path. Records go onto a bounded
+    queue and a background task turns them into one multi-row INSERT per
+    batch, flushed every `flush_interval` seconds or `batch_size` records,
+    whichever comes first.
+
+    Durability modes:
+      "async"  best effort: submit() returns once the record is queued; records
+               still queued when the process dies are lost.
+      "flush"  submit() waits until the batch holding the record is written, so
+               the response is only sent for audited actions.
+
+    A full queue makes submit() wait up to `enqueue_timeout` for room
+    (backpressure on the callers); after that the record is dropped and logged.
+    """
+
+    def __init__(self, mode: str, max_queue: int, batch_size: int, flush_interval: float,
+                 enqueue_timeout: float, drain_timeout: float, session_factory=AsyncSessionLocal):
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.drain_timeout = drain_timeout
+        self.session_factory = session_factory
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+
+        self._depth = metrics.gauge("audit_queue_depth")
+        self._batch_rows = metrics.histogram("audit_batch_rows", buckets=(1, 5, 10, 50, 100, 500, 1000))
+        self._flush_seconds = metrics.histogram("audit_flush_seconds")
+        self._written = metrics.counter("audit_records_written_total")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, *entries: dict):
+        """Queue audit rows (AuditLog column dicts), waiting for them in "flush" mode."""
+        if self.mode == "flush" and not self.running:
+            # Nobody would complete the futures
+            await self._write([(entry, None) for entry in entries])
+            return
+
+        loop = asyncio.get_running_loop()
+        waiters = []
+        for entry in entries:
+            done = loop.create_future() if self.mode == "flush" else None
+            try:
+                await asyncio.wait_for(self._queue.put((entry, done)), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                metrics.counter("audit_dropped_total", {"reason": "queue_full"}).inc()
+                logger.error("Audit queue full, dropped record: %s", entry)
+                continue
+            if done is not None:
+                waiters.append(done)
+        self._depth.set(self._queue.qsize())
+        if waiters:
+            await asyncio.gather(*waiters)
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="audit_writer")
+
+    async def stop(self):
+        """Write everything still queued, then stop (shutdown)."""
+        if self.running:
+            # Queued behind every pending record, so reaching it means they are written
+            await self._queue.put((_STOP, None))
+            try:
+                await asyncio.wait_for(self._task, self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.error("Audit writer did not drain within %.0fs", self.drain_timeout)
+            self._task = None
+        # Records queued while no writer was running
+        leftover = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item[0] is not _STOP:
+                leftover.append(item)
+        if leftover:
+            await self._write(leftover)
+        self._depth.set(self._queue.qsize())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1][0] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._depth.set(self._queue.qsize())
+
+            stopping = batch[-1][0] is _STOP
+            if stopping:
+                batch.pop()
+            if batch:
+                await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future | None]]):
+        started = time.perf_counter()
+        error = None
+        for attempt in range(settings.AUDIT_WRITE_ATTEMPTS):
+            try:
+                async with self.session_factory() as session, transaction(session):
+                    await session.execute(insert(AuditLog), [entry for entry, _ in batch])
+                error = None
+                break
+            except Exception as e:
+                error = e
+                logger.warning("Audit batch of %d rows failed (attempt %d): %s", len(batch), attempt + 1, e)
+                if attempt + 1 < settings.AUDIT_WRITE_ATTEMPTS:
+                    await asyncio.sleep(min(2 ** attempt * 0.1, 2.0))
+
+        if error is None:
+            self._written.inc(len(batch))
+            self._batch_rows.observe(len(batch))
+            self._flush_seconds.observe(time.perf_counter() - started)
+        else:
+            metrics.counter("audit_dropped_total", {"reason": "write_failed"}).inc(len(batch))
+            for entry, _ in batch:
+                logger.error("Audit record lost: %s", entry)
+        # Flush mode callers are released either way; the failure is logged above
+        for _, done in batch:
+            if done is not None and not done.done():
+                done.set_result(error is None)
+
+
+audit_writer = AuditWriter(
+    mode=settings.AUDIT_DURABILITY,
+    max_queue=settings.AUDIT_QUEUE_MAX,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+    enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT_SEC,
+    drain_timeout=settings.AUDIT_DRAIN_TIMEOUT_SEC,
+)
@@ -1,28 +1,48 @@
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.user import UserRepository
 from app.schemas.user import UserCreate, UserLogin
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import create_access_token
+from app.core.hashing import password_hasher
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, transaction
 from app.models.user import User
 
+logger = logging.getLogger(__name__)
+
 class AuthService:
     def __init__(self, session: AsyncSession):
+        self.session = session
         self.repo = UserRepository(session)
 
     async def authenticate_user(self, login_data: UserLogin) -> User | None:
         user = await self.repo.get_by_username(login_data.username)
         if not user:
             return None
-        if not verify_password(login_data.password, user.password_hash):
+        if not await password_hasher.verify(login_data.password, user.password_hash):
             return None
         return user
 
     async def create_user(self, user_in: UserCreate) -> User:
-        hashed_password = get_password_hash(user_in.password)
-        return await self.repo.create({
-            "username": user_in.username,
-            "password_hash": hashed_password,
-            "role": "user" # Default role
-        })
+        hashed_password = await password_hasher.hash(user_in.password)
+        async with transaction(self.session):
+            return await self.repo.create({
+                "username": user_in.username,
+                "password_hash": hashed_password,
+                # Never admin here: a listed name not yet taken would go to whoever registers it
+                "role": "user" # Default role
+            }, fetch_defaults=True)
 
     def create_token(self, user: User) -> str:
         return create_access_token(subject=user.username)
+
+
+async def grant_admin_roles():
+    """Startup: give role "admin" to the existing users named in ADMIN_USERNAMES."""
+    usernames = settings.admin_usernames
+    if not usernames:
+        return
+    async with AsyncSessionLocal() as session, transaction(session):
+        promoted = await UserRepository(session).set_role(usernames, "admin")
+    if promoted:
+        logger.info("Granted the admin role to %d user(s) from ADMIN_USERNAMES", promoted)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import on_commit
+from app.core.events import CHANNEL_PREFIX, event_bus
+from app.core.metrics import metrics
+from app.core.redis import redis_client
+from app.models.allocation import Allocation
+from app.schemas.allocation import AllocationResponse
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_TOPIC = "dashboard"
+# Recent events for Last-Event-ID resume, trimmed to about SSE_REPLAY_MAX entries
+REPLAY_KEY = "dashboard:replay"
+
+# Appends to the replay stream and fans out in one atomic step, so every
+# worker sees events in stream id order and the id travels with the event
+_PUBLISH_LUA = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'data', ARGV[2])
+redis.call('PUBLISH', KEYS[2], '{"id":"' .. id .. '","event":' .. ARGV[2] .. '}')
+return id
+"""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class Subscriber:
+    """
+    One dashboard stream. Deltas are coalesced per agent / allocation (later
+    fields win), so a consumer that reads slower than events arrive gets the
+    latest state of each entity rather than an ever-growing backlog. Past
+    SSE_SUBSCRIBER_MAX_PENDING entities it is told to resync instead.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.ready = asyncio.Event()
+        self._pending: dict[tuple[str, int], dict] = {}
+        self._last_id: str | None = None
+        self._overflowed = False
+
+    def offer(self, event_id: str | None, event: dict):
+        if event["type"] == "allocation":
+            # Users only see their own sessions, as in GET /allocations/
+            if event["user_id"] != self.user_id:
+                return
+            deltas = [("allocation", d) for d in event["allocations"]]
+        else:
+            deltas = [("agent", d) for d in event["agents"]]
+        for kind, delta in deltas:
+            key = (kind, delta["id"])
+            if key in self._pending:
+                self._pending[key].update(delta)
+            elif len(self._pending) < settings.SSE_SUBSCRIBER_MAX_PENDING:
+                self._pending[key] = dict(delta)
+            else:
+                if not self._overflowed:
+                    metrics.counter("sse_resyncs_total", {"reason": "slow_consumer"}).inc()
+                self._overflowed = True
+        if event_id is not None:
+            self._last_id = event_id
+        self.ready.set()
+
+    def reset(self):
+        """Make the consumer reload its lists (replay not possible)."""
+        self._overflowed = True
+        self.ready.set()
+
+    def take(self) -> tuple[list[tuple[str, list[dict]]], str | None, bool]:
+        """(kind, deltas) batches, the id of the newest event included, and whether to resync instead."""
+        pending, self._pending = self._pending, {}
+        overflowed, self._overflowed = self._overflowed, False
+        self.ready.clear()
+        if overflowed:
+            return [], self._last_id, True
+        batches: dict[str, list[dict]] = defaultdict(list)
+        for (kind, _), delta in pending.items():
+            batches[kind].append(delta)
+        return list(batches.items()), self._last_id, False
+
+
+class DashboardEvents:
+    """
+    Fleet and session changes for the dashboard's event stream (GET /events).
+
+    publish() appends the event to a capped Redis stream, which assigns its
+    id and serves Last-Event-ID replay, and fans it out over the event bus to
+    the subscribers connected to every worker. Without Redis, events reach
+    this worker's subscribers only and cannot be replayed.
+
+    Heartbeat deltas (cpu, mem, ip, last_seen_at for many agents at a time)
+    are fanned out only, without an id: they would fill the replay buffer
+    and push out the events that matter. A resumed stream tells the client
+    to refetch the agent list instead ("resumed", see api/routers/events.py).
+
+    Events:
+      {"type": "agent", "agents": [{"id", ...changed fields}]}
+      {"type": "allocation", "user_id", "allocations": [{"id", ...changed fields}]}
+    """
+
+    def __init__(self):
+        self._subscribers: set[Subscriber] = set()
+        self._publish_script = redis_client.register_script(_PUBLISH_LUA)
+        self._connections = metrics.gauge("sse_connections")
+        event_bus.subscribe(DASHBOARD_TOPIC, self._on_event)
+
+    async def publish(self, *events: dict, replay: bool = True):
+        for event in events:
+            data = json.dumps(event, default=_json_default, separators=(",", ":"))
+            if not replay:
+                await event_bus.publish(DASHBOARD_TOPIC, {"id": None, "event": json.loads(data)})
+                metrics.counter("dashboard_events_published_total", {"type": event["type"]}).inc()
+                continue
+            try:
+                await self._publish_script(
+                    keys=[REPLAY_KEY, CHANNEL_PREFIX + DASHBOARD_TOPIC], args=[settings.SSE_REPLAY_MAX, data]
+                )
+            except Exception as e:
+                logger.warning("Dashboard event not fanned out, delivering locally: %s", e)
+                await self._on_event({"id": None, "event": json.loads(data)})
+            metrics.counter("dashboard_events_published_total", {"type": event["type"]}).inc()
+
+    async def agents_changed(self, *deltas: dict, replay: bool = True):
+        if deltas:
+            await self.publish({"type": "agent", "agents": list(deltas)}, replay=replay)
+
+    def allocations_changed(self, session: AsyncSession, allocations: list[Allocation | dict]):
+        """
+        Publish allocation state once the caller's transaction commits. ORM
+        rows are sent whole; dicts ({"id", "user_id", ...fields}) as partial
+        updates. Serialized now, while the rows are loaded.
+        """
+        by_user: dict[int, list[dict]] = defaultdict(list)
+        for allocation in allocations:
+            if isinstance(allocation, dict):
+                delta = dict(allocation)
+                user_id = delta.pop("user_id")
+            else:
+                delta = AllocationResponse.model_validate(allocation).model_dump(mode="json")
+                user_id = allocation.user_id
+            if user_id is not None:
+                by_user[user_id].append(delta)
+        if not by_user:
+            return
+        events = [
+            {"type": "allocation", "user_id": user_id, "allocations": deltas}
+            for user_id, deltas in by_user.items()
+        ]
+        on_commit(session, lambda: self.publish(*events))
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id)
+        self._subscribers.add(subscriber)
+        self._connections.set(len(self._subscribers))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        self._connections.set(len(self._subscribers))
+
+    async def replay(self, subscriber: Subscriber, last_event_id: str) -> bool:
+        """
+        Feed the subscriber every event after `last_event_id`. If that id is
+        no longer in the stream (trimmed, unknown, Redis down) the gap cannot
+        be filled, the subscriber is told to resync and False is returned.
+        """
+        limit = settings.SSE_REPLAY_MAX
+        try:
+            entries = await redis_client.xrange(REPLAY_KEY, min=last_event_id, max="+", count=limit + 1)
+        except Exception as e:
+            logger.info("Dashboard replay from %s not possible: %s", last_event_id, e)
+            entries = []
+        # The first entry must be the client's last one, or events in between are gone
+        if not entries or entries[0][0] != last_event_id or len(entries) > limit:
+            metrics.counter("sse_resyncs_total", {"reason": "replay_gap"}).inc()
+            subscriber.reset()
+            return False
+        for event_id, fields in entries[1:]:
+            subscriber.offer(event_id, json.loads(fields["data"]))
+        return True
+
+    async def _on_event(self, message: dict):
+        for subscriber in list(self._subscribers):
+            subscriber.offer(message["id"], message["event"])
+
+
+dashboard_events = DashboardEvents()
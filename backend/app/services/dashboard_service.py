@@ -0,0 +1,59 @@
+from collections import defaultdict
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.enums import AgentStatus, AllocationStatus
+from app.repositories.agent import AgentRepository
+from app.repositories.allocation import AllocationRepository
+from app.schemas.agent import Agent
+from app.schemas.common import Page
+from app.schemas.dashboard import AgentPortUsage, DashboardAllocation, DashboardResponse, PortUsage
+from app.services.heartbeat_buffer import heartbeat_buffer
+
+# What the agents table lists per agent: everything but released
+SHOWN_ALLOCATION_STATUSES = [s for s in AllocationStatus if s != AllocationStatus.RELEASED]
+
+
+class DashboardService:
+    """
+    Everything the Agents page needs in one request: three queries on one
+    session (agents page, the caller's allocations joined to agent names,
+    live-port counts grouped in MySQL) instead of three requests.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.agent_repo = AgentRepository(session)
+        self.alloc_repo = AllocationRepository(session)
+
+    async def get_dashboard(
+        self, user_id: int, statuses: list[AgentStatus] | None = None, limit: int = 50
+    ) -> DashboardResponse:
+        agents, next_cursor = await self.agent_repo.list_page(statuses, limit=limit)
+        allocations = await self.alloc_repo.list_for_user_with_agent_names(
+            user_id, SHOWN_ALLOCATION_STATUSES, settings.DASHBOARD_MAX_ALLOCATIONS
+        )
+        counts = await self.alloc_repo.count_live_by_agent_status()
+
+        by_status: dict[AllocationStatus, int] = defaultdict(int)
+        by_agent: dict[int, dict[AllocationStatus, int]] = defaultdict(dict)
+        for agent_id, status, count in counts:
+            by_status[status] += count
+            by_agent[agent_id][status] = count
+
+        return DashboardResponse(
+            # Overlay heartbeats that have not been flushed to the DB yet
+            agents=Page[Agent](
+                items=[heartbeat_buffer.merge(Agent.model_validate(a)) for a in agents], next_cursor=next_cursor
+            ),
+            allocations=[DashboardAllocation.model_validate(row) for row in allocations],
+            ports=PortUsage(
+                min=settings.PORT_MIN,
+                max=settings.PORT_MAX,
+                allocated_count=sum(by_status.values()),
+                by_status=by_status,
+                by_agent=[
+                    AgentPortUsage(agent_id=agent_id, by_status=usage)
+                    for agent_id, usage in sorted(by_agent.items())
+                ],
+            ),
+        )
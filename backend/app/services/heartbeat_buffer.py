@@ -0,0 +1,143 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, transaction
+from app.core.metrics import metrics
+from app.models.enums import AgentStatus
+from app.repositories.agent import AgentRepository
+from app.schemas.agent import Agent as AgentSchema
+from app.services.dashboard_events import dashboard_events
+
+
+@dataclass
+class HeartbeatSample:
+    last_seen_at: datetime
+    ip: str | None
+    cpu: float | None
+    mem: float | None
+
+
+class HeartbeatBuffer:
+    """
+    Coalesces agent heartbeats in memory and writes them to the agents table
+    in one bulk UPDATE per flush. Only agents that beat since the previous
+    flush are written; repeated beats from one agent collapse into one row,
+    and a beat that changes nothing since this worker last wrote the agent
+    (same ip/cpu/mem) is skipped until HEARTBEAT_LAST_SEEN_WRITE_SEC has passed.
+
+    The buffer is per worker: other workers read the agents table, where a
+    beat shows up after at most HEARTBEAT_FLUSH_INTERVAL_SEC, and
+    last_seen_at of an unchanged agent lags by up to
+    HEARTBEAT_LAST_SEEN_WRITE_SEC more.
+    """
+
+    def __init__(self):
+        self._pending: dict[int, HeartbeatSample] = {}
+        # Batch currently being written, still visible to readers until it commits
+        self._flushing: dict[int, HeartbeatSample] = {}
+        # What this worker last wrote per agent, to skip beats that change nothing
+        self._flushed: dict[int, HeartbeatSample] = {}
+
+        self._buffered_gauge = metrics.gauge("heartbeat_buffered_agents")
+        self._flush_rows = metrics.histogram("heartbeat_flush_rows", buckets=(1, 10, 100, 1000, 10000))
+        self._skipped = metrics.counter("heartbeat_unchanged_skipped_total")
+
+    def record(self, agent_id: int, ip: str | None = None, cpu: float | None = None, mem: float | None = None):
+        previous = self._pending.get(agent_id)
+        # A beat without cpu/mem keeps whatever the previous beat reported
+        if previous is not None:
+            cpu = previous.cpu if cpu is None else cpu
+            mem = previous.mem if mem is None else mem
+        self._pending[agent_id] = HeartbeatSample(datetime.utcnow(), ip, cpu, mem)
+        self._buffered_gauge.set(len(self._pending))
+
+    def get(self, agent_id: int) -> HeartbeatSample | None:
+        return self._pending.get(agent_id) or self._flushing.get(agent_id)
+
+    def _overlay(self, agent_id: int) -> dict | None:
+        sample = self.get(agent_id)
+        if sample is None:
+            return None
+        update = {"last_seen_at": sample.last_seen_at, "status": AgentStatus.ONLINE, "ip": sample.ip}
+        if sample.cpu is not None:
+            update["cpu"] = sample.cpu
+        if sample.mem is not None:
+            update["mem"] = sample.mem
+        return update
+
+    def merge(self, agent: AgentSchema) -> AgentSchema:
+        """Overlay a not-yet-flushed heartbeat on an agent read from the DB."""
+        update = self._overlay(agent.id)
+        return agent if update is None else agent.model_copy(update=update)
+
+    def merge_row(self, agent: dict) -> dict:
+        """merge() for an agent row dict (schemas.agent.AgentRow)."""
+        update = self._overlay(agent["id"])
+        return agent if update is None else {**agent, **update}
+
+    def _changed(self, agent_id: int, sample: HeartbeatSample) -> bool:
+        last = self._flushed.get(agent_id)
+        if last is None:
+            return True
+        # Below half the timeout, an agent that went offline (no beat for
+        # HEARTBEAT_TIMEOUT_SEC) is always written, and so set ONLINE, again
+        refresh = min(settings.HEARTBEAT_LAST_SEEN_WRITE_SEC, settings.HEARTBEAT_TIMEOUT_SEC / 2)
+        return (
+            sample.last_seen_at - last.last_seen_at >= timedelta(seconds=refresh)
+            or (sample.ip is not None and sample.ip != last.ip)
+            or (sample.cpu is not None and sample.cpu != last.cpu)
+            or (sample.mem is not None and sample.mem != last.mem)
+        )
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+
+        self._flushing, self._pending = self._pending, {}
+        self._buffered_gauge.set(0)
+        batch = self._flushing
+        writes = {agent_id: sample for agent_id, sample in batch.items() if self._changed(agent_id, sample)}
+        self._skipped.inc(len(batch) - len(writes))
+        try:
+            if writes:
+                async with AsyncSessionLocal() as session, transaction(session):
+                    await AgentRepository(session).bulk_update_heartbeats(
+                        {agent_id: asdict(sample) for agent_id, sample in writes.items()}
+                    )
+        except Exception:
+            # Put the batch back unless a newer beat arrived meanwhile
+            for agent_id, sample in batch.items():
+                self._pending.setdefault(agent_id, sample)
+            self._buffered_gauge.set(len(self._pending))
+            raise
+        finally:
+            self._flushing = {}
+
+        for agent_id, sample in writes.items():
+            last = self._flushed.get(agent_id)
+            # A None cpu/mem kept the stored value
+            if last is not None:
+                sample = HeartbeatSample(
+                    sample.last_seen_at, sample.ip if sample.ip is not None else last.ip,
+                    sample.cpu if sample.cpu is not None else last.cpu,
+                    sample.mem if sample.mem is not None else last.mem,
+                )
+            self._flushed[agent_id] = sample
+        self._flush_rows.observe(len(writes))
+        if not writes:
+            return 0
+        # One event for the whole batch, kept out of the replay buffer; status
+        # changes go out from the liveness tracker
+        await dashboard_events.agents_changed(*(
+            {"id": agent_id, **{k: v for k, v in asdict(sample).items() if v is not None}}
+            for agent_id, sample in writes.items()
+        ), replay=False)
+        return len(writes)
+
+    def forget(self, agent_id: int):
+        """Drop a deleted agent's buffered and last-written heartbeat."""
+        self._pending.pop(agent_id, None)
+        self._flushed.pop(agent_id, None)
+
+
+heartbeat_buffer = HeartbeatBuffer()
@@ -0,0 +1,111 @@
+import logging
+import time
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, transaction
+from app.core.events import event_bus
+from app.core.redis import redis_client
+from app.core.snapshot_cache import snapshot_cache
+from app.services.dashboard_events import dashboard_events
+from app.models.enums import AgentStatus
+from app.repositories.agent import AgentRepository
+
+logger = logging.getLogger(__name__)
+
+# Sorted set: member = agent_id, score = unix time of the last heartbeat
+LAST_BEAT_KEY = "agents:last_beat"
+AGENT_STATUS_TOPIC = "agent.status"
+SWEEP_BATCH = 500
+
+# Pops up to ARGV[2] members scored at or below ARGV[1] in one atomic step, so
+# concurrent sweepers in different workers never claim the same agent and the
+# cost is proportional to the number of expired agents.
+_SWEEP_LUA = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #ids > 0 then
+    redis.call('ZREM', KEYS[1], unpack(ids))
+end
+return ids
+"""
+
+
+class LivenessTracker:
+    """
+    Tracks agent heartbeats and moves agents that missed HEARTBEAT_TIMEOUT_SEC to
+    OFFLINE. Publishes {"agent_id", "status"} on the "agent.status" topic whenever
+    an agent goes online or offline.
+    """
+
+    def __init__(self):
+        self._sweep_script = redis_client.register_script(_SWEEP_LUA)
+
+    async def beat(self, agent_id: int):
+        try:
+            added = await redis_client.zadd(LAST_BEAT_KEY, {agent_id: time.time()})
+        except Exception as e:
+            logger.warning("Liveness beat for agent %s not recorded: %s", agent_id, e)
+            return
+        # A new member means the agent was offline (or unknown) until now
+        if added:
+            await snapshot_cache.bump("agents")
+            await dashboard_events.agents_changed({"id": agent_id, "status": AgentStatus.ONLINE.value})
+            await event_bus.publish(AGENT_STATUS_TOPIC, {"agent_id": agent_id, "status": AgentStatus.ONLINE.value})
+
+    async def forget(self, agent_id: int):
+        try:
+            await redis_client.zrem(LAST_BEAT_KEY, agent_id)
+        except Exception as e:
+            logger.warning("Failed to drop agent %s from liveness set: %s", agent_id, e)
+
+    async def seed(self):
+        """Load agents the DB believes are online, so they can expire after a Redis restart."""
+        async with AsyncSessionLocal() as session:
+            beats = await AgentRepository(session).get_online_last_seen()
+        if not beats:
+            return
+        mapping = {
+            agent_id: (last_seen or datetime.utcnow()).replace(tzinfo=timezone.utc).timestamp()
+            for agent_id, last_seen in beats
+        }
+        try:
+            # NX: never move a fresher score written by a live heartbeat backwards
+            await redis_client.zadd(LAST_BEAT_KEY, mapping, nx=True)
+        except Exception as e:
+            logger.warning("Liveness set not seeded: %s", e)
+
+    async def sweep(self) -> int:
+        cutoff = time.time() - settings.HEARTBEAT_TIMEOUT_SEC
+        expired_total = 0
+        while True:
+            try:
+                ids = await self._sweep_script(keys=[LAST_BEAT_KEY], args=[cutoff, SWEEP_BATCH])
+            except Exception as e:
+                logger.warning("Liveness sweep falling back to the DB: %s", e)
+                return expired_total + await self._sweep_db(cutoff)
+
+            ids = [int(i) for i in ids]
+            if not ids:
+                return expired_total
+            await self._mark_offline(ids)
+            expired_total += len(ids)
+            if len(ids) < SWEEP_BATCH:
+                return expired_total
+
+    async def _sweep_db(self, cutoff: float) -> int:
+        cutoff_dt = datetime.utcfromtimestamp(cutoff)
+        async with AsyncSessionLocal() as session:
+            ids = await AgentRepository(session).get_stale_online_ids(cutoff_dt)
+        if ids:
+            await self._mark_offline(ids)
+        return len(ids)
+
+    async def _mark_offline(self, ids: list[int]):
+        async with AsyncSessionLocal() as session, transaction(session):
+            await AgentRepository(session).mark_offline(ids)
+        await dashboard_events.agents_changed(*({"id": i, "status": AgentStatus.OFFLINE.value} for i in ids))
+        for agent_id in ids:
+            await event_bus.publish(AGENT_STATUS_TOPIC, {"agent_id": agent_id, "status": AgentStatus.OFFLINE.value})
+        logger.info("Marked %d agents offline", len(ids))
+
+
+liveness_tracker = LivenessTracker()
@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import timezone
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.events import event_bus
+from app.models.enums import AgentStatus
+from app.repositories.agent import AgentRepository
+from app.repositories.allocation import AllocationRepository
+from app.services.liveness import AGENT_STATUS_TOPIC
+
+
+@dataclass
+class AgentLoad:
+    agent_id: int
+    cpu: float = 0.0  # percent, as reported by heartbeats
+    mem: float = 0.0
+    live: int = 0  # live allocations
+    last_beat: float = 0.0  # epoch seconds
+    warm: int = 0  # idle pre-started code-server slots
+    # Observed cost of one session here, used to project load between heartbeats
+    cpu_per_session: float = settings.PLACEMENT_SESSION_CPU_PCT
+    mem_per_session: float = settings.PLACEMENT_SESSION_MEM_PCT
+
+    def learn_session_cost(self):
+        if self.live > 0:
+            self.cpu_per_session = self.cpu / self.live
+            self.mem_per_session = self.mem / self.live
+
+    def utilization(self) -> float:
+        """Weighted 0..1 load from CPU, memory and session count."""
+        w_cpu, w_mem, w_live = settings.PLACEMENT_WEIGHT_CPU, settings.PLACEMENT_WEIGHT_MEM, settings.PLACEMENT_WEIGHT_SESSIONS
+        return (
+            w_cpu * self.cpu / 100
+            + w_mem * self.mem / 100
+            + w_live * self.live / settings.PLACEMENT_MAX_SESSIONS_PER_AGENT
+        ) / (w_cpu + w_mem + w_live)
+
+
+class PlacementStrategy(ABC):
+    """Scores an agent for the next session; the lowest score wins."""
+
+    name: str
+
+    @abstractmethod
+    def score(self, load: AgentLoad, now: float) -> float:
+        ...
+
+    @staticmethod
+    def staleness(load: AgentLoad, now: float) -> float:
+        # 0 for a fresh heartbeat, 1 at the liveness timeout: prefer agents we know more about
+        return min(max(now - load.last_beat, 0.0) / settings.HEARTBEAT_TIMEOUT_SEC, 1.0)
+
+    @staticmethod
+    def warm_bonus(load: AgentLoad) -> float:
+        # A warm slot skips the code-server cold start
+        return settings.PLACEMENT_WEIGHT_WARM if load.warm > 0 else 0.0
+
+
+class SpreadStrategy(PlacementStrategy):
+    """Least utilized agent first: even load, most headroom per session."""
+
+    name = "spread"
+
+    def score(self, load: AgentLoad, now: float) -> float:
+        return load.utilization() + settings.PLACEMENT_WEIGHT_FRESHNESS * self.staleness(load, now) - self.warm_bonus(load)
+
+
+class BinpackStrategy(PlacementStrategy):
+    """Most utilized agent that still fits: keeps the rest of the fleet idle."""
+
+    name = "binpack"
+
+    def score(self, load: AgentLoad, now: float) -> float:
+        return -load.utilization() + settings.PLACEMENT_WEIGHT_FRESHNESS * self.staleness(load, now) - self.warm_bonus(load)
+
+
+STRATEGIES: dict[str, type[PlacementStrategy]] = {s.name: s for s in (SpreadStrategy, BinpackStrategy)}
+
+
+class PlacementEngine:
+    """
+    In-memory index of online agents behind agent_id="auto".
+
+    Agents sit in a min-heap keyed by strategy score. An update pushes a new
+    entry and bumps the agent's sequence number; entries with an old number
+    are dropped when they reach the top (lazy invalidation). Picking is
+    therefore O(log n) amortised, with no per-request scan or DB query.
+    A score only grows between updates (its heartbeat goes stale), so the
+    stored key is a lower bound: the top entry is rescored when picked and
+    pushed back if it has since fallen behind.
+    Agents over a hard limit (CPU, memory, sessions) are kept out of the heap
+    until an update brings them back under it.
+
+    The index is fed by heartbeats received by this worker, liveness events
+    from every worker, and a periodic refresh from the DB that also corrects
+    session counts changed elsewhere.
+    """
+
+    def __init__(self, strategy: PlacementStrategy):
+        self.strategy = strategy
+        self._agents: dict[int, AgentLoad] = {}
+        self._seq: dict[int, int] = {}
+        self._heap: list[tuple[float, int, int]] = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def set_strategy(self, strategy: PlacementStrategy):
+        self.strategy = strategy
+        self._rebuild(time.time())
+
+    @staticmethod
+    def fits(load: AgentLoad) -> bool:
+        return (
+            load.cpu < settings.PLACEMENT_CPU_LIMIT
+            and load.mem < settings.PLACEMENT_MEM_LIMIT
+            and load.live < settings.PLACEMENT_MAX_SESSIONS_PER_AGENT
+        )
+
+    def observe(self, agent_id: int, cpu: float | None = None, mem: float | None = None,
+                live: int | None = None, warm: int | None = None, now: float | None = None):
+        now = time.time() if now is None else now
+        load = self._agents.get(agent_id)
+        if load is None:
+            load = self._agents[agent_id] = AgentLoad(agent_id)
+        if cpu is not None:
+            load.cpu = cpu
+        if mem is not None:
+            load.mem = mem
+        if live is not None:
+            load.live = live
+        if warm is not None:
+            load.warm = warm
+        load.learn_session_cost()
+        load.last_beat = now
+        self._push(load, now)
+
+    def remove(self, agent_id: int):
+        self._agents.pop(agent_id, None)
+        self._seq.pop(agent_id, None)
+
+    def placed(self, agent_id: int, now: float | None = None):
+        load = self._agents.get(agent_id)
+        if load is not None:
+            # Count the session now rather than waiting for the next heartbeat to show it
+            load.live += 1
+            load.cpu += load.cpu_per_session
+            load.mem += load.mem_per_session
+            load.warm = max(load.warm - 1, 0)
+            self._push(load, time.time() if now is None else now)
+
+    def pick(self, now: float | None = None) -> int | None:
+        """Best agent for one new session (and count it there), or None."""
+        now = time.time() if now is None else now
+        heap = self._heap
+        while heap:
+            score, seq, agent_id = heap[0]
+            if self._seq.get(agent_id) != seq:
+                heapq.heappop(heap)
+                continue
+            load = self._agents[agent_id]
+            if now - load.last_beat > settings.HEARTBEAT_TIMEOUT_SEC:
+                # Not heard from since the timeout; back in on its next beat
+                heapq.heappop(heap)
+                del self._seq[agent_id]
+                continue
+            if self.strategy.score(load, now) > score:
+                # Staler than when it was pushed; another agent may now beat it
+                self._push(load, now)
+                continue
+            self.placed(agent_id, now)
+            return agent_id
+        return None
+
+    def pick_many(self, count: int, now: float | None = None) -> list[int]:
+        placed = []
+        for _ in range(count):
+            agent_id = self.pick(now)
+            if agent_id is None:
+                break
+            placed.append(agent_id)
+        return placed
+
+    def load_snapshot(self, rows, now: float | None = None):
+        """Replace the index with (agent_id, cpu, mem, last_beat, live) rows."""
+        now = time.time() if now is None else now
+        previous = self._agents
+        self._agents = {
+            agent_id: AgentLoad(agent_id, cpu or 0.0, mem or 0.0, live, last_beat or 0.0)
+            for agent_id, cpu, mem, last_beat, live in rows
+        }
+        for load in self._agents.values():
+            load.learn_session_cost()
+            # Warm slots are only known from heartbeats, not stored in the DB
+            if load.agent_id in previous:
+                load.warm = previous[load.agent_id].warm
+        self._rebuild(now)
+
+    def _push(self, load: AgentLoad, now: float):
+        seq = next(self._counter)
+        self._seq[load.agent_id] = seq
+        if self.fits(load):
+            heapq.heappush(self._heap, (self.strategy.score(load, now), seq, load.agent_id))
+        # Superseded entries pile up between pops; compact once they dominate
+        if len(self._heap) > 2 * len(self._agents) + 64:
+            self._heap = [e for e in self._heap if self._seq.get(e[2]) == e[1]]
+            heapq.heapify(self._heap)
+
+    def _rebuild(self, now: float):
+        self._seq = {}
+        self._heap = []
+        for load in self._agents.values():
+            seq = next(self._counter)
+            self._seq[load.agent_id] = seq
+            if self.fits(load):
+                self._heap.append((self.strategy.score(load, now), seq, load.agent_id))
+        heapq.heapify(self._heap)
+
+    async def refresh(self):
+        """Background job: reload online agents and their session counts from the DB."""
+        async with AsyncSessionLocal() as session:
+            rows = await AgentRepository(session).get_online_capacity()
+        self.load_snapshot(
+            # last_seen_at is naive UTC
+            (agent_id, cpu, mem, last_seen.replace(tzinfo=timezone.utc).timestamp() if last_seen else None, live)
+            for agent_id, cpu, mem, last_seen, live in rows
+        )
+
+    async def _on_status(self, data: dict):
+        agent_id = data["agent_id"]
+        if data["status"] == AgentStatus.OFFLINE.value:
+            self.remove(agent_id)
+            return
+        # Back online, possibly still holding sessions (and already indexed with
+        # none by the heartbeat that woke it): count them instead of starting at 0
+        async with AsyncSessionLocal() as session:
+            live = await AllocationRepository(session).count_live(agent_id)
+        self.observe(agent_id, live=live)
+
+
+placement_engine = PlacementEngine(STRATEGIES[settings.PLACEMENT_STRATEGY]())
+event_bus.subscribe(AGENT_STATUS_TOPIC, placement_engine._on_status)
@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, transaction
+from app.core.leader import LeaderLease
+from app.core.metrics import metrics
+from app.core.port_pool import port_pool
+from app.models.enums import ActorType, AllocationStatus
+from app.repositories.allocation import AllocationRepository
+from app.repositories.task import TaskRepository
+from app.services.audit_service import AuditService
+from app.services.dashboard_events import dashboard_events
+
+logger = logging.getLogger(__name__)
+
+# Held by the worker that runs the reclaimer; lost after three missed runs
+reclaimer_lease = LeaderLease("allocation_reclaimer", ttl=settings.RECLAIMER_INTERVAL_SEC * 3)
+
+
+async def reclaim_stuck_allocations() -> int:
+    """
+    Background job (leader only): fail allocations stuck in REQUESTED or
+    STARTING, finish those stuck in RELEASING, cancel their open tasks and
+    return their ports to the pool.
+
+    Each batch is one transaction (status change, task cancel), and after the
+    commit its audit rows are queued and its ports go back to the pool in
+    one call.
+    """
+    timeouts = {
+        AllocationStatus.REQUESTED: settings.RECLAIM_REQUESTED_AFTER_SEC,
+        AllocationStatus.STARTING: settings.RECLAIM_STARTING_AFTER_SEC,
+        AllocationStatus.RELEASING: settings.RECLAIM_RELEASING_AFTER_SEC,
+    }
+    reclaimed = 0
+    async with AsyncSessionLocal() as session:
+        alloc_repo = AllocationRepository(session)
+        task_repo = TaskRepository(session)
+        audit = AuditService(session)
+        while True:
+            async with transaction(session):
+                stuck = await alloc_repo.get_stuck(timeouts, settings.RECLAIMER_BATCH)
+                if stuck:
+                    await _reclaim(stuck, task_repo, audit)
+                    alloc_repo.changed()
+                    dashboard_events.allocations_changed(session, stuck)
+            if not stuck:
+                break
+
+            await port_pool.release(*(a.remote_port for a in stuck))
+            reclaimed += len(stuck)
+            if len(stuck) < settings.RECLAIMER_BATCH:
+                break
+
+    if reclaimed:
+        logger.info("Reclaimed %d stuck allocations", reclaimed)
+    return reclaimed
+
+
+async def _reclaim(stuck: list, task_repo: TaskRepository, audit: AuditService):
+    """Close one locked batch: status changes, task cancels and audit rows."""
+    now = datetime.utcnow()
+    logs = []
+    for alloc in stuck:
+        previous = alloc.status
+        if previous == AllocationStatus.RELEASING:
+            # The agent never confirmed the stop; the port is no longer served either way
+            alloc.status = AllocationStatus.RELEASED
+        else:
+            alloc.status = AllocationStatus.FAILED
+            alloc.error_msg = f"Timed out in {previous.value}"
+        alloc.released_at = now
+        metrics.counter("allocations_reclaimed_total", {"from": previous.value}).inc()
+        logs.append({
+            "actor_type": ActorType.SYSTEM,
+            "actor_id": 0,
+            "action": "reclaim_allocation",
+            "target_type": "allocation",
+            "target_id": alloc.id,
+            "meta": {"agent_id": alloc.agent_id, "port": alloc.remote_port, "from": previous.value},
+        })
+    await task_repo.cancel_for_allocations([a.id for a in stuck], "Allocation reclaimed")
+    await audit.record_logs(logs)
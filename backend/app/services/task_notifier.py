@@ -0,0 +1,43 @@
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from app.core.events import event_bus
+
+TASKS_TOPIC = "agent.tasks"
+
+
+class TaskNotifier:
+    """
+    Wakes long-polling agents when new tasks are queued for them.
+
+    notify() goes out on the event bus, so a poll parked in any backend worker
+    is woken no matter which worker created the task.
+    """
+
+    def __init__(self):
+        self._waiters: dict[int, set[asyncio.Event]] = defaultdict(set)
+        event_bus.subscribe(TASKS_TOPIC, self._on_tasks)
+
+    @contextmanager
+    def listen(self, agent_id: int):
+        # Register before querying the DB so a task created in between is not missed
+        woken = asyncio.Event()
+        self._waiters[agent_id].add(woken)
+        try:
+            yield woken
+        finally:
+            waiters = self._waiters.get(agent_id)
+            if waiters is not None:
+                waiters.discard(woken)
+                if not waiters:
+                    del self._waiters[agent_id]
+
+    async def notify(self, agent_id: int):
+        await event_bus.publish(TASKS_TOPIC, {"agent_id": agent_id})
+
+    async def _on_tasks(self, data: dict):
+        for woken in self._waiters.get(data["agent_id"], ()):
+            woken.set()
+
+
+task_notifier = TaskNotifier()
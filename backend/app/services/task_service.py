@@ -0,0 +1,194 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, on_commit, transaction
+from app.core.metrics import metrics
+from app.core.port_pool import port_pool
+from app.core.task_index import pending_index
+from app.models.enums import AllocationStatus, TaskStatus
+from app.models.task import Task
+from app.models.task_history import TaskHistory
+from app.repositories.allocation import AllocationRepository
+from app.repositories.task import TaskRepository
+from app.schemas.task import TaskReport
+from app.services.dashboard_events import dashboard_events
+from app.services.task_notifier import task_notifier
+
+logger = logging.getLogger(__name__)
+
+# code-server cold starts take seconds, warm hand-offs well under one
+START_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class TaskService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.task_repo = TaskRepository(session)
+        self.alloc_repo = AllocationRepository(session)
+
+    async def claim_tasks(self, agent_id: int) -> List[Task]:
+        if settings.TASK_POLL_FAST_PATH:
+            if not await pending_index.has_pending(agent_id):
+                return []
+            # Clear before claiming: a task committed after this point sets the bit again
+            await pending_index.clear(agent_id)
+
+        try:
+            return await self._claim(agent_id)
+        except BaseException:
+            # Nothing was claimed, so whatever was pending still is
+            if settings.TASK_POLL_FAST_PATH:
+                await pending_index.mark(agent_id)
+            raise
+
+    async def _claim(self, agent_id: int) -> List[Task]:
+        async with transaction(self.session):
+            tasks = await self.task_repo.claim_pending_tasks(agent_id, settings.TASK_LEASE_SEC)
+
+            # Tasks left PENDING: claimable now (locked by a concurrent poll) keep
+            # the bit; ones backing off are looked at again once due
+            if settings.TASK_POLL_FAST_PATH:
+                now = datetime.utcnow()
+                due = await self.task_repo.next_pending_at(agent_id, now)
+                if due is not None and due <= now:
+                    on_commit(self.session, lambda: pending_index.mark(agent_id))
+                elif due is not None:
+                    on_commit(self.session, lambda: pending_index.mark_at(agent_id, due))
+
+            # A dispatched start task means the agent is bringing the session up
+            starts = [
+                t for t in tasks
+                if t.type == "start_code_server" and t.payload and t.payload.get("allocation_id")
+            ]
+            if starts:
+                alloc_ids = [t.payload["allocation_id"] for t in starts]
+                await self.alloc_repo.update_status(alloc_ids, AllocationStatus.STARTING, only_from=AllocationStatus.REQUESTED)
+                # Owner from the payload saves reading the rows back; tasks queued
+                # before it was recorded there get no event
+                dashboard_events.allocations_changed(self.session, [
+                    {"id": t.payload["allocation_id"], "user_id": t.payload.get("user_id"),
+                     "agent_id": t.agent_id, "status": AllocationStatus.STARTING.value}
+                    for t in starts
+                ])
+        return tasks
+
+    async def report_task(self, task_id: int, agent_id: int, report_in: TaskReport) -> Task | TaskHistory | None:
+        """Apply the agent's report; None if the task does not exist or is not that agent's."""
+        async with transaction(self.session):
+            return await self._apply_report(task_id, agent_id, report_in)
+
+    async def _apply_report(self, task_id: int, agent_id: int, report_in: TaskReport) -> Task | TaskHistory | None:
+        task = await self.task_repo.get_including_history(task_id)
+        if not task or task.agent_id != agent_id:
+            # Another agent's report could otherwise finish the task or set the session password
+            return None
+        if isinstance(task, TaskHistory):
+            # Already finished and compacted; a duplicate report changes nothing
+            return task
+
+        # Completes the lease. A late report for a task the reaper already
+        # re-queued or failed still wins: the agent did run it.
+        status = TaskStatus.DONE if report_in.status == "done" else TaskStatus.FAILED
+        await self.task_repo.update(task, {
+            "status": status,
+            "last_error": report_in.message,
+            "lease_expires_at": None,
+        })
+
+        if task.type == "start_code_server" and status == TaskStatus.DONE and report_in.result:
+            _record_start(report_in.result)
+
+        # If task was start_code_server and done, update allocation status to ACTIVE
+        # If task was stop_code_server and done, update allocation status to RELEASED
+        alloc_id = task.payload.get("allocation_id") if task.payload else None
+        if alloc_id and status == TaskStatus.DONE:
+            alloc = await self.alloc_repo.get(alloc_id)
+            if alloc and task.type == "start_code_server" and alloc.status == AllocationStatus.FAILED:
+                # Reclaimed while the agent was still starting it; its port may be
+                # handed out again, so have the agent tear the session down
+                await self.task_repo.create({
+                    "agent_id": task.agent_id,
+                    "type": "stop_code_server",
+                    "payload": {"allocation_id": alloc.id, "remote_port": alloc.remote_port},
+                    "status": TaskStatus.PENDING,
+                })
+                agent_id = task.agent_id
+                on_commit(self.session, lambda: task_notifier.notify(agent_id))
+            elif alloc and task.type == "start_code_server":
+                changes = {"status": AllocationStatus.ACTIVE}
+                # A warm slot was started before this allocation existed and
+                # kept its own password; the owner needs that one to log in
+                if report_in.result and report_in.result.get("password"):
+                    changes["password"] = report_in.result["password"]
+                await self.alloc_repo.update(alloc, changes)
+                dashboard_events.allocations_changed(self.session, [alloc])
+            elif alloc and task.type == "stop_code_server" and alloc.status == AllocationStatus.RELEASING:
+                # Not for allocations the reclaimer already closed: their port went back then
+                await self.alloc_repo.update(alloc, {"status": AllocationStatus.RELEASED, "released_at": datetime.utcnow()})
+                dashboard_events.allocations_changed(self.session, [alloc])
+                port = alloc.remote_port
+                on_commit(self.session, lambda: port_pool.release(port))
+
+        return task
+
+
+def _record_start(result: dict):
+    kind = "warm" if result.get("warm") else "cold"
+    metrics.counter("session_starts_total", {"kind": kind}).inc()
+    if result.get("start_ms") is not None:
+        metrics.histogram("session_start_seconds", {"kind": kind}, START_BUCKETS).observe(result["start_ms"] / 1000)
+    warm = metrics.counter("session_starts_total", {"kind": "warm"}).value
+    cold = metrics.counter("session_starts_total", {"kind": "cold"}).value
+    metrics.gauge("session_warm_hit_ratio").set(warm / (warm + cold))
+
+
+async def rebuild_pending_index():
+    async with AsyncSessionLocal() as session:
+        agent_ids = await TaskRepository(session).get_agents_with_pending_tasks()
+    await pending_index.rebuild(agent_ids)
+
+
+async def reap_expired_leases() -> int:
+    """Background job: re-queue or fail DISPATCHED tasks whose lease ran out."""
+    async with AsyncSessionLocal() as session, transaction(session):
+        requeued, failed = await TaskRepository(session).requeue_expired_leases(
+            settings.TASK_MAX_ATTEMPTS, settings.TASK_RETRY_BACKOFF_SEC
+        )
+    for agent_id in {t.agent_id for t in requeued}:
+        await pending_index.mark(agent_id)
+    if requeued or failed:
+        metrics.counter("task_leases_requeued_total").inc(len(requeued))
+        metrics.counter("task_leases_failed_total").inc(len(failed))
+        logger.info("Task leases expired: %d re-queued, %d failed", len(requeued), len(failed))
+    return len(requeued) + len(failed)
+
+
+async def compact_finished_tasks() -> int:
+    """
+    Background job: move finished tasks older than TASK_RETENTION_DAYS out of
+    `tasks`, one short transaction per batch, at most TASK_COMPACTION_MAX_BATCHES
+    batches per run so a large backlog is worked off across runs.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=settings.TASK_RETENTION_DAYS)
+    archive = settings.TASK_COMPACTION_MODE != "drop"
+    started = time.perf_counter()
+    moved = batches = 0
+    async with AsyncSessionLocal() as session:
+        repo = TaskRepository(session)
+        while batches < settings.TASK_COMPACTION_MAX_BATCHES:
+            async with transaction(session):
+                count = await repo.compact_finished(cutoff, settings.TASK_COMPACTION_BATCH, archive)
+            if not count:
+                break
+            moved += count
+            batches += 1
+    metrics.counter("tasks_compacted_total", {"mode": "archive" if archive else "drop"}).inc(moved)
+    if moved:
+        logger.info(
+            "Task compaction %s %d rows in %d batches (%.1fs)",
+            "archived" if archive else "dropped", moved, batches, time.perf_counter() - started,
+        )
+    return moved
@@ -0,0 +1,363 @@
+import logging
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from app.core.config import settings
+from app.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+# Per-row layout of the rollup tiers
+ROLLUP_FIELDS = ("cpu_min", "cpu_avg", "cpu_max", "mem_min", "mem_avg", "mem_max", "count")
+RAW_FIELDS = ("cpu", "mem")
+
+
+class Ring:
+    """
+    Fixed-capacity circular buffer of (timestamp, row) with rows of `width` floats.
+    Storage is two preallocated arrays, so memory never grows after construction.
+    Timestamps must be appended in non-decreasing order.
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.capacity = capacity
+        self.width = width
+        self._ts = array("d", [0.0]) * capacity
+        self._values = array("f", [NAN]) * (capacity * width)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, i: int) -> float:
+        # Logical index -> timestamp; lets bisect search the ring directly
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        return self._ts[(self._start + i) % self.capacity]
+
+    def append(self, ts: float, row: tuple):
+        if self._size < self.capacity:
+            slot = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._ts[slot] = ts
+        self._values[slot * self.width:(slot + 1) * self.width] = array("f", row)
+
+    def oldest(self) -> float | None:
+        return self[0] if self._size else None
+
+    def range(self, t_from: float, t_to: float):
+        lo = bisect_left(self, t_from)
+        hi = bisect_right(self, t_to)
+        for i in range(lo, hi):
+            slot = (self._start + i) % self.capacity
+            yield self._ts[slot], tuple(self._values[slot * self.width:(slot + 1) * self.width])
+
+    @property
+    def nbytes(self) -> int:
+        return self._ts.itemsize * len(self._ts) + self._values.itemsize * len(self._values)
+
+
+class _Accumulator:
+    """Min/sum/max/count of one metric inside an open rollup bucket."""
+
+    __slots__ = ("min", "max", "sum", "count")
+
+    def __init__(self):
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self.count = 0
+
+    def add(self, value: float, lo: float = None, hi: float = None, weight: int = 1):
+        if value is None or math.isnan(value):
+            return
+        self.min = min(self.min, value if lo is None else lo)
+        self.max = max(self.max, value if hi is None else hi)
+        self.sum += value * weight
+        self.count += weight
+
+    def row(self) -> tuple:
+        if not self.count:
+            return NAN, NAN, NAN
+        return self.min, self.sum / self.count, self.max
+
+
+class RollupTier:
+    def __init__(self, name: str, resolution: int, capacity: int):
+        self.name = name
+        self.resolution = resolution
+        self.ring = Ring(capacity, len(ROLLUP_FIELDS))
+        self._bucket: float | None = None
+        self._cpu = _Accumulator()
+        self._mem = _Accumulator()
+        self._samples = 0
+
+    def add(self, ts: float, cpu: float | None, mem: float | None):
+        bucket = ts - ts % self.resolution
+        if self._bucket is not None and bucket > self._bucket:
+            self.ring.append(self._bucket, self.open_row())
+            self._cpu, self._mem, self._samples = _Accumulator(), _Accumulator(), 0
+        if self._bucket is None or bucket > self._bucket:
+            self._bucket = bucket
+        self._cpu.add(cpu)
+        self._mem.add(mem)
+        self._samples += 1
+
+    def open_row(self) -> tuple:
+        return (*self._cpu.row(), *self._mem.row(), self._samples)
+
+    def range(self, t_from: float, t_to: float):
+        yield from self.ring.range(t_from, t_to)
+        # The bucket still being filled, so the newest data is never missing
+        if self._bucket is not None and t_from <= self._bucket <= t_to:
+            yield self._bucket, self.open_row()
+
+
+class AgentSeries:
+    def __init__(self):
+        self.raw = Ring(settings.METRICS_RAW_SAMPLES, len(RAW_FIELDS))
+        self.tiers = (
+            RollupTier("1m", 60, settings.METRICS_MINUTE_BUCKETS),
+            RollupTier("1h", 3600, settings.METRICS_HOUR_BUCKETS),
+        )
+
+    def add(self, ts: float, cpu: float | None, mem: float | None):
+        self.raw.append(ts, (NAN if cpu is None else cpu, NAN if mem is None else mem))
+        for tier in self.tiers:
+            tier.add(ts, cpu, mem)
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes + sum(t.ring.nbytes for t in self.tiers)
+
+
+@dataclass
+class MetricsPoint:
+    ts: float
+    cpu_min: float | None
+    cpu_avg: float | None
+    cpu_max: float | None
+    mem_min: float | None
+    mem_avg: float | None
+    mem_max: float | None
+
+
+def _pick_tier(tiers: list[tuple[str, int, float | None]], t_from: float, step: int) -> str | None:
+    """
+    Steps under a minute need raw samples (None). Otherwise use the finest
+    rollup not finer than the step that still holds t_from, falling back to
+    the coarsest one allowed (longest retention). `tiers` is (name,
+    resolution, oldest bucket or None), finest first.
+    """
+    eligible = [t for t in tiers if t[1] <= step]
+    if not eligible:
+        return None
+    covering = [t for t in eligible if t[2] is not None and t[2] <= t_from]
+    return (covering[0] if covering else eligible[-1])[0]
+
+
+class LocalTimeSeriesStore:
+    """
+    In-process CPU/memory history per agent: what TimeSeriesStore falls back
+    to while Redis is unreachable, holding only the beats this worker saw.
+
+    Each agent gets a fixed-size raw ring plus 1-minute and 1-hour min/avg/max
+    rollups, so memory per agent is constant (see `bytes_per_agent`). Queries
+    with step >= 60s are answered from a rollup tier without touching raw
+    samples.
+    """
+
+    def __init__(self):
+        self._series: dict[int, AgentSeries] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bytes_per_agent() -> int:
+        return AgentSeries().nbytes
+
+    def record(self, agent_id: int, ts: float, cpu: float | None, mem: float | None):
+        series = self._series.get(agent_id)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(agent_id, AgentSeries())
+        series.add(ts, cpu, mem)
+
+    def drop(self, agent_id: int):
+        self._series.pop(agent_id, None)
+
+    def query(self, agent_id: int, t_from: float, t_to: float, step: int) -> tuple[str, list[MetricsPoint]]:
+        series = self._series.get(agent_id)
+        if series is None:
+            return "raw", []
+
+        name = _pick_tier([(t.name, t.resolution, t.ring.oldest()) for t in series.tiers], t_from, step)
+        if name is None:
+            rows = (
+                (ts, (cpu, cpu, cpu, mem, mem, mem, 1))
+                for ts, (cpu, mem) in series.raw.range(t_from, t_to)
+            )
+            return "raw", _downsample(rows, step)
+        tier = next(t for t in series.tiers if t.name == name)
+        return name, _downsample(tier.range(t_from, t_to), step)
+
+
+def _downsample(rows, step: int) -> list[MetricsPoint]:
+    points: list[MetricsPoint] = []
+    bucket = None
+    cpu = mem = None
+    for ts, (cpu_min, cpu_avg, cpu_max, mem_min, mem_avg, mem_max, count) in rows:
+        start = ts - ts % step
+        if start != bucket:
+            if bucket is not None:
+                points.append(MetricsPoint(bucket, *_finish(cpu), *_finish(mem)))
+            bucket, cpu, mem = start, _Accumulator(), _Accumulator()
+        weight = max(int(count), 1)
+        cpu.add(cpu_avg, cpu_min, cpu_max, weight)
+        mem.add(mem_avg, mem_min, mem_max, weight)
+    if bucket is not None:
+        points.append(MetricsPoint(bucket, *_finish(cpu), *_finish(mem)))
+    return points
+
+
+def _finish(acc: _Accumulator) -> tuple:
+    if not acc.count:
+        return None, None, None
+    lo, avg, hi = acc.row()
+    return round(lo, 3), round(avg, 3), round(hi, 3)
+
+
+# Appends one heartbeat to an agent's raw set and folds it into both rollup
+# tiers, trimming each to its capacity. Rollup members are
+# "bucket,cpu_min,cpu_sum,cpu_max,cpu_n,mem_min,mem_sum,mem_max,mem_n,samples"
+# scored by bucket; an empty cpu/mem argument means not reported.
+_RECORD_LUA = """
+local ts = tonumber(ARGV[1])
+local values = {tonumber(ARGV[2]), tonumber(ARGV[3])}
+redis.call('ZADD', KEYS[1], ts, ARGV[1] .. ',' .. ARGV[2] .. ',' .. ARGV[3])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -tonumber(ARGV[4]) - 1)
+redis.call('EXPIRE', KEYS[1], ARGV[9])
+for i = 0, 1 do
+  local key, resolution, capacity = KEYS[2 + i], tonumber(ARGV[5 + 2 * i]), tonumber(ARGV[6 + 2 * i])
+  local bucket = ts - ts % resolution
+  local row = {0, 0, 0, 0, 0, 0, 0, 0, 0}
+  local current = redis.call('ZRANGEBYSCORE', key, bucket, bucket)
+  if current[1] then
+    local j = 0
+    for field in string.gmatch(current[1], '[^,]+') do
+      if j > 0 then row[j] = tonumber(field) end
+      j = j + 1
+    end
+    redis.call('ZREMRANGEBYSCORE', key, bucket, bucket)
+  end
+  for m = 0, 1 do
+    local value, o = values[m + 1], m * 4
+    if value then
+      if row[o + 4] == 0 or value < row[o + 1] then row[o + 1] = value end
+      if row[o + 4] == 0 or value > row[o + 3] then row[o + 3] = value end
+      row[o + 2] = row[o + 2] + value
+      row[o + 4] = row[o + 4] + 1
+    end
+  end
+  row[9] = row[9] + 1
+  redis.call('ZADD', key, bucket, string.format('%.17g', bucket) .. ',' .. table.concat(row, ','))
+  redis.call('ZREMRANGEBYRANK', key, 0, -capacity - 1)
+  redis.call('EXPIRE', key, ARGV[9])
+end
+"""
+
+KEY_PREFIX = "metrics:"
+# (name, resolution in seconds), finest first
+ROLLUP_TIERS = (("1m", 60), ("1h", 3600))
+
+
+def _optional(field: str) -> float | None:
+    return float(field) if field else None
+
+
+def _rollup_row(member: str) -> tuple[float, tuple]:
+    bucket, cpu_min, cpu_sum, cpu_max, cpu_n, mem_min, mem_sum, mem_max, mem_n, samples = map(float, member.split(","))
+    cpu = (cpu_min, cpu_sum / cpu_n, cpu_max) if cpu_n else (None, None, None)
+    mem = (mem_min, mem_sum / mem_n, mem_max) if mem_n else (None, None, None)
+    return bucket, (*cpu, *mem, samples)
+
+
+class TimeSeriesStore:
+    """
+    CPU/memory history per agent, fed by heartbeats and shared by all
+    workers through Redis: a raw sorted set plus 1-minute and 1-hour
+    min/avg/max rollups per agent, each capped at its METRICS_* capacity
+    and updated atomically by one script call per beat. Queries with
+    step >= 60s are answered from a rollup tier without reading raw samples.
+
+    While Redis is unreachable, beats and queries go to this worker's
+    LocalTimeSeriesStore instead.
+    """
+
+    def __init__(self):
+        self.local = LocalTimeSeriesStore()
+        self._record_script = redis_client.register_script(_RECORD_LUA)
+        self.capacities = {"1m": settings.METRICS_MINUTE_BUCKETS, "1h": settings.METRICS_HOUR_BUCKETS}
+
+    @staticmethod
+    def _keys(agent_id: int) -> list[str]:
+        prefix = f"{KEY_PREFIX}{agent_id}:"
+        return [prefix + "raw", *(prefix + name for name, _ in ROLLUP_TIERS)]
+
+    async def record(self, agent_id: int, ts: float, cpu: float | None, mem: float | None):
+        # Kept as long as the coarsest tier covers; an agent gone quiet expires
+        ttl = settings.METRICS_HOUR_BUCKETS * 3600
+        args = [repr(ts), "" if cpu is None else repr(cpu), "" if mem is None else repr(mem), settings.METRICS_RAW_SAMPLES]
+        for name, resolution in ROLLUP_TIERS:
+            args += [resolution, self.capacities[name]]
+        try:
+            await self._record_script(keys=self._keys(agent_id), args=[*args, ttl])
+        except Exception as e:
+            logger.warning("Metrics of agent %s kept in this worker only: %s", agent_id, e)
+            self.local.record(agent_id, ts, cpu, mem)
+
+    async def drop(self, agent_id: int):
+        self.local.drop(agent_id)
+        try:
+            await redis_client.delete(*self._keys(agent_id))
+        except Exception as e:
+            logger.warning("Metrics of agent %s not dropped: %s", agent_id, e)
+
+    async def query(self, agent_id: int, t_from: float, t_to: float, step: int) -> tuple[str, list[MetricsPoint]]:
+        raw_key, *tier_keys = self._keys(agent_id)
+        try:
+            # Oldest bucket and the requested range of every tier, in one round trip
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key in tier_keys:
+                    pipe.zrange(key, 0, 0, withscores=True)
+                    pipe.zrangebyscore(key, t_from, t_to)
+                pipe.zrangebyscore(raw_key, t_from, t_to)
+                results = await pipe.execute()
+        except Exception as e:
+            logger.warning("Metrics of agent %s read from this worker only: %s", agent_id, e)
+            return self.local.query(agent_id, t_from, t_to, step)
+
+        tiers = [
+            (name, resolution, oldest[0][1] if oldest else None)
+            for (name, resolution), oldest in zip(ROLLUP_TIERS, results[0:-1:2])
+        ]
+        name = _pick_tier(tiers, t_from, step)
+        if name is None:
+            rows = []
+            for member in results[-1]:
+                ts, cpu, mem = member.split(",")
+                cpu, mem = _optional(cpu), _optional(mem)
+                rows.append((float(ts), (cpu, cpu, cpu, mem, mem, mem, 1)))
+            return "raw", _downsample(rows, step)
+        index = [n for n, _ in ROLLUP_TIERS].index(name)
+        return name, _downsample((_rollup_row(m) for m in results[2 * index + 1]), step)
+
+
+timeseries_store = TimeSeriesStore()
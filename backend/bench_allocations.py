@@ -0,0 +1,115 @@
+"""
+Concurrent allocation benchmark for POST /allocations/create.
+
+Fires N simultaneous create calls at a running backend, then reports
+throughput and latency and checks that no remote port was handed out twice,
+both in the responses and among live allocations in MySQL. The user JWT is
+minted locally with the backend's JWT_SECRET (read from .env); the user and
+agent must already exist.
+
+    uvicorn main:app --workers 4   ->  python bench_allocations.py --username admin --agent-id 1
+
+Stop Redis before a run to exercise the degraded (DB scan) mode. Allocations
+created by the run are deleted afterwards unless --keep is given; the next
+backend start rebuilds the port pool from what is left.
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.port_pool import port_pool
+from app.core.security import create_access_token
+from app.models.allocation import Allocation
+from app.models.audit_log import AuditLog
+from app.models.task import Task
+from app.repositories.allocation import LIVE_STATUSES
+
+
+async def create_one(client: httpx.AsyncClient, args, latencies: list, ports: list, errors: list):
+    started = time.perf_counter()
+    try:
+        resp = await client.post("/allocations/create", json={"agent_id": args.agent_id, "service": "code_server"})
+        resp.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        ports.append((resp.json()["id"], resp.json()["remote_port"]))
+    except httpx.HTTPStatusError as e:
+        errors.append(e.response.text)
+    except Exception as e:
+        errors.append(str(e))
+
+
+async def live_duplicates(engine) -> list:
+    async with AsyncSession(engine) as session:
+        result = await session.execute(
+            select(Allocation.remote_port, func.count())
+            .where(Allocation.status.in_(LIVE_STATUSES))
+            .group_by(Allocation.remote_port)
+            .having(func.count() > 1)
+        )
+        return result.all()
+
+
+async def cleanup(engine, created: list):
+    ids = [alloc_id for alloc_id, _ in created]
+    async with AsyncSession(engine) as session:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            await session.execute(delete(Task).where(Task.payload["allocation_id"].as_integer().in_(chunk)))
+            await session.execute(delete(AuditLog).where(AuditLog.target_type == "allocation", AuditLog.target_id.in_(chunk)))
+            await session.execute(delete(Allocation).where(Allocation.id.in_(chunk)))
+        await session.commit()
+    await port_pool.release(*(port for _, port in created))
+
+
+async def run(args):
+    token = create_access_token(args.username)
+    engine = create_async_engine(settings.DATABASE_URL)
+    latencies: list[float] = []
+    created: list[tuple[int, int]] = []
+    errors: list[str] = []
+
+    limits = httpx.Limits(max_connections=args.requests)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, headers=headers, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(create_one(client, args, latencies, created, errors) for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    response_dupes = [port for port, n in Counter(port for _, port in created).items() if n > 1]
+    db_dupes = await live_duplicates(engine)
+
+    print(f"requests={args.requests} ok={len(created)} errors={len(errors)} elapsed={elapsed:.2f}s")
+    if errors:
+        print(f"first errors: {errors[:3]}")
+    if latencies:
+        latencies.sort()
+        p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+        print(f"throughput={len(created) / elapsed:.0f} allocations/s latency p50={p(0.5):.1f}ms p99={p(0.99):.1f}ms")
+    print(f"duplicate ports: responses={response_dupes or 'none'} live rows={db_dupes or 'none'}")
+
+    if not args.keep and created:
+        await cleanup(engine, created)
+    await engine.dispose()
+    return 1 if response_dupes or db_dupes else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--username", required=True, help="existing user the JWT is minted for")
+    parser.add_argument("--agent-id", type=int, required=True, help="existing agent the sessions are placed on")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="leave the created allocations in place")
+    raise SystemExit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
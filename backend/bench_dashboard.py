@@ -0,0 +1,198 @@
+"""
+Agents page load benchmark: GET /dashboard against the three-call baseline
+(GET /agents/, GET /allocations/ for the unreleased statuses, following
+next_cursor, and GET /ports/available, fired together as the browser would).
+
+Seeds ALLOCATIONS allocations for the user across the existing agents, ~2%
+of them live on ports taken from the port pool and the rest released, then
+loads the page ITERATIONS times each way (CONCURRENCY loads at a time) and
+reports latency, requests and SQL statements per page load. With Redis
+up, the baseline's two list calls are answered from the snapshot cache
+once warm (the data does not change during the run); statements/load shows
+how much that saves.
+
+Statements are MySQL's Questions counter. On other databases they are the
+backend's own per-request counts (db_queries_per_request on /metrics), which
+see one worker only: run a single worker there. /metrics is admin only, so
+--username must then be an admin (or pass --admin-username as well).
+
+The user JWT is minted locally with the backend's JWT_SECRET (read from
+.env); the user and at least one agent must already exist.
+
+    uvicorn main:app --workers 4   ->  python bench_dashboard.py --username admin
+
+Seeded rows are deleted and their ports returned to the pool afterwards
+unless --keep is given.
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.config import settings
+from app.core.port_pool import PortPoolUnavailable, port_pool
+from app.core.security import create_access_token
+from app.models.agent import Agent
+from app.models.allocation import Allocation
+from app.models.enums import AllocationStatus
+from app.models.user import User
+
+SEED_SERVICE = "bench_dashboard"
+SHOWN = [s.value for s in AllocationStatus if s != AllocationStatus.RELEASED]
+LIVE = [AllocationStatus.REQUESTED, AllocationStatus.STARTING, AllocationStatus.ACTIVE]
+
+
+async def db_statements(engine, client: httpx.AsyncClient, admin_username: str) -> int:
+    if engine.dialect.name == "mysql":
+        async with engine.connect() as conn:
+            row = (await conn.execute(text("SHOW GLOBAL STATUS LIKE 'Questions'"))).first()
+        return int(row[1])
+    resp = await client.get("/metrics", headers={"Authorization": f"Bearer {create_access_token(admin_username)}"})
+    resp.raise_for_status()
+    # Not the readings' own admin lookups
+    return int(sum(
+        h["sum"] for h in resp.json().get("db_queries_per_request", [])
+        if not h["labels"]["route"].endswith("/metrics")
+    ))
+
+
+async def seed(engine, username: str, count: int) -> list[int]:
+    """Insert the allocations; returns the ports taken from the pool."""
+    rnd = random.Random(42)
+    async with AsyncSession(engine) as session:
+        user_id = (await session.execute(select(User.id).where(User.username == username))).scalar_one()
+        agent_ids = (await session.execute(select(Agent.id))).scalars().all()
+    if not agent_ids:
+        raise SystemExit("No agents registered")
+
+    try:
+        ports = await port_pool.acquire_many(count // 50)
+    except PortPoolUnavailable:
+        print("Port pool unavailable: seeding released allocations only")
+        ports = []
+    rows = [
+        {
+            "user_id": user_id,
+            "agent_id": rnd.choice(agent_ids),
+            "service": SEED_SERVICE,
+            "remote_port": settings.PORT_MIN + i % (settings.PORT_MAX - settings.PORT_MIN + 1),
+            "status": AllocationStatus.RELEASED,
+        }
+        for i in range(count - len(ports))
+    ]
+    rows += [
+        {
+            "user_id": user_id,
+            "agent_id": rnd.choice(agent_ids),
+            "service": SEED_SERVICE,
+            "remote_port": port,
+            "status": rnd.choice(LIVE),
+        }
+        for port in ports
+    ]
+    async with AsyncSession(engine) as session:
+        for i in range(0, len(rows), 1000):
+            await session.execute(insert(Allocation), rows[i:i + 1000])
+        await session.commit()
+    return ports
+
+
+async def cleanup(engine, ports: list[int]):
+    async with AsyncSession(engine) as session:
+        await session.execute(delete(Allocation).where(Allocation.service == SEED_SERVICE))
+        await session.commit()
+    await port_pool.release(*ports)
+
+
+async def load_baseline(client: httpx.AsyncClient) -> int:
+    async def allocations() -> int:
+        requests, cursor = 0, None
+        while True:
+            params = {"status": SHOWN, "limit": 500, **({"cursor": cursor} if cursor else {})}
+            resp = await client.get("/allocations/", params=params)
+            resp.raise_for_status()
+            requests += 1
+            cursor = resp.json()["next_cursor"]
+            if not cursor:
+                return requests
+
+    async def get(path: str) -> int:
+        (await client.get(path)).raise_for_status()
+        return 1
+
+    return sum(await asyncio.gather(get("/agents/"), allocations(), get("/ports/available")))
+
+
+async def load_dashboard(client: httpx.AsyncClient) -> int:
+    (await client.get("/dashboard")).raise_for_status()
+    return 1
+
+
+async def measure(name: str, load, client: httpx.AsyncClient, engine, args):
+    await load(client)  # warm up connections and caches
+    latencies: list[float] = []
+    requests = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        nonlocal requests
+        async with semaphore:
+            started = time.perf_counter()
+            # Not `requests += await ...`: that reads the total before awaiting
+            sent = await load(client)
+            latencies.append(time.perf_counter() - started)
+            requests += sent
+
+    statements_before = await db_statements(engine, client, args.admin_username or args.username)
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.iterations)))
+    elapsed = time.perf_counter() - started
+    statements = await db_statements(engine, client, args.admin_username or args.username) - statements_before
+    if engine.dialect.name == "mysql":
+        statements -= 1  # the SHOW STATUS of the second reading
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(
+        f"{name:<10} loads/s={args.iterations / elapsed:7.1f}  p50={p(0.5):7.1f}ms  p99={p(0.99):7.1f}ms  "
+        f"requests/load={requests / args.iterations:.1f}  statements/load={statements / args.iterations:.1f}"
+    )
+
+
+async def run(args):
+    engine = create_async_engine(settings.DATABASE_URL)
+    ports = await seed(engine, args.username, args.allocations)
+    print(f"seeded {args.allocations} allocations ({len(ports)} live)")
+
+    headers = {"Authorization": f"Bearer {create_access_token(args.username)}"}
+    limits = httpx.Limits(max_connections=args.concurrency * 3)
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=60) as client:
+            await measure("baseline", load_baseline, client, engine, args)
+            await measure("dashboard", load_dashboard, client, engine, args)
+    finally:
+        if not args.keep:
+            await cleanup(engine, ports)
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--username", required=True, help="existing user the JWT is minted for")
+    parser.add_argument("--admin-username", help="admin for /metrics (non-MySQL only); defaults to --username")
+    parser.add_argument("--allocations", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=200, help="page loads per variant")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded allocations in place")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
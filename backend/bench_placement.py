@@ -0,0 +1,131 @@
+"""
+Placement simulation for the agent_id="auto" engine.
+
+Replays synthetic demand against a synthetic fleet entirely in-process (no
+backend, DB or Redis): sessions arrive as a Poisson process, hold CPU and
+memory on the agent they were placed on for an exponentially distributed
+time, and every agent reports its utilization on a heartbeat interval. Each
+strategy runs on the same seed; "first" is the old behaviour of everyone
+picking the first listed agent.
+
+    python bench_placement.py --agents 10000 --sessions 200000
+
+Reports per-pick latency, rejected and over-committed placements, and how
+the load ended up spread (agents in use, utilization mean/stddev/max).
+"""
+import argparse
+import heapq
+import random
+import statistics
+import time
+
+from app.services.placement import STRATEGIES, AgentLoad, PlacementEngine, PlacementStrategy
+
+
+class FirstListedStrategy(PlacementStrategy):
+    """Baseline: lowest agent id that still fits."""
+
+    name = "first"
+
+    def score(self, load: AgentLoad, now: float) -> float:
+        return load.agent_id
+
+
+class Fleet:
+    def __init__(self, agents: int, rnd: random.Random):
+        self.cores = [rnd.choice((4, 8, 16, 32)) for _ in range(agents)]
+        self.mem_gb = [c * rnd.choice((2, 4)) for c in self.cores]
+        self.cpu_used = [0.0] * agents
+        self.mem_used = [0.0] * agents
+        self.live = [0] * agents
+
+    def cpu_pct(self, i: int) -> float:
+        return 100 * self.cpu_used[i] / self.cores[i]
+
+    def mem_pct(self, i: int) -> float:
+        return 100 * self.mem_used[i] / self.mem_gb[i]
+
+
+def simulate(strategy: PlacementStrategy, args) -> dict:
+    rnd = random.Random(args.seed)
+    fleet = Fleet(args.agents, rnd)
+    engine = PlacementEngine(strategy)
+    start = time.time()
+    engine.load_snapshot(((i, 0.0, 0.0, start, 0) for i in range(args.agents)), now=start)
+
+    departures: list[tuple[float, int, float, float]] = []
+    latencies: list[float] = []
+    rejected = overcommitted = 0
+    next_beat = args.heartbeat
+    t = 0.0
+
+    for _ in range(args.sessions):
+        t += rnd.expovariate(args.arrival_rate)
+        now = start + t
+
+        while departures and departures[0][0] <= t:
+            _, i, cpu, mem = heapq.heappop(departures)
+            fleet.cpu_used[i] -= cpu
+            fleet.mem_used[i] -= mem
+            fleet.live[i] -= 1
+        # Heartbeats: every agent reports what it actually carries
+        while next_beat <= t:
+            beat_at = start + next_beat
+            for i in range(args.agents):
+                engine.observe(i, cpu=fleet.cpu_pct(i), mem=fleet.mem_pct(i), live=fleet.live[i], now=beat_at)
+            next_beat += args.heartbeat
+
+        started = time.perf_counter()
+        agent = engine.pick(now)
+        latencies.append(time.perf_counter() - started)
+        if agent is None:
+            rejected += 1
+            continue
+
+        cpu, mem = rnd.uniform(0.2, 2.0), rnd.uniform(0.5, 4.0)
+        fleet.cpu_used[agent] += cpu
+        fleet.mem_used[agent] += mem
+        fleet.live[agent] += 1
+        if fleet.cpu_used[agent] > fleet.cores[agent] or fleet.mem_used[agent] > fleet.mem_gb[agent]:
+            overcommitted += 1
+        heapq.heappush(departures, (t + rnd.expovariate(1 / args.hold), agent, cpu, mem))
+
+    utilization = [max(fleet.cpu_pct(i), fleet.mem_pct(i)) for i in range(args.agents)]
+    latencies.sort()
+    return {
+        "strategy": strategy.name,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+        "max_us": latencies[-1] * 1e6,
+        "rejected": rejected,
+        "overcommitted": overcommitted,
+        "in_use": sum(1 for n in fleet.live if n),
+        "util_mean": statistics.mean(utilization),
+        "util_stdev": statistics.pstdev(utilization),
+        "util_max": max(utilization),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--sessions", type=int, default=200000, help="session arrivals to replay")
+    parser.add_argument("--arrival-rate", type=float, default=100.0, help="sessions per simulated second")
+    parser.add_argument("--hold", type=float, default=600.0, help="mean session length, simulated seconds")
+    parser.add_argument("--heartbeat", type=float, default=30.0, help="heartbeat interval, simulated seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    strategies = [FirstListedStrategy()] + [cls() for cls in STRATEGIES.values()]
+    print(f"agents={args.agents} sessions={args.sessions} rate={args.arrival_rate}/s hold={args.hold}s heartbeat={args.heartbeat}s")
+    print(f"{'strategy':<9} {'p50us':>7} {'p99us':>7} {'maxus':>8} {'rejected':>9} {'overcommit':>10} {'in_use':>7} {'util_mean':>9} {'util_sd':>8} {'util_max':>8}")
+    for strategy in strategies:
+        r = simulate(strategy, args)
+        print(
+            f"{r['strategy']:<9} {r['p50_us']:>7.1f} {r['p99_us']:>7.1f} {r['max_us']:>8.1f} {r['rejected']:>9} "
+            f"{r['overcommitted']:>10} {r['in_use']:>7} {r['util_mean']:>8.1f}% {r['util_stdev']:>7.1f}% {r['util_max']:>7.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Idle-agent poll benchmark for GET /agents/tasks.
+
+Simulates N idle agents polling a running backend and reports poll latency
+and the database query rate observed while they poll: MySQL's Questions
+counter, or on other databases (e.g. a SQLite scratch run) the backend's own
+db_queries_per_request count for the poll route from /metrics, which covers
+one worker only, so run the backend with a single worker there, and pass
+--admin-username since /metrics is admin only. Agent tokens (and that admin's
+JWT) are minted locally with the backend's secrets (read from .env), so no
+agents need to be registered.
+
+Compare the empty-poll fast path against the DB-only path by running the
+backend twice:
+
+    TASK_POLL_FAST_PATH=false uvicorn main:app   ->  python bench_poll.py
+    TASK_POLL_FAST_PATH=true  uvicorn main:app   ->  python bench_poll.py
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.security import create_access_token, create_agent_token
+
+
+async def db_queries(engine, client: httpx.AsyncClient, admin_username: str | None) -> int:
+    if engine.dialect.name == "mysql":
+        async with engine.connect() as conn:
+            row = (await conn.execute(text("SHOW GLOBAL STATUS LIKE 'Questions'"))).first()
+        return int(row[1])
+    if not admin_username:
+        raise SystemExit("--admin-username is required to read /metrics off MySQL")
+    resp = await client.get("/metrics", headers={"Authorization": f"Bearer {create_access_token(admin_username)}"})
+    resp.raise_for_status()
+    return int(sum(
+        h["sum"] for h in resp.json().get("db_queries_per_request", [])
+        if h["labels"]["route"].endswith("/agents/tasks")
+    ))
+
+
+async def poll_once(client: httpx.AsyncClient, token: str, latencies: list, errors: list):
+    started = time.perf_counter()
+    try:
+        resp = await client.get("/agents/tasks", headers={"Authorization": f"Bearer {token}"})
+        resp.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    except Exception as e:
+        errors.append(str(e))
+
+
+async def run(args):
+    tokens = [create_agent_token(args.first_agent_id + i)[0] for i in range(args.agents)]
+    engine = create_async_engine(settings.DATABASE_URL)
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        questions_before = await db_queries(engine, client, args.admin_username)
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        # Each worker cycles through its share of the agents, one poll at a time
+        async def worker(share: list[str]):
+            i = 0
+            while time.perf_counter() < deadline:
+                await poll_once(client, share[i % len(share)], latencies, errors)
+                i += 1
+
+        shares = [tokens[i::args.concurrency] for i in range(args.concurrency)]
+        await asyncio.gather(*(worker(s) for s in shares if s))
+
+        elapsed = time.perf_counter() - started
+        questions_after = await db_queries(engine, client, args.admin_username)
+    await engine.dispose()
+
+    if not latencies:
+        print(f"No successful polls ({len(errors)} errors): {errors[:3]}")
+        return
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    db_questions = questions_after - questions_before
+    print(f"agents={args.agents} concurrency={args.concurrency} duration={elapsed:.1f}s")
+    print(f"polls={len(latencies)} ({len(latencies) / elapsed:.0f}/s) errors={len(errors)}")
+    print(f"latency p50={p(0.5):.2f}ms p99={p(0.99):.2f}ms mean={statistics.mean(latencies) * 1000:.2f}ms")
+    print(f"db queries={db_questions} ({db_questions / elapsed:.0f}/s, {db_questions / len(latencies):.2f} per poll)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--agents", type=int, default=5000)
+    parser.add_argument("--first-agent-id", type=int, default=1_000_000, help="ids with no tasks, i.e. idle agents")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--admin-username", help="existing admin, for /metrics (non-MySQL only)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
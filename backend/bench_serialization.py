@@ -0,0 +1,235 @@
+"""
+Serialization benchmark for the list endpoints: the fast path
+(app.core.fast_json) against the one it replaced, at 1k and 10k rows.
+
+  agents, allocations  before: ORM entities -> model_validate per row ->
+                       Page model -> model_dump_json
+                       now:    column-tuple rows -> TypedDict dump_json
+  tasks (poll)         before: FastAPI's response_model path (dump, validate
+                       again, serialize, json.dumps)
+                       now:    dicts from the claimed ORM tasks -> dump_json
+
+Each request runs in-process on a fresh session: the query (tasks are
+in-memory, as they come out of claim_tasks) plus serialization, and gzip on
+the fast path when the body reaches JSON_GZIP_MIN_BYTES (as for a client
+sending Accept-Encoding: gzip; --no-gzip to leave it out). Reports p50/p99
+latency, CPU time per request (this process only, not MySQL) and body size,
+after checking that both paths produce the same bytes.
+
+    python bench_serialization.py --database-url mysql+aiomysql://root:pw@localhost:3306/sdd_bench
+
+A SQLite file (sqlite+aiosqlite:////tmp/sdd_bench.db) works too, without
+audit_logs (its composite autoincrement key is MySQL-only). The database is
+dropped and recreated on every run: never point it at real data.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import insert, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.fast_json import adapter, as_rows, compress, dump_json, dump_page
+from app.core.config import settings
+from app.models.base import Base
+from app.models.agent import Agent
+from app.models.allocation import Allocation
+from app.models.audit_log import AuditLog
+from app.models.task import Task
+from app.models.task_history import TaskHistory  # noqa: F401
+from app.models.user import User
+from app.models.enums import AgentStatus, AllocationStatus, TaskStatus
+from app.repositories.agent import AgentRepository
+from app.repositories.allocation import AllocationRepository
+from app.schemas.agent import Agent as AgentSchema, AgentRow
+from app.schemas.allocation import AllocationResponse, AllocationRow
+from app.schemas.common import Page
+from app.schemas.task import TaskResponse, TaskRow
+from app.services.heartbeat_buffer import heartbeat_buffer
+
+USER_ID = 1
+# Tasks as claim_tasks returns them; filled by run()
+CLAIMED: List[Task] = []
+
+
+async def setup(database_url: str, rows: int):
+    sqlite = make_url(database_url).get_backend_name() == "sqlite"
+    if sqlite:
+        Path(make_url(database_url).database).unlink(missing_ok=True)
+    else:
+        base_url, db_name = database_url.rsplit("/", 1)
+        admin = create_async_engine(base_url)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS `{db_name}`"))
+            await conn.execute(text(f"CREATE DATABASE `{db_name}`"))
+        await admin.dispose()
+
+    rnd = random.Random(42)
+    engine = create_async_engine(database_url)
+    tables = [t for t in Base.metadata.sorted_tables if not (sqlite and t.name == AuditLog.__tablename__)]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+        await conn.execute(insert(User).values(id=USER_ID, username="bench", password_hash="x"))
+        agents = [
+            {
+                "name": f"bench-agent-{i}",
+                "secret_hash": "x",
+                "ip": f"10.0.{i // 256 % 256}.{i % 256}",
+                "cpu": rnd.uniform(0, 100),
+                "mem": rnd.uniform(0, 100),
+                "last_seen_at": datetime.utcnow(),
+                "status": rnd.choice(list(AgentStatus)),
+            }
+            for i in range(rows)
+        ]
+        for i in range(0, rows, 1000):
+            await conn.execute(insert(Agent), agents[i:i + 1000])
+        # Released, so active_port stays NULL and ports may repeat
+        allocations = [
+            {
+                "user_id": USER_ID,
+                "agent_id": rnd.randint(1, rows),
+                "service": "code_server",
+                "remote_port": settings.PORT_MIN + i % (settings.PORT_MAX - settings.PORT_MIN + 1),
+                "status": AllocationStatus.RELEASED,
+            }
+            for i in range(rows)
+        ]
+        for i in range(0, rows, 1000):
+            await conn.execute(insert(Allocation), allocations[i:i + 1000])
+    return engine
+
+
+def claimed_tasks(count: int) -> List[Task]:
+    now = datetime.utcnow()
+    return [
+        Task(
+            id=i + 1,
+            agent_id=1,
+            type="start_code_server",
+            payload={"allocation_id": i + 1, "port": settings.PORT_MIN + i, "user_id": USER_ID, "password": "x" * 16},
+            status=TaskStatus.DISPATCHED,
+            created_at=now - timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+# Before: what the endpoints did until the fast path
+
+async def agents_before(session: AsyncSession, limit: int) -> bytes:
+    agents, next_cursor = await AgentRepository(session).list_page(limit=limit)
+    items = [heartbeat_buffer.merge(AgentSchema.model_validate(a)) for a in agents]
+    return Page[AgentSchema](items=items, next_cursor=next_cursor).model_dump_json().encode()
+
+
+async def allocations_before(session: AsyncSession, limit: int) -> bytes:
+    allocations, next_cursor = await AllocationRepository(session).list_page_for_user(USER_ID, limit=limit)
+    items = [AllocationResponse.model_validate(a) for a in allocations]
+    return Page[AllocationResponse](items=items, next_cursor=next_cursor).model_dump_json().encode()
+
+
+async def tasks_before(session: AsyncSession, limit: int) -> bytes:
+    content = [TaskResponse.model_validate(t) for t in CLAIMED[:limit]]
+    # FastAPI with response_model=List[TaskResponse]: dump, validate, serialize, json.dumps
+    field = adapter(List[TaskResponse])
+    value = field.validate_python([m.model_dump() for m in content])
+    return json.dumps(
+        field.dump_python(value, mode="json"), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode()
+
+
+# Now
+
+async def agents_now(session: AsyncSession, limit: int) -> bytes:
+    rows, next_cursor = await AgentRepository(session).list_page(limit=limit, as_rows=True)
+    return dump_page(AgentRow, [heartbeat_buffer.merge_row(row._asdict()) for row in rows], next_cursor)
+
+
+async def allocations_now(session: AsyncSession, limit: int) -> bytes:
+    rows, next_cursor = await AllocationRepository(session).list_page_for_user(USER_ID, limit=limit, as_rows=True)
+    return dump_page(AllocationRow, [row._asdict() for row in rows], next_cursor)
+
+
+async def tasks_now(session: AsyncSession, limit: int) -> bytes:
+    return dump_json(List[TaskRow], as_rows(CLAIMED[:limit], TaskRow))
+
+
+async def measure(engine, name: str, produce, rows: int, iterations: int, gzip: bool):
+    latencies: list[float] = []
+    cpu: list[float] = []
+    size = sent = 0
+    for i in range(iterations + 1):
+        wall, proc = time.perf_counter(), time.process_time()
+        # A fresh session per request, as from get_db (tasks do not use it)
+        async with AsyncSession(engine) as session:
+            body = await produce(session, rows)
+        size = sent = len(body)
+        if gzip and settings.JSON_GZIP_MIN_BYTES and size >= settings.JSON_GZIP_MIN_BYTES:
+            sent = len(compress(body))
+        if i:  # the first run warms up connections and schema caches
+            latencies.append(time.perf_counter() - wall)
+            cpu.append(time.process_time() - proc)
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(
+        f"{name:<20} rows={rows:<6} p50={p(0.5):8.2f}ms  p99={p(0.99):8.2f}ms  "
+        f"cpu/req={sum(cpu) / len(cpu) * 1000:8.2f}ms  body={size / 1024:8.1f}KiB  sent={sent / 1024:8.1f}KiB"
+    )
+
+
+async def same_output(engine, rows: int) -> bool:
+    identical = True
+    for name, before, now in (
+        ("agents", agents_before, agents_now),
+        ("allocations", allocations_before, allocations_now),
+        ("tasks", tasks_before, tasks_now),
+    ):
+        async with AsyncSession(engine) as session:
+            expected, body = await before(session, rows), await now(session, rows)
+        if body != expected:
+            print(f"{name}: the fast path's body differs from the old one at {rows} rows")
+            identical = False
+    return identical
+
+
+async def run(args) -> int:
+    sizes = sorted(args.rows)
+    engine = await setup(args.database_url, max(sizes))
+    CLAIMED[:] = claimed_tasks(max(sizes))
+    try:
+        if not all([await same_output(engine, rows) for rows in sizes]):
+            return 1
+        for rows in sizes:
+            for name, produce, gzip in (
+                ("agents before", agents_before, False),
+                ("agents now", agents_now, not args.no_gzip),
+                ("allocations before", allocations_before, False),
+                ("allocations now", allocations_now, not args.no_gzip),
+                ("tasks before", tasks_before, False),
+                ("tasks now", tasks_now, not args.no_gzip),
+            ):
+                await measure(engine, name, produce, rows, args.iterations, gzip)
+            print()
+    finally:
+        await engine.dispose()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="scratch database; it is dropped and recreated")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="rows per response")
+    parser.add_argument("--iterations", type=int, default=50, help="requests per variant and size")
+    parser.add_argument("--no-gzip", action="store_true", help="leave gzip out of the fast path")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
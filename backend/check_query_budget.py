@@ -0,0 +1,161 @@
+"""
+Round-trip budget check for the write paths.
+
+Builds the schema in a scratch MySQL database, then drives the real service
+methods (not HTTP) through one allocation's life: create user, allocate,
+claim the start task, report it done, release, report the stop. Every SQL
+statement and COMMIT each call sends is counted and compared with its budget;
+exits non-zero if any call goes over.
+
+    python check_query_budget.py --database-url mysql+aiomysql://root:pw@localhost:3306/sdd_budget_check
+
+A SQLite file works too (sqlite+aiosqlite:////tmp/sdd_budget_check.db) for a
+quick run without MySQL. The budgets are MySQL's; SQLite reads new ids and
+server defaults back with RETURNING instead, which can change a count by a
+statement. audit_logs (its composite autoincrement key is MySQL-only) is left
+out there and the queued audit rows are dropped at the end.
+
+Uses the backend's Redis for the port pool (under a separate key) and the
+pending-task index. Audit rows are only queued during the calls, as they are
+off the request path in the backend, and written at the end. The database is
+dropped and recreated on every run: never point it at real data.
+"""
+import argparse
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from sqlalchemy import event, insert, make_url, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.port_pool import port_pool
+from app.core.redis import redis_client
+from app.models.base import Base
+from app.models.agent import Agent
+from app.models.allocation import Allocation  # noqa: F401  (registers the table)
+from app.models.audit_log import AuditLog  # noqa: F401
+from app.models.task import Task
+from app.models.task_history import TaskHistory  # noqa: F401
+from app.models.user import User  # noqa: F401
+from app.models.enums import AgentStatus
+from app.schemas.task import TaskReport
+from app.schemas.user import UserCreate
+from app.services.allocation_service import AllocationService
+from app.services.audit_writer import audit_writer
+from app.services.auth_service import AuthService
+from app.services.task_service import TaskService
+
+# (statements, commits) per call. Savepoints count as statements.
+BUDGETS = {
+    "create_user": (2, 1),
+    "allocate_port": (5, 1),
+    "claim_tasks": (4, 1),
+    "report_task(start)": (4, 1),
+    "release_allocation": (3, 1),
+    "report_task(stop)": (4, 1),
+}
+
+
+class Counter:
+    def __init__(self):
+        self.statements: list[str] = []
+        self.commits = 0
+
+    def on_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()))
+
+    def on_commit(self, conn):
+        self.commits += 1
+
+
+async def run(database_url: str, verbose: bool) -> int:
+    sqlite = make_url(database_url).get_backend_name() == "sqlite"
+    if sqlite:
+        Path(make_url(database_url).database).unlink(missing_ok=True)
+    else:
+        base_url, db_name = database_url.rsplit("/", 1)
+        admin = create_async_engine(base_url)
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP DATABASE IF EXISTS `{db_name}`"))
+            await conn.execute(text(f"CREATE DATABASE `{db_name}`"))
+        await admin.dispose()
+
+    engine = create_async_engine(database_url)
+    tables = [t for t in Base.metadata.sorted_tables if not (sqlite and t.name == AuditLog.__tablename__)]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+        await conn.execute(insert(Agent).values(id=1, name="budget-agent", secret_hash="x", status=AgentStatus.ONLINE))
+
+    # Keep the running backend's pool untouched
+    port_pool.key = f"{port_pool.key}:budget-check"
+    await port_pool.rebuild([])
+    # Queue only (the writer is not started); drained into the scratch DB at the end
+    audit_writer.mode = "async"
+    audit_writer.session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    results: list[tuple[str, Counter]] = []
+
+    @asynccontextmanager
+    async def measure(name: str):
+        counter = Counter()
+        event.listen(engine.sync_engine, "before_cursor_execute", counter.on_statement)
+        event.listen(engine.sync_engine, "commit", counter.on_commit)
+        # A fresh session per call, as a request gets from get_db
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            try:
+                yield session
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", counter.on_statement)
+                event.remove(engine.sync_engine, "commit", counter.on_commit)
+        results.append((name, counter))
+
+    async def task_id(task_type: str) -> int:
+        async with AsyncSession(engine) as session:
+            return (await session.execute(select(Task.id).where(Task.type == task_type))).scalar_one()
+
+    async with measure("create_user") as session:
+        user = await AuthService(session).create_user(UserCreate(username="budget-user", password="budget-pass"))
+    async with measure("allocate_port") as session:
+        allocation = await AllocationService(session).allocate_port(1, user.id)
+    async with measure("claim_tasks") as session:
+        await TaskService(session).claim_tasks(1)
+    start_id = await task_id("start_code_server")
+    async with measure("report_task(start)") as session:
+        await TaskService(session).report_task(start_id, 1, TaskReport(status="done"))
+    async with measure("release_allocation") as session:
+        await AllocationService(session).release_allocation(allocation.id)
+    stop_id = await task_id("stop_code_server")
+    async with measure("report_task(stop)") as session:
+        await TaskService(session).report_task(stop_id, 1, TaskReport(status="done"))
+
+    if not sqlite:
+        await audit_writer.stop()
+    await redis_client.delete(port_pool.key)
+    await engine.dispose()
+
+    failures = 0
+    print(f"{'call':<20} {'stmts':>5} {'commits':>7} {'budget':>7}")
+    for name, counter in results:
+        max_statements, max_commits = BUDGETS[name]
+        over = len(counter.statements) > max_statements or counter.commits > max_commits
+        failures += over
+        print(f"{name:<20} {len(counter.statements):>5} {counter.commits:>7} {f'{max_statements}/{max_commits}':>7}  {'OVER' if over else 'ok'}")
+        if verbose or over:
+            for statement in counter.statements:
+                print(f"    {statement[:140]}")
+
+    print(f"\n{len(results)} calls checked, {failures} over budget")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="scratch database; it is dropped and recreated")
+    parser.add_argument("--verbose", action="store_true", help="print every statement, not only for calls over budget")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.database_url, args.verbose)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Query-plan regression check for the hot repository queries.
+
+Builds the schema in a scratch MySQL database, seeds it with a realistic mix
+(mostly finished tasks and released allocations), runs the real repository
+methods while capturing their SQL, and EXPLAINs every captured SELECT. Exits
+non-zero if any of them falls back to a full table scan (type=ALL) or uses
+no index.
+
+    python check_query_plans.py --database-url mysql+aiomysql://root:pw@localhost:3306/sdd_plan_check
+
+The database is dropped and recreated on every run: never point it at real data.
+"""
+import argparse
+import asyncio
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.base import Base
+from app.models.user import User
+from app.models.agent import Agent
+from app.models.allocation import Allocation
+from app.models.task import Task
+from app.models.audit_log import AuditLog
+from app.models.enums import ActorType, AgentStatus, AllocationStatus, TaskStatus
+from app.repositories.allocation import AllocationRepository
+from app.repositories.audit_log import AuditLogRepository
+from app.repositories.task import TaskRepository
+
+USERS = 50
+AGENTS = 500
+ALLOCATIONS = 20000
+TASKS = 50000
+AUDIT_LOGS = 50000
+
+
+async def seed(session: AsyncSession):
+    rnd = random.Random(42)
+    await session.execute(insert(User), [
+        {"id": i, "username": f"user{i}", "password_hash": "x"} for i in range(1, USERS + 1)
+    ])
+    await session.execute(insert(Agent), [
+        {"id": i, "name": f"agent{i}", "secret_hash": "x", "status": AgentStatus.ONLINE}
+        for i in range(1, AGENTS + 1)
+    ])
+    # ~2% of allocations live, the rest released: the shape a long-running cluster has
+    live = [AllocationStatus.ACTIVE, AllocationStatus.STARTING, AllocationStatus.REQUESTED]
+    await session.execute(insert(Allocation), [
+        {
+            "user_id": rnd.randint(1, USERS),
+            "agent_id": rnd.randint(1, AGENTS),
+            "service": "code_server",
+            "remote_port": 10000 + i,
+            "status": rnd.choice(live) if rnd.random() < 0.02 else AllocationStatus.RELEASED,
+        }
+        for i in range(ALLOCATIONS)
+    ])
+    # ~1% of tasks pending, a few dispatched, the rest done
+    def task_status():
+        r = rnd.random()
+        if r < 0.01:
+            return TaskStatus.PENDING
+        if r < 0.02:
+            return TaskStatus.DISPATCHED
+        return TaskStatus.DONE
+    await session.execute(insert(Task), [
+        {"agent_id": rnd.randint(1, AGENTS), "type": "start_code_server", "payload": {}, "status": task_status()}
+        for _ in range(TASKS)
+    ])
+    now = datetime.utcnow()
+    await session.execute(insert(AuditLog), [
+        {
+            "actor_type": ActorType.USER,
+            "actor_id": rnd.randint(1, USERS),
+            "action": rnd.choice(["allocate_port", "release_allocation"]),
+            "target_type": "allocation",
+            "target_id": rnd.randint(1, ALLOCATIONS),
+            "meta": {},
+            "created_at": now - timedelta(minutes=AUDIT_LOGS - i),
+        }
+        for i in range(AUDIT_LOGS)
+    ])
+    await session.commit()
+    for table in ("users", "agents", "allocations", "tasks", "audit_logs"):
+        await session.execute(text(f"ANALYZE TABLE {table}"))
+
+
+async def hot_queries(session: AsyncSession):
+    """The repository calls whose plans we guard."""
+    tasks = TaskRepository(session)
+    allocs = AllocationRepository(session)
+    audit = AuditLogRepository(session)
+    await tasks.get_pending_tasks(7)
+    await tasks.has_pending_tasks(7)
+    await tasks.claim_pending_tasks(7, lease_seconds=60)
+    await tasks.requeue_expired_leases(max_attempts=3, backoff_seconds=10)
+    await tasks.compact_finished(datetime.utcnow(), batch=1000)
+    await allocs.get_active_ports()
+    await tasks.list_page(agent_id=7)
+    await allocs.list_page_for_user(3)
+    await allocs.list_page_for_user(3, 11)
+    await allocs.list_page_for_user(3, statuses=[AllocationStatus.ACTIVE])
+    await allocs.count_live()
+    await allocs.count_live_by_agent_status()
+    await allocs.list_for_user_with_agent_names(3, [AllocationStatus.ACTIVE, AllocationStatus.FAILED], 500)
+    await audit.list_page(actor_type=ActorType.USER, actor_id=3)
+    await audit.list_page(target_type="allocation", target_id=11)
+    await audit.list_page(created_from=datetime.utcnow() - timedelta(days=1))
+
+
+async def run(database_url: str) -> int:
+    base_url, db_name = database_url.rsplit("/", 1)
+    admin = create_async_engine(base_url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"DROP DATABASE IF EXISTS `{db_name}`"))
+        await conn.execute(text(f"CREATE DATABASE `{db_name}`"))
+    await admin.dispose()
+
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine) as session:
+        await seed(session)
+
+    captured: list[tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    async with AsyncSession(engine) as session:
+        await hot_queries(session)
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    failures = 0
+    async with engine.connect() as conn:
+        for statement, parameters in captured:
+            plan = (await conn.exec_driver_sql("EXPLAIN " + statement, parameters)).mappings().all()
+            bad = [row for row in plan if row["type"] == "ALL" or row["key"] is None]
+            status = "FULL SCAN" if bad else "ok"
+            failures += bool(bad)
+            print(f"[{status}] {' '.join(statement.split())[:140]}")
+            for row in plan:
+                print(f"    table={row['table']} type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}")
+    await engine.dispose()
+
+    print(f"\n{len(captured)} queries checked, {failures} full scans")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="scratch database; it is dropped and recreated")
+    sys.exit(asyncio.run(run(parser.parse_args().database_url)))
+
+
+if __name__ == "__main__":
+    main()
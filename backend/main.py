@@ -2,16 +2,85 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routers import auth, agents, allocations, tasks, misc
+from app.api.routers import auth, agents, allocations, tasks, audit, events, misc
 from app.core.database import engine
+from app.core.db_instrumentation import QueryStatsMiddleware
+from app.core.hashing import HashingSaturated, password_hasher
+from app.core.background import PeriodicTask
+from app.core.events import event_bus
+from app.core.leader import leader_only
+from app.services.heartbeat_buffer import heartbeat_buffer
+from app.services.liveness import liveness_tracker
+from app.services.allocation_service import port_pool_lease, rebuild_port_pool, reconcile_port_pool
+from app.services.audit_retention import audit_retention_lease, maintain_audit_log
+from app.services.audit_writer import audit_writer
+from app.services.auth_service import grant_admin_roles
+from app.services.placement import placement_engine
+from app.services.reclaimer import reclaim_stuck_allocations, reclaimer_lease
+from app.services.task_service import compact_finished_tasks, reap_expired_leases, rebuild_pending_index
 from app.models.base import Base
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+background_tasks = [
+    PeriodicTask("heartbeat_flush", settings.HEARTBEAT_FLUSH_INTERVAL_SEC, heartbeat_buffer.flush),
+    PeriodicTask("liveness_sweep", settings.LIVENESS_SWEEP_INTERVAL_SEC, liveness_tracker.sweep),
+    PeriodicTask("task_lease_reaper", settings.TASK_REAPER_INTERVAL_SEC, reap_expired_leases),
+    PeriodicTask("task_compaction", settings.TASK_COMPACTION_INTERVAL_SEC, compact_finished_tasks),
+    PeriodicTask("placement_refresh", settings.PLACEMENT_REFRESH_INTERVAL_SEC, placement_engine.refresh),
+    PeriodicTask(
+        "allocation_reclaimer", settings.RECLAIMER_INTERVAL_SEC, leader_only(reclaimer_lease, reclaim_stuck_allocations)
+    ),
+    PeriodicTask(
+        "port_pool_reconcile",
+        settings.PORT_POOL_RECONCILE_INTERVAL_SEC,
+        leader_only(port_pool_lease, reconcile_port_pool),
+    ),
+    PeriodicTask(
+        "audit_retention", settings.AUDIT_RETENTION_INTERVAL_SEC, leader_only(audit_retention_lease, maintain_audit_log)
+    ),
+]
+
 @app.on_event("startup")
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await event_bus.start()
+    await grant_admin_roles()
+    await liveness_tracker.seed()
+    await rebuild_pending_index()
+    # One worker rebuilds; if the lease is held elsewhere, its holder reconciles
+    await leader_only(port_pool_lease, rebuild_port_pool)()
+    await placement_engine.refresh()
+    audit_writer.start()
+    for task in background_tasks:
+        task.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in background_tasks:
+        await task.stop()
+    # Hand the leader-only jobs to another worker now rather than after the lease TTL
+    await reclaimer_lease.release()
+    await audit_retention_lease.release()
+    await port_pool_lease.release()
+    # Don't lose beats buffered since the last periodic flush
+    await heartbeat_buffer.flush()
+    # Write audit records still queued
+    await audit_writer.stop()
+    await event_bus.stop()
+    password_hasher.shutdown()
+
+@app.exception_handler(HashingSaturated)
+async def hashing_saturated_handler(request: Request, exc: HashingSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# Added first so it sits inside CORS: preflights are not counted
+app.add_middleware(QueryStatsMiddleware)
 
 # 配置 CORS
 # Ensure CORS is set up for frontend communication
@@ -21,6 +90,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ETag: read by the frontend for conditional list polls
+    expose_headers=["ETag", *(["X-DB-Queries", "X-DB-Time-Ms", "X-DB-Pool-Wait-Ms"] if settings.DEBUG else [])],
 )
 
 
@@ -30,6 +101,8 @@ app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["aut
 app.include_router(agents.router, prefix=f"{settings.API_V1_STR}/agents", tags=["agents"])
 app.include_router(allocations.router, prefix=f"{settings.API_V1_STR}/allocations", tags=["allocations"])
 app.include_router(tasks.router, prefix=f"{settings.API_V1_STR}/tasks", tags=["tasks"])
+app.include_router(events.router, prefix=f"{settings.API_V1_STR}/events", tags=["events"])
+app.include_router(audit.router, prefix=f"{settings.API_V1_STR}/audit", tags=["audit"])
 app.include_router(misc.router, prefix=f"{settings.API_V1_STR}", tags=["misc"])
 
 @app.get("/")
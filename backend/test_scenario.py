@@ -135,7 +135,7 @@ def run_test():
     # 9. 验证分配状态
     log("9. 验证最终分配状态...")
     resp = requests.get(f"{BASE_URL}/allocations/?agent_id={agent_id}", headers=headers)
-    allocs = resp.json()
+    allocs = resp.json()["items"]
     my_alloc = next((a for a in allocs if a["id"] == alloc_id), None)
     
     if my_alloc and my_alloc["status"] == "active":
@@ -184,7 +184,7 @@ def run_test():
     # 13. 验证最终释放状态
     log("13. 验证最终释放状态...")
     resp = requests.get(f"{BASE_URL}/allocations/?agent_id={agent_id}", headers=headers)
-    allocs = resp.json()
+    allocs = resp.json()["items"]
     my_alloc = next((a for a in allocs if a["id"] == alloc_id), None)
     
     if my_alloc and my_alloc["status"] == "released":
@@ -8,7 +8,7 @@ from agent.logger import build_logger
 from agent.heartbeat import Heartbeater
 from agent.runtime_state import RuntimeState
 from agent.api import API
-from agent.process import ProcManager, CodeServerManager, FrpcManager
+from agent.process import ProcManager, CodeServerManager, FrpcManager, WarmPool
 from agent.tasks import TaskRunner
 
 CREDENTIALS_FILE = Path("runtime/credentials.json")
@@ -44,14 +44,18 @@ def main():
     proc_mgr = ProcManager(cfg.work_dir, log)
     code_mgr = CodeServerManager(cfg, proc_mgr, log)
     frp_mgr = FrpcManager(cfg, proc_mgr, log)
-    runner = TaskRunner(cfg, api, proc_mgr, code_mgr, frp_mgr)
+    warm_pool = WarmPool(cfg, proc_mgr, code_mgr, log) if cfg.warm_pool_size > 0 else None
+    if warm_pool:
+        warm_pool.fill()
+        log.info("Warm pool: %d code-server slots from port %d", cfg.warm_pool_size, cfg.warm_port_base)
+    runner = TaskRunner(cfg, api, proc_mgr, code_mgr, frp_mgr, warm_pool)
 
     # 5) 启动心跳器，on_beat 回调上报
     hb = Heartbeater(
         cfg.heartbeat_interval_sec,
         log,
         on_beat=lambda cpu, mem: _safe_heartbeat(
-            api, log, cpu, mem, code_mgr
+            api, log, cpu, mem, code_mgr, warm_pool
         ),
     )
     hb.start_background()
@@ -61,21 +65,37 @@ def main():
     try:
         while True:
             try:
-                tasks = api.poll_tasks()
+                started = time.monotonic()
+                tasks = api.poll_tasks(wait=cfg.poll_wait_sec)
                 for t in tasks:
                     runner.handle(t)
+                # 长轮询本身就在等待，直接发起下一次；
+                # 后端不支持长轮询（空列表立刻返回）时退回固定间隔
+                if cfg.poll_wait_sec > 0 and (tasks or time.monotonic() - started >= cfg.poll_wait_sec / 2):
+                    continue
             except Exception as e:
                 log.warning("poll tasks failed: %s", e)
             time.sleep(cfg.poll_interval_sec)
     except KeyboardInterrupt:
         log.info("Shutting  down...")
         hb.stop()
+        if warm_pool:
+            warm_pool.stop_all()
 
 
-def _safe_heartbeat(api: API, log, cpu: float, mem: float, code_mgr=None):
+def _safe_heartbeat(api: API, log, cpu: float, mem: float, code_mgr=None, warm_pool=None):
+    # 0) 补齐预热池（被接管或挂掉的槽位）
+    warm_slots = None
+    if warm_pool:
+        try:
+            warm_pool.fill()
+        except Exception as e:
+            log.warning("warm pool refill failed: %s", e)
+        warm_slots = warm_pool.ready_count()
+
     # 1) 正常上报
     try:
-        api.heartbeat(cpu=cpu, mem=mem)
+        api.heartbeat(cpu=cpu, mem=mem, warm_slots=warm_slots)
     except Exception as e:
         log.warning("heartbeat send failed: %s", e)
 
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import base64
+import json
+import threading
+import time
+
 import httpx
 from pydantic import BaseModel
 from pathlib import Path
 
+# 提前多少秒刷新签名 token
+TOKEN_REFRESH_MARGIN_SEC = 300
+
 
 class RegisterResp(BaseModel):
     agent_id: int
     agent_token: str
+    expires_in: int | None = None
 
 
 class API:
@@ -16,6 +25,7 @@ class API:
       – register()  -> POST /agents/register
       – heartbeat() -> POST /agents/heartbeat
       – poll_tasks() -> GET /agents/tasks
+      – refresh()   -> POST /agents/token/refresh
     """
 
     def __init__(self, base_url: str, agent_name: str, agent_secret: str, agent_token: str | None = None):
@@ -23,6 +33,11 @@ class API:
         self.agent_name = agent_name
         self.agent_secret = agent_secret
         self.agent_token = agent_token
+        # 签名 token 的过期时间 (epoch 秒)；旧的 "id:token" 凭据没有过期时间。
+        # 重启后从磁盘读回的 token 也要知道何时过期，所以直接从 token 的 exp 取
+        self.token_expires_at: float | None = self._token_exp(agent_token)
+        # 心跳线程和轮询线程共用一个 API：同一时刻只让一个线程去刷新
+        self._refresh_lock = threading.Lock()
         # 用同一个 httpx.Client 复用连接池
         self.client = httpx.Client(timeout=5)
 
@@ -41,6 +56,7 @@ class API:
     def _request(self, method: str, path: str, **kw):
         """统一发送请求；捕获 401 并自动重新注册、重试一次"""
         url = f"{self.base}{path}"
+        self._maybe_refresh()
         kw.setdefault("headers", self._headers())
         resp = self.client.request(method, url, **kw)
 
@@ -51,12 +67,7 @@ class API:
                 # 调用原始 register 拿到新 token
                 reg = self.register()
                 # 把新 token 写回本地
-                from agent.runtime_state import RuntimeState
-                from pathlib import Path
-                state = RuntimeState(Path("runtime/credentials.json"))
-                state.agent_id = reg.agent_id
-                state.agent_token = reg.agent_token
-                state.save()
+                self._persist(reg)
                 # 用新 token 重试一次
                 kw["headers"] = self._headers()
                 resp = self.client.request(method, url, **kw)
@@ -66,6 +77,56 @@ class API:
         resp.raise_for_status()
         return resp
 
+    @staticmethod
+    def _token_exp(token: str | None) -> float | None:
+        """签名 token (JWT) 里的 exp；不校验签名，只用来决定何时刷新。旧凭据返回 None"""
+        if not token or ":" in token:
+            return None
+        try:
+            payload = token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return float(claims["exp"])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return None
+
+    def _needs_refresh(self) -> bool:
+        if not self.agent_token:
+            return False
+        if ":" in self.agent_token:  # 旧的 "id:token" 凭据
+            return True
+        return (
+            self.token_expires_at is not None
+            and time.time() >= self.token_expires_at - TOKEN_REFRESH_MARGIN_SEC
+        )
+
+    def _maybe_refresh(self):
+        """旧的 "id:token" 凭据或快过期的签名 token 先换一张新的；失败就继续用旧的，401 时会重新注册"""
+        if not self._needs_refresh():
+            return
+        with self._refresh_lock:
+            # 等锁期间另一个线程可能已经换好了
+            if not self._needs_refresh():
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Token refresh failed: {e}")
+
+    def _remember(self, reg: RegisterResp):
+        self.agent_token = reg.agent_token
+        if reg.expires_in:
+            self.token_expires_at = time.time() + reg.expires_in
+        else:
+            self.token_expires_at = self._token_exp(reg.agent_token)
+
+    @staticmethod
+    def _persist(reg: RegisterResp):
+        from agent.runtime_state import RuntimeState
+        state = RuntimeState(Path("runtime/credentials.json"))
+        state.agent_id = reg.agent_id
+        state.agent_token = reg.agent_token
+        state.save()
+
     # ---------- API 调用 ----------
     def register(self) -> RegisterResp:
         resp = self.client.post(
@@ -76,21 +137,37 @@ class API:
         resp.raise_for_status()
         data = resp.json()
         reg = RegisterResp.model_validate(data)
-        self.agent_token = reg.agent_token  # 缓存下来，后面请求带上
+        self._remember(reg)  # 缓存下来，后面请求带上
+        return reg
+
+    def refresh(self) -> RegisterResp:
+        resp = self.client.post(f"{self.base}/agents/token/refresh", headers=self._headers())
+        resp.raise_for_status()
+        reg = RegisterResp.model_validate(resp.json())
+        self._remember(reg)
+        self._persist(reg)
         return reg
 
-    def heartbeat(self, cpu: float, mem: float):
+    def heartbeat(self, cpu: float, mem: float, warm_slots: int | None = None):
         payload = {"cpu": cpu, "mem": mem}
+        if warm_slots is not None:
+            payload["warm_slots"] = warm_slots
         resp = self._request("POST", "/agents/heartbeat", json=payload)
         return resp.json()
 
-    def poll_tasks(self) -> list[dict]:
-        resp = self._request("GET", "/agents/tasks")
+    def poll_tasks(self, wait: int = 0) -> list[dict]:
+        """wait > 0 时是长轮询：后端有新任务立刻返回，否则最多挂起 wait 秒"""
+        if wait > 0:
+            resp = self._request("GET", "/agents/tasks", params={"wait": wait}, timeout=wait + 10)
+        else:
+            resp = self._request("GET", "/agents/tasks")
         return resp.json() # 期待是 list
 
     # ------------------------ new: report ------------------------
-    def report_task(self, task_id: str, status: str, message: str | None = None):
+    def report_task(self, task_id: str, status: str, message: str | None = None, result: dict | None = None):
         payload = {"status": status, "message": message}
+        if result is not None:
+            payload["result"] = result
         # Backend mounts tasks router at /tasks, not /agents/tasks
         resp = self._request("POST", f"/tasks/{task_id}/report", json=payload)
         return resp.json()
\ No newline at end of file
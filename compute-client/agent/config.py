@@ -15,6 +15,12 @@ class Config(BaseModel):
   cs_bind: str = Field(default="127.0.0.1:8080", alias="CS_BIND")
   heartbeat_interval_sec: int = Field(default=30, alias="HEARTBEAT_INTERVAL_SEC")
   poll_interval_sec: int = Field(default=5, alias="POLL_INTERVAL_SEC")
+  # 长轮询：后端最多挂起多少秒等新任务；0 = 退回固定间隔轮询
+  poll_wait_sec: int = Field(default=25, alias="POLL_WAIT_SEC")
+  # 预热池：预先启动的空闲 code-server 个数；0 = 关闭
+  warm_pool_size: int = Field(default=0, alias="WARM_POOL_SIZE")
+  # 预热实例监听 127.0.0.1 上从 WARM_PORT_BASE 开始的连续端口
+  warm_port_base: int = Field(default=18080, alias="WARM_PORT_BASE")
   log_level: str = Field(default="INFO", alias="LOG_LEVEL")
   work_dir: Path = Field(default=Path("./runtime"), alias="WORK_DIR")
   code_server_path: str = Field(default="code-server", alias="CODE_SERVER_PATH")
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import os
+import secrets
 import socket
 import subprocess
+import threading
 import time
 from dataclasses import dataclass
 from pathlib import Path
@@ -122,21 +124,31 @@ class CodeServerManager:
             self.log.info("code-server already running (pid=%s)", self.handle.popen.pid)
             return self.handle
         env = {"PASSWORD": password}
-        cmd = [
-            self.cfg.code_server_path,
-            "--bind-addr",
-            f"{self.host}:{self.port}",
-            "--auth",
-            "password",
-            "--disable-telemetry",
-        ]
+        cmd = code_server_cmd(self.cfg, self.host, self.port)
         self.handle = self.pm.start(cmd, name="code-server", env=env)
         return self.handle
 
+    def adopt(self, slot: "WarmSlot"):
+        """接管一个预热好的实例，之后的健康检查 / stop 都作用在它上面"""
+        self.handle = slot.handle
+        self.port = slot.port
+        self.log.info("code-server adopted warm slot (pid=%s port=%s)", slot.handle.popen.pid, slot.port)
+
+    def wait_ready(self, timeout: float = 60.0) -> bool:
+        """等端口可联通，冷启动的真实耗时就是这里"""
+        t0 = time.time()
+        while time.time() - t0 < timeout:
+            if self.healthy():
+                return True
+            time.sleep(0.1)
+        return False
+
     def stop(self):
         if self.handle:
             self.pm.stop(self.handle)
             self.handle = None
+        # 接管过预热实例的话，端口恢复成配置值
+        self.host, self.port = parse_bind(self.cfg.cs_bind)
     
     def healthy(self) -> bool:
         """进程存在且端口可联通"""
@@ -146,6 +158,92 @@ class CodeServerManager:
             port_open(self.host, self.port)
         )
 
+
+def code_server_cmd(cfg, host: str, port: int) -> list[str]:
+    return [
+        cfg.code_server_path,
+        "--bind-addr",
+        f"{host}:{port}",
+        "--auth",
+        "password",
+        "--disable-telemetry",
+    ]
+
+
+# --------------------------- WARM POOL ---------------------------
+@dataclass
+class WarmSlot:
+    port: int
+    password: str
+    handle: ProcHandle
+
+
+class WarmPool:
+    """
+    预热池：空闲时保持 size 个已经启动好的 code-server，start 任务来了直接交出一个，
+    只剩下接 frpc，省掉冷启动。
+
+    code-server 只在启动时读取密码，没法事后改，所以每个槽位用自己生成的随机密码，
+    交接后随任务结果上报给后端。
+    """
+
+    def __init__(self, cfg, proc_mgr: ProcManager, code_mgr: CodeServerManager, logger):
+        self.cfg = cfg
+        self.pm = proc_mgr
+        self.code_mgr = code_mgr
+        self.log = logger
+        self.size = cfg.warm_pool_size
+        self.host = "127.0.0.1"
+        # 多留一个端口：被接管的那个还占着时也能补满 size 个空闲
+        self.ports = range(cfg.warm_port_base, cfg.warm_port_base + self.size + 1)
+        self.idle: dict[int, WarmSlot] = {}
+        # 心跳线程补位，主线程取用
+        self._lock = threading.Lock()
+
+    def fill(self):
+        """补齐空闲槽位，挂掉的重新拉起"""
+        with self._lock:
+            for port, slot in list(self.idle.items()):
+                if not self.pm.is_running(slot.handle):
+                    self.log.warning("warm slot on port %s died, respawning", port)
+                    del self.idle[port]
+            busy = {self.code_mgr.port} if self.code_mgr.handle else set()
+            for port in self.ports:
+                if len(self.idle) >= self.size:
+                    break
+                if port in self.idle or port in busy:
+                    continue
+                password = secrets.token_urlsafe(16)
+                handle = self.pm.start(
+                    code_server_cmd(self.cfg, self.host, port),
+                    name=f"code-server-warm-{port}",
+                    env={"PASSWORD": password},
+                )
+                self.idle[port] = WarmSlot(port=port, password=password, handle=handle)
+
+    def take(self) -> Optional[WarmSlot]:
+        """取一个已经在监听的空闲实例；没有就返回 None（走冷启动）"""
+        with self._lock:
+            for port, slot in list(self.idle.items()):
+                if self.pm.is_running(slot.handle) and port_open(self.host, port):
+                    del self.idle[port]
+                    return slot
+        return None
+
+    def ready_count(self) -> int:
+        with self._lock:
+            return sum(
+                1 for port, slot in self.idle.items()
+                if self.pm.is_running(slot.handle) and port_open(self.host, port)
+            )
+
+    def stop_all(self):
+        with self._lock:
+            for slot in self.idle.values():
+                self.pm.stop(slot.handle)
+            self.idle.clear()
+
+
 # --------------------------- FRPC MANAGER ---------------------------
 class FrpcManager:
     """启动 / 停止 frpc，并动态写 frpc.ini"""
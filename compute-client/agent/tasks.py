@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from agent.process import CodeServerManager, ProcManager, FrpcManager
+import time
+from typing import Optional
+
+from agent.process import CodeServerManager, ProcManager, FrpcManager, WarmPool
 from agent.logger import build_logger
 
 
@@ -19,12 +22,14 @@ class TaskRunner:
         proc_mgr: ProcManager,
         code_mgr: CodeServerManager,
         frp_mgr: FrpcManager,
+        warm_pool: Optional[WarmPool] = None,
     ):
         self.cfg = cfg
         self.api = api
         self.pm = proc_mgr
         self.code_mgr = code_mgr
         self.frp_mgr = frp_mgr
+        self.warm_pool = warm_pool
         self.log = build_logger("TaskRunner", cfg.log_level, cfg.work_dir)
 
     # ----------------------------- public -----------------------------
@@ -44,15 +49,30 @@ class TaskRunner:
     def _handle_start(self, tid: str, payload: dict):
         pw = payload.get("password", "123456")
         remote_port = int(payload.get("remote_port", 32001))
+        t0 = time.monotonic()
 
-        # start code-server
-        cs_handle = self.code_mgr.start(password=pw)
+        # start code-server：有预热实例就直接接管，否则冷启动并等端口就绪
+        slot = self.warm_pool.take() if self.warm_pool and self.code_mgr.handle is None else None
+        if slot:
+            self.code_mgr.adopt(slot)
+            cs_handle = slot.handle
+        else:
+            cs_handle = self.code_mgr.start(password=pw)
+            if not self.code_mgr.wait_ready():
+                self.log.warning("Task %s: code-server not listening yet", tid)
         local_port = self.code_mgr.port
 
         # start frpc
         self.frp_mgr.start(remote_port=remote_port, local_port=local_port)
-        self.log.info("Task %s done: code-server(pid=%s) -> remote %s", tid, cs_handle.popen.pid, remote_port)
-        self.api.report_task(tid, "done", f"remote_port={remote_port}")
+        result = {"warm": slot is not None, "start_ms": round((time.monotonic() - t0) * 1000, 1)}
+        if slot:
+            # 预热实例的密码是它启动时自己生成的
+            result["password"] = slot.password
+        self.log.info(
+            "Task %s done: code-server(pid=%s) -> remote %s (%s, %.0fms)",
+            tid, cs_handle.popen.pid, remote_port, "warm" if slot else "cold", result["start_ms"],
+        )
+        self.api.report_task(tid, "done", f"remote_port={remote_port}", result=result)
 
     def _handle_stop(self, tid: str):
         self.frp_mgr.stop()
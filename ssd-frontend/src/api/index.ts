@@ -1,11 +1,16 @@
 import axios from 'axios';
 import { message } from 'ant-design-vue';
-import type { Agent, Allocation, Token, AllocationCreate } from '../types';
+import type {
+  Agent, Allocation, Token, AllocationCreate, Page, ListParams, AgentListParams, AllocationListParams,
+  Dashboard, AgentStatus
+} from '../types';
 
 // Axios Instance
 const api = axios.create({
   baseURL: import.meta.env.VITE_API_BASE_URL || '/api/v1',
   timeout: 10000,
+  // Repeat list params as FastAPI expects: status=a&status=b (not status[]=a)
+  paramsSerializer: { indexes: null },
 });
 
 // Request Interceptor for JWT
@@ -64,9 +69,57 @@ export const authApi = {
 };
 
 
+// Last ETag and body per list URL (query included). Polls send If-None-Match
+// and get the stored body back on 304, which the backend answers without
+// querying the DB or serializing the list again.
+const CONDITIONAL_CACHE_MAX = 100;
+const conditionalCache = new Map<string, { etag: string; data: unknown }>();
+
+async function getConditional<T>(url: string, params: object) {
+  const key = api.getUri({ url, params });
+  const cached = conditionalCache.get(key);
+  const response = await api.get<T>(url, {
+    params,
+    headers: cached ? { 'If-None-Match': cached.etag } : undefined,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (response.status === 304 && cached) {
+    return { ...response, data: cached.data as T };
+  }
+  conditionalCache.delete(key);
+  const etag = response.headers.etag;
+  if (etag) {
+    conditionalCache.set(key, { etag, data: response.data });
+    // Map keeps insertion order: drop the least recently stored
+    if (conditionalCache.size > CONDITIONAL_CACHE_MAX) {
+      conditionalCache.delete(conditionalCache.keys().next().value as string);
+    }
+  }
+  return response;
+}
+
+// Follow next_cursor until the last page (or until `max` items are loaded).
+// notModified: every page came back 304, i.e. nothing changed since the last fetch.
+export async function fetchAllPages<T, P extends ListParams>(
+  list: (params: P) => Promise<{ data: Page<T>; status: number }>,
+  params: P,
+  max = Infinity,
+): Promise<Page<T> & { notModified: boolean }> {
+  const items: T[] = [];
+  let cursor: string | null | undefined = params.cursor;
+  let notModified = true;
+  do {
+    const { data, status } = await list({ ...params, cursor: cursor ?? undefined });
+    items.push(...data.items);
+    cursor = data.next_cursor;
+    notModified = notModified && status === 304;
+  } while (cursor && items.length < max);
+  return { items, next_cursor: cursor ?? null, notModified };
+}
+
 export const agentsApi = {
-  list: async () => {
-    return api.get<Agent[]>('/agents/');
+  list: async (params: AgentListParams = {}) => {
+    return getConditional<Page<Agent>>('/agents/', params);
   },
   delete: async (id: number) => {
     return api.delete<{ ok: boolean }>(`/agents/${id}`);
@@ -80,9 +133,14 @@ export const allocationsApi = {
   release: async (id: number) => {
     return api.post<{ ok: boolean }>(`/allocations/${id}/release`);
   },
-  list: async (agentId?: number) => {
-    const params = agentId ? { agent_id: agentId } : {};
-    return api.get<Allocation[]>('/allocations/', { params });
+  list: async (params: AllocationListParams = {}) => {
+    return getConditional<Page<Allocation>>('/allocations/', params);
+  },
+};
+
+export const dashboardApi = {
+  get: async (params: { status?: AgentStatus[]; limit?: number } = {}) => {
+    return api.get<Dashboard>('/dashboard', { params });
   },
 };
 
@@ -0,0 +1,87 @@
+import { onMounted, onUnmounted } from 'vue';
+
+type Handler = (event: string, data: any) => void;
+
+const BASE_URL = import.meta.env.VITE_API_BASE_URL || '/api/v1';
+const MAX_RETRY_MS = 30000;
+
+// Server-sent events over fetch rather than EventSource, which cannot send
+// the Authorization header. Reconnects with Last-Event-ID so the server
+// replays what was missed (or sends "resync" when it cannot).
+export function useEventStream(path: string, onEvent: Handler) {
+  let controller: AbortController | null = null;
+  let lastEventId: string | null = null;
+  let retryMs = 3000;
+  let stopped = true;
+
+  const dispatch = (block: string) => {
+    let event = 'message';
+    const data: string[] = [];
+    for (const line of block.split('\n')) {
+      if (!line || line.startsWith(':')) continue; // keepalive comment
+      const colon = line.indexOf(':');
+      const field = colon === -1 ? line : line.slice(0, colon);
+      const value = colon === -1 ? '' : line.slice(colon + 1).replace(/^ /, '');
+      if (field === 'event') event = value;
+      else if (field === 'data') data.push(value);
+      else if (field === 'id') lastEventId = value;
+      else if (field === 'retry' && /^\d+$/.test(value)) retryMs = Number(value);
+    }
+    if (data.length) onEvent(event, JSON.parse(data.join('\n')));
+  };
+
+  const connect = async () => {
+    let failures = 0;
+    while (!stopped) {
+      controller = new AbortController();
+      const headers: Record<string, string> = { Accept: 'text/event-stream' };
+      const token = localStorage.getItem('access_token');
+      if (token) headers.Authorization = `Bearer ${token}`;
+      if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+      try {
+        const response = await fetch(`${BASE_URL}${path}`, { headers, signal: controller.signal });
+        if (response.status === 401) {
+          window.location.href = '/login';
+          return;
+        }
+        if (!response.ok || !response.body) throw new Error(`Event stream failed: ${response.status}`);
+        failures = 0;
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value.replace(/\r\n?/g, '\n');
+          let end;
+          while ((end = buffer.indexOf('\n\n')) !== -1) {
+            dispatch(buffer.slice(0, end));
+            buffer = buffer.slice(end + 2);
+          }
+        }
+      } catch (error) {
+        if (stopped) return;
+        failures += 1;
+        console.error('Event stream disconnected', error);
+      }
+      // Back off while the server keeps failing
+      await new Promise(resolve => setTimeout(resolve, Math.min(retryMs * 2 ** failures, MAX_RETRY_MS)));
+    }
+  };
+
+  const start = () => {
+    if (!stopped) return;
+    stopped = false;
+    connect();
+  };
+
+  const stop = () => {
+    stopped = true;
+    controller?.abort();
+    controller = null;
+  };
+
+  onMounted(start);
+  onUnmounted(stop);
+
+  return { start, stop };
+}
@@ -1,34 +1,58 @@
 import { defineStore } from 'pinia';
 import { ref } from 'vue';
-import { agentsApi, allocationsApi, type Agent, type Allocation } from '../api';
+import { agentsApi, allocationsApi, dashboardApi, fetchAllPages } from '../api';
+import {
+  AllocationStatus, type Agent, type AgentDelta, type AgentStatus, type Allocation, type AllocationDelta,
+  type PortUsage
+} from '../types';
+
+const PAGE_SIZE = 50;
+
+// Everything except released: what the agents table shows per agent
+const SHOWN_ALLOCATION_STATUSES = [
+  AllocationStatus.REQUESTED,
+  AllocationStatus.STARTING,
+  AllocationStatus.ACTIVE,
+  AllocationStatus.RELEASING,
+  AllocationStatus.FAILED,
+];
 
 export const useAgentsStore = defineStore('agents', () => {
   const agents = ref<Agent[]>([]);
   const loading = ref(false);
+  const nextCursor = ref<string | null>(null);
+  const statusFilter = ref<AgentStatus[]>([]);
+  const portUsage = ref<PortUsage | null>(null);
+
+  const fetchAllocations = () => fetchAllPages(allocationsApi.list, {
+    status: SHOWN_ALLOCATION_STATUSES,
+    limit: 500,
+  });
 
+  // Map allocations to agents
+  const withAllocations = (fetchedAgents: Agent[], allocations: Allocation[]) =>
+    fetchedAgents.map(agent => ({
+      ...agent,
+      active_allocations: allocations.filter(a => a.agent_id === agent.id),
+    }));
+
+  // Reload from the first page, keeping as many agents as are already shown
+  // so a refresh does not collapse pages loaded with loadMore
   const fetchAgents = async () => {
     loading.value = true;
     try {
-      const [agentsResponse, allocationsResponse] = await Promise.all([
-        agentsApi.list(),
-        allocationsApi.list()
+      const [page, allocations] = await Promise.all([
+        fetchAllPages(
+          agentsApi.list,
+          { status: statusFilter.value, limit: PAGE_SIZE },
+          Math.max(agents.value.length, PAGE_SIZE),
+        ),
+        fetchAllocations(),
       ]);
-      
-      const fetchedAgents = agentsResponse.data;
-      const fetchedAllocations = allocationsResponse.data;
-
-      // Map allocations to agents
-      agents.value = fetchedAgents.map(agent => {
-        // Filter allocations that are NOT released
-        const agentAllocations = fetchedAllocations.filter(a => 
-            a.agent_id === agent.id && a.status !== 'released'
-        );
-        return {
-          ...agent,
-          active_allocations: agentAllocations
-        };
-      });
-
+      // Conditional GETs: both unchanged means the table is already current
+      if (page.notModified && allocations.notModified && agents.value.length) return;
+      agents.value = withAllocations(page.items, allocations.items);
+      nextCursor.value = page.next_cursor;
     } catch (error) {
       console.error('Failed to fetch agents or allocations', error);
     } finally {
@@ -36,6 +60,110 @@ export const useAgentsStore = defineStore('agents', () => {
     }
   };
 
+  // Agents, the user's sessions and port usage in one request. Run on each
+  // (re)connect of the event stream, so deltas sent after it are not missed.
+  const loadDashboard = async () => {
+    loading.value = true;
+    try {
+      const { data } = await dashboardApi.get({ status: statusFilter.value, limit: PAGE_SIZE });
+      agents.value = withAllocations(data.agents.items, data.allocations);
+      nextCursor.value = data.agents.next_cursor;
+      portUsage.value = data.ports;
+    } catch (error) {
+      console.error('Failed to load dashboard', error);
+    } finally {
+      loading.value = false;
+    }
+  };
+
+  const loadMore = async () => {
+    if (!nextCursor.value) return;
+    loading.value = true;
+    try {
+      const [{ data }, allocations] = await Promise.all([
+        agentsApi.list({ status: statusFilter.value, limit: PAGE_SIZE, cursor: nextCursor.value }),
+        fetchAllocations(),
+      ]);
+      agents.value = agents.value.concat(withAllocations(data.items, allocations.items));
+      nextCursor.value = data.next_cursor;
+    } catch (error) {
+      console.error('Failed to fetch agents', error);
+    } finally {
+      loading.value = false;
+    }
+  };
+
+  // Entities the stream mentions but the table does not show yet: reload
+  // once (a conditional GET) rather than guess where they belong
+  let refetchTimer: ReturnType<typeof setTimeout> | null = null;
+  const scheduleRefetch = () => {
+    if (refetchTimer) return;
+    refetchTimer = setTimeout(() => {
+      refetchTimer = null;
+      fetchAgents();
+    }, 500);
+  };
+
+  const applyAgentDeltas = (deltas: AgentDelta[]) => {
+    for (const delta of deltas) {
+      const index = agents.value.findIndex(a => a.id === delta.id);
+      if (delta.deleted) {
+        if (index !== -1) agents.value.splice(index, 1);
+        continue;
+      }
+      if (index === -1) {
+        // New agent, or a status change of one outside the loaded pages or filter
+        if (delta.status) scheduleRefetch();
+        continue;
+      }
+      const agent = { ...agents.value[index], ...delta };
+      if (statusFilter.value.length && !statusFilter.value.includes(agent.status)) {
+        agents.value.splice(index, 1);
+      } else {
+        agents.value[index] = agent;
+      }
+    }
+  };
+
+  const applyAllocationDeltas = (deltas: AllocationDelta[]) => {
+    for (const delta of deltas) {
+      const agent = agents.value.find(a => a.id === delta.agent_id);
+      if (!agent) continue;
+      const allocations = agent.active_allocations ?? [];
+      const index = allocations.findIndex(a => a.id === delta.id);
+      if (delta.status && !SHOWN_ALLOCATION_STATUSES.includes(delta.status)) {
+        if (index !== -1) allocations.splice(index, 1);
+      } else if (index !== -1) {
+        allocations[index] = { ...allocations[index], ...delta };
+      } else if (delta.remote_port !== undefined) {
+        allocations.push(delta as Allocation);
+      } else {
+        scheduleRefetch();
+      }
+      agent.active_allocations = allocations;
+    }
+  };
+
+  // Handler for the dashboard event stream (GET /events/)
+  const applyEvent = (event: string, data: any) => {
+    if (event === 'ready' || event === 'resync') {
+      loadDashboard();
+    } else if (event === 'resumed') {
+      // Replay leaves out load and last-seen updates; a conditional GET catches up
+      fetchAgents();
+    } else if (event === 'agent') {
+      applyAgentDeltas(data);
+    } else if (event === 'allocation') {
+      applyAllocationDeltas(data);
+    }
+  };
+
+  const setStatusFilter = async (statuses: AgentStatus[]) => {
+    statusFilter.value = statuses;
+    agents.value = [];
+    await fetchAgents();
+  };
+
   const deleteAgent = async (id: number) => {
     try {
       await agentsApi.delete(id);
@@ -50,8 +178,14 @@ export const useAgentsStore = defineStore('agents', () => {
   return {
     agents,
     loading,
+    nextCursor,
+    statusFilter,
+    portUsage,
+    loadDashboard,
     fetchAgents,
+    loadMore,
+    setStatusFilter,
     deleteAgent,
+    applyEvent,
   };
 });
-
@@ -40,9 +40,55 @@ export interface Allocation {
   remote_port: number;
   status: AllocationStatus;
   access_url: string | null;
+  password: string | null;
   created_at: string;
 }
 
+export interface DashboardAllocation extends Allocation {
+  agent_name: string;
+}
+
+export interface PortUsage {
+  min: number;
+  max: number;
+  allocated_count: number;
+  by_status: Partial<Record<AllocationStatus, number>>;
+  by_agent: { agent_id: number; by_status: Partial<Record<AllocationStatus, number>> }[];
+}
+
+// GET /dashboard: the Agents page in one request
+export interface Dashboard {
+  agents: Page<Agent>;
+  allocations: DashboardAllocation[];
+  ports: PortUsage;
+}
+
+// Dashboard event stream deltas: changed fields only, keyed by id
+export type AgentDelta = Partial<Agent> & { id: number; deleted?: boolean };
+export type AllocationDelta = Partial<Allocation> & { id: number; agent_id: number };
+
+// Keyset-paginated list: pass next_cursor back as `cursor` for the next page
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
+export interface ListParams {
+  cursor?: string;
+  limit?: number;
+  from?: string;
+  to?: string;
+}
+
+export interface AgentListParams extends ListParams {
+  status?: AgentStatus[];
+}
+
+export interface AllocationListParams extends ListParams {
+  agent_id?: number;
+  status?: AllocationStatus[];
+}
+
 export interface AllocationCreate {
   agent_id: number;
   service: string;